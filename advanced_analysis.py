@@ -7,35 +7,39 @@ import pandas as pd
 import numpy as np
 import joblib
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 import warnings
 warnings.filterwarnings('ignore')
 
+from core.model_bundle import save_bundle
+from core.prediction_cache import save_predictions, split_predictions, trainer_predictions
+from core.search import make_search
+from core.training_context import TrainingContext
+
 print("=" * 60)
 print("Advanced Model Analysis - Israel Housing")
 print("=" * 60)
 
 # Load data
 print("\n[1/6] Loading data and model...")
-df = pd.read_csv('outputs/features.csv')
+context = TrainingContext.from_file('outputs/features.csv')
 model_data = joblib.load('outputs/model.pkl')
 
-X = df.drop('Price_Millions', axis=1)
-y = df['Price_Millions']
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+X_train, X_test = context.X_train, context.X_test
+y_train, y_test = context.y_train, context.y_test
 
 current_model = model_data['model']
-print(f"Data: {len(df)} rows, {len(X.columns)} features")
+print(f"Data: {len(context.y)} rows, {context.n_features} features")
 print(f"Model: {model_data['model_name']}")
 
 # Overfitting check
 print("\n[2/6] Overfitting Analysis...")
 print("-" * 60)
 
-train_pred = current_model.predict(X_train)
-test_pred = current_model.predict(X_test)
+# החיזויים ששמר המאמן ליד model.pkl - חיזוי מחדש רק אם המודל או הנתונים השתנו
+train_pred = split_predictions('outputs/model.pkl', model_data, context, 'train')
+test_pred = split_predictions('outputs/model.pkl', model_data, context, 'test')
 
 train_rmse = np.sqrt(mean_squared_error(y_train, train_pred))
 test_rmse = np.sqrt(mean_squared_error(y_test, test_pred))
@@ -63,7 +67,7 @@ print("-" * 60)
 if hasattr(current_model, 'feature_importances_'):
     importances = current_model.feature_importances_
     feat_imp = pd.DataFrame({
-        'feature': X.columns,
+        'feature': context.feature_names,
         'importance': importances
     }).sort_values('importance', ascending=False)
 
@@ -93,8 +97,11 @@ param_grid_rf = {
     'min_samples_leaf': [1, 2]
 }
 
+# המקביליות היא ברמת החיפוש: כל עובד מחובר ל-X_train בזיכרון משותף (core.shared_cv)
+# ומאמן יער אחד עם n_jobs=1 - הזיכרון לא מוכפל במספר העובדים. ההתאמה הסופית
+# של המועמד הנבחר רצה בתהליך הראשי על כל הליבות
 rf_tuned = RandomForestRegressor(random_state=42, n_jobs=-1)
-grid_rf = GridSearchCV(rf_tuned, param_grid_rf, cv=3, scoring='neg_root_mean_squared_error', n_jobs=-1, verbose=0)
+grid_rf = make_search(rf_tuned, param_grid_rf, resource='n_estimators')
 grid_rf.fit(X_train, y_train)
 
 print(f"\nBest params: {grid_rf.best_params_}")
@@ -118,7 +125,7 @@ param_grid_gb = {
 }
 
 gb_tuned = GradientBoostingRegressor(random_state=42)
-grid_gb = GridSearchCV(gb_tuned, param_grid_gb, cv=3, scoring='neg_root_mean_squared_error', n_jobs=-1, verbose=0)
+grid_gb = make_search(gb_tuned, param_grid_gb, resource='n_samples', default='staged')
 grid_gb.fit(X_train, y_train)
 
 print(f"\nBest params: {grid_gb.best_params_}")
@@ -149,24 +156,27 @@ print(f"R2: {best_idx['R2']:.4f}")
 
 # Save best model
 if best_idx['Model'] == 'RF Tuned':
-    best_model = rf_best
+    best_model, best_test_pred = rf_best, rf_pred
 elif best_idx['Model'] == 'GB Tuned':
-    best_model = gb_best
+    best_model, best_test_pred = gb_best, gb_pred
 else:
-    best_model = current_model
+    best_model, best_test_pred = current_model, test_pred
+best_train_pred = train_pred if best_model is current_model else best_model.predict(X_train)
 
 improved_data = {
     'model': best_model,
     'scaler': model_data.get('scaler'),
     'model_name': best_idx['Model'],
     'metrics': {
-        'train_rmse': np.sqrt(mean_squared_error(y_train, best_model.predict(X_train))),
+        'train_rmse': np.sqrt(mean_squared_error(y_train, best_train_pred)),
         'test_rmse': best_idx['RMSE'],
         'test_r2': best_idx['R2']
-    }
+    },
+    **context.schema
 }
 
-joblib.dump(improved_data, 'outputs/model_improved.pkl')
+save_bundle(improved_data, 'outputs/model_improved.pkl')
+save_predictions('outputs/model_improved.pkl', trainer_predictions(context, best_train_pred, best_test_pred))
 print("\nSaved: outputs/model_improved.pkl")
 
 # Visualizations
@@ -0,0 +1,253 @@
+"""
+Prediction Server - שירות HTTP לחיזוי מחירי דירות עם micro-batching
+
+אפליקציית ASGI (ללא תלות ב-framework) שטוענת את outputs/model.pkl פעם אחת.
+בקשות שמגיעות במקביל מאוחדות ל-batch אחד לפני model.predict - מודלי עצים
+זולים בהרבה לשורה כשהם חוזים ב-batch.
+
+הרצה:
+    uvicorn app.prediction_server:app --host 0.0.0.0 --port 8000
+
+Endpoints:
+    POST /predict  - גוף: רשומה אחת, רשימת רשומות, או {"listings": [...]}
+    GET  /health   - מצב השירות ושם המודל
+"""
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# הוספת נתיב הפרויקט
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from core.features import BASE_COLUMNS
+from core.predictor import Predictor
+
+MODEL_PATH = os.environ.get("MODEL_PATH", "outputs/model.pkl")
+CITY_MAPPING_PATH = os.environ.get("CITY_MAPPING_PATH", "outputs/city_mapping.json")
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "256"))
+MAX_WAIT_MS = float(os.environ.get("MAX_WAIT_MS", "2"))
+
+REQUIRED_FIELDS = ['City'] + BASE_COLUMNS
+
+
+class MicroBatcher:
+    """מאחד בקשות חיזוי מקבילות ל-batch אחד (עד max_batch_size שורות או max_wait_ms)"""
+
+    def __init__(self, predictor, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = asyncio.Queue()
+        # thread יחיד - החיזוי לא חוסם את ה-event loop ולא רץ במקביל לעצמו
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, records):
+        """מחכה לחיזוי של הרשומות (כחלק מ-batch משותף)"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+        return await future
+
+    def _predict_records(self, records):
+        columns = {field: [record[field] for record in records] for field in REQUIRED_FIELDS}
+        return self.predictor.predict(columns)
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            records = [record for batch_records, _ in batch for record in batch_records]
+            try:
+                predictions = await loop.run_in_executor(self._executor, self._predict_records, records)
+            except Exception as e:
+                if len(batch) > 1:
+                    # בקשה אחת שנכשלה לא מכשילה את הבקשות שאוחדו איתה
+                    await self._predict_each(batch)
+                else:
+                    _set_exception(batch[0][1], e)
+                continue
+
+            offset = 0
+            for batch_records, future in batch:
+                if not future.done():
+                    future.set_result(predictions[offset:offset + len(batch_records)].tolist())
+                offset += len(batch_records)
+
+    async def _predict_each(self, batch):
+        loop = asyncio.get_running_loop()
+        for records, future in batch:
+            try:
+                predictions = await loop.run_in_executor(self._executor, self._predict_records, records)
+            except Exception as e:
+                _set_exception(future, e)
+                continue
+            if not future.done():
+                future.set_result(predictions.tolist())
+
+
+def _set_exception(future, error):
+    if not future.done():
+        future.set_exception(error)
+
+
+def _parse_listings(payload, cities=None):
+    """
+    מחזיר (רשימת רשומות, האם זו בקשה לרשומה בודדת).
+    cities: הערים שהמודל מכיר - עיר אחרת נדחית במקום להיות מקודדת כ-1-.
+    """
+    if isinstance(payload, dict) and 'listings' in payload:
+        payload = payload['listings']
+    single = isinstance(payload, dict)
+    records = [payload] if single else payload
+    if not isinstance(records, list) or not records:
+        raise ValueError("הגוף חייב להיות רשומה, רשימת רשומות או {\"listings\": [...]}")
+
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f"רשומה {i} אינה אובייקט JSON")
+        missing = [field for field in REQUIRED_FIELDS if field not in record]
+        if missing:
+            raise ValueError(f"ברשומה {i} חסרים שדות: {missing}")
+        if not isinstance(record['City'], str):
+            raise ValueError(f"ברשומה {i} השדה City חייב להיות מחרוזת")
+        if cities is not None and record['City'] not in cities:
+            raise ValueError(f"ברשומה {i} העיר {record['City']} לא מוכרת למודל")
+        for field in BASE_COLUMNS:
+            if not isinstance(record[field], (int, float)) or isinstance(record[field], bool):
+                raise ValueError(f"ברשומה {i} השדה {field} חייב להיות מספר")
+    return records, single
+
+
+class PredictionApp:
+    """אפליקציית ASGI - טוענת את המודל פעם אחת ומגישה חיזויים"""
+
+    def __init__(self, model_path=MODEL_PATH, city_mapping_path=CITY_MAPPING_PATH):
+        self.model_path = model_path
+        self.city_mapping_path = city_mapping_path
+        self.batcher = None
+        self.cities = None
+
+    def _ensure_loaded(self):
+        if self.batcher is None:
+            predictor = Predictor.from_paths(self.model_path, self.city_mapping_path).limit_threads()
+            self.batcher = MicroBatcher(predictor)
+            categories = predictor.transformer.city_categories_
+            self.cities = frozenset(categories) if categories is not None else None
+        self.batcher.start()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    self._ensure_loaded()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.batcher is not None:
+                    await self.batcher.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        method, path = scope['method'], scope['path']
+        if path == '/health' and method == 'GET':
+            self._ensure_loaded()
+            await _send_json(send, 200, {
+                'status': 'ok',
+                'model_name': self.batcher.predictor.model_data.get('model_name')
+            })
+            return
+        if path != '/predict':
+            await _send_json(send, 404, {'error': 'not found'})
+            return
+        if method != 'POST':
+            await _send_json(send, 405, {'error': 'method not allowed'})
+            return
+
+        self._ensure_loaded()
+        try:
+            records, single = _parse_listings(json.loads(await _read_body(receive)), self.cities)
+        except (ValueError, UnicodeDecodeError) as e:
+            await _send_json(send, 400, {'error': str(e)})
+            return
+
+        try:
+            predictions = await self.batcher.submit(records)
+        except Exception as e:
+            await _send_json(send, 500, {'error': str(e)})
+            return
+
+        if single:
+            await _send_json(send, 200, {'prediction': predictions[0]})
+        else:
+            await _send_json(send, 200, {'predictions': predictions})
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body', False):
+            return body
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json; charset=utf-8'),
+                    (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = PredictionApp()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8000")))
@@ -9,13 +9,10 @@ warnings.filterwarnings('ignore', message='.*version.*when using version.*')
 
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import json
 import os
 import sys
-import joblib
 from datetime import datetime
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
@@ -30,6 +27,26 @@ from io import BytesIO
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+from core.artifact_cache import load_json, load_model, load_table, load_table_columns, load_text
+from core.correlation import load_correlations
+from core.summary_stats import load_summary
+from core.features import HousingFeatureTransformer
+from core.geo import geo_view
+from core.model_bundle import prepare_features
+from core.storage import table_exists
+
+# מצבי תצוגה של המפה הגיאוגרפית (ראו core.geo)
+GEO_VIEW_MODES = {
+    "אוטומטי": 'auto',
+    "תאים משושים": 'hex',
+    "תאי רשת": 'grid',
+    "מדגם מרובד": 'sample',
+    "כל הנקודות": 'points',
+}
+
+# ערים זמינות לחיזוי
+CITIES = ["תל אביב", "ירושלים", "חיפה", "באר שבע", "רמת גן", "אשדוד", "נתניה", "בני ברק", "חולון", "רעננה"]
+
 # קונפיגורציה
 st.set_page_config(
     page_title="House Price Prediction 🏠",
@@ -83,11 +100,10 @@ st.markdown("""
 def check_outputs_exist():
     """בודק אם קיימים קבצי output"""
     required_files = [
-        "outputs/clean_data.csv",
         "outputs/model.pkl",
         "outputs/dataset_contract.json"
     ]
-    return all(os.path.exists(f) for f in required_files)
+    return table_exists("outputs/clean_data.csv") and all(os.path.exists(f) for f in required_files)
 
 
 def load_data():
@@ -95,23 +111,23 @@ def load_data():
     try:
         data = {}
 
+        # כל הקבצים נטענים דרך מטמון התוצרים - נקראים מהדיסק רק כשהם משתנים
+
         # נתונים מנוקים
-        if os.path.exists("outputs/clean_data.csv"):
-            data['clean_data'] = pd.read_csv("outputs/clean_data.csv")
+        if table_exists("outputs/clean_data.csv"):
+            data['clean_data'] = load_table("outputs/clean_data.csv")
 
-        # פיצ'רים
-        if os.path.exists("outputs/features.csv"):
-            data['features'] = pd.read_csv("outputs/features.csv")
+        # פיצ'רים - רק שמות העמודות נדרשים כאן
+        if table_exists("outputs/features.csv"):
+            data['feature_columns'] = load_table_columns("outputs/features.csv")
 
         # Dataset contract
         if os.path.exists("outputs/dataset_contract.json"):
-            with open("outputs/dataset_contract.json", 'r', encoding='utf-8') as f:
-                data['contract'] = json.load(f)
+            data['contract'] = load_json("outputs/dataset_contract.json")
 
         # השוואת מודלים
         if os.path.exists("outputs/all_models_comparison.json"):
-            with open("outputs/all_models_comparison.json", 'r', encoding='utf-8') as f:
-                data['model_comparison'] = json.load(f)
+            data['model_comparison'] = load_json("outputs/all_models_comparison.json")
 
         # מודל
         if os.path.exists("outputs/model.pkl"):
@@ -120,7 +136,7 @@ def load_data():
                 warnings.simplefilter('ignore')
                 try:
                     # ניסיון טעינה רגילה עם joblib
-                    model_data = joblib.load("outputs/model.pkl")
+                    model_data = load_model("outputs/model.pkl")
                     
                     # בדיקה שהנתונים שנטענו הם dict
                     if isinstance(model_data, dict):
@@ -157,18 +173,15 @@ def load_data():
 
         # תובנות
         if os.path.exists("outputs/insights.md"):
-            with open("outputs/insights.md", 'r', encoding='utf-8') as f:
-                data['insights'] = f.read()
+            data['insights'] = load_text("outputs/insights.md")
 
         # דוח הערכה
         if os.path.exists("outputs/evaluation_report.md"):
-            with open("outputs/evaluation_report.md", 'r', encoding='utf-8') as f:
-                data['evaluation'] = f.read()
+            data['evaluation'] = load_text("outputs/evaluation_report.md")
 
         # Model Card
         if os.path.exists("outputs/model_card.md"):
-            with open("outputs/model_card.md", 'r', encoding='utf-8') as f:
-                data['model_card'] = f.read()
+            data['model_card'] = load_text("outputs/model_card.md")
 
         return data
 
@@ -215,7 +228,7 @@ def home_page():
     with col2:
         st.metric(
             label="🔢 פיצ'רים",
-            value=len(data['features'].columns) if 'features' in data else "N/A"
+            value=len(data['feature_columns']) if 'feature_columns' in data else "N/A"
         )
 
     with col3:
@@ -337,7 +350,8 @@ def data_exploration_page():
 
     # סטטיסטיקות
     st.subheader("📋 סטטיסטיקות תיאוריות")
-    st.dataframe(df.describe(), use_container_width=True)
+    # מהסיכום המצטבר שנשמר בשלב הסטטיסטיקות (אחוזונים משוערים)
+    st.dataframe(load_summary("outputs/clean_data.csv", "outputs").describe(), use_container_width=True)
 
     # ויזואליזציות
     st.subheader("📈 ויזואליזציות")
@@ -360,24 +374,45 @@ def data_exploration_page():
         if price_col is None:
             st.warning("לא נמצאה עמודת מחיר בנתונים")
             return
-        
-        fig = px.scatter(
-            df,
-            x='Longitude',
-            y='Latitude',
-            color=price_col,
-            size=pop_col if pop_col else None,
-            hover_data=hover_cols if hover_cols else None,
-            title='מיקום דירות בישראל',
-            color_continuous_scale='Viridis',
-            labels={price_col: 'מחיר (מיליוני ש"ח)' if price_col == 'Price_Millions' else 'מחיר ($100k)', 
-                   pop_col: 'אוכלוסייה' if pop_col else None}
-        )
+
+        # מעל 20,000 דירות המפה מצוירת מתאים או ממדגם - גודל הגרף חסום
+        view_label = st.radio("תצוגה:", list(GEO_VIEW_MODES), horizontal=True)
+        view, mode = geo_view(df, GEO_VIEW_MODES[view_label], value=price_col)
+
+        if mode in ('hex', 'grid'):
+            fig = px.scatter(
+                view,
+                x='Longitude',
+                y='Latitude',
+                color=f'{price_col}_median',
+                size='count',
+                hover_data=['count', f'{price_col}_mean', f'{price_col}_min', f'{price_col}_max'],
+                title=f'מיקום דירות בישראל - מחיר חציוני לתא ({len(view):,} תאים, {len(df):,} דירות)',
+                color_continuous_scale='Viridis',
+                labels={f'{price_col}_median': 'מחיר חציוני', 'count': 'דירות'}
+            )
+            fig.update_traces(marker_symbol='hexagon' if mode == 'hex' else 'square')
+        else:
+            if mode == 'sample':
+                st.caption(f"מדגם מרובד של {len(view):,} מתוך {len(df):,} דירות")
+            fig = px.scatter(
+                view,
+                x='Longitude',
+                y='Latitude',
+                color=price_col,
+                size=pop_col if pop_col else None,
+                hover_data=hover_cols if hover_cols else None,
+                title='מיקום דירות בישראל',
+                color_continuous_scale='Viridis',
+                labels={price_col: 'מחיר (מיליוני ש"ח)' if price_col == 'Price_Millions' else 'מחיר ($100k)', 
+                       pop_col: 'אוכלוסייה' if pop_col else None}
+            )
         st.plotly_chart(fig, config={'displayModeBar': True, 'responsive': True})
 
     elif viz_type == "מטריצת קורלציות":
         st.write("**קורלציות בין משתנים**")
-        corr_matrix = df.corr()
+        # המטריצה שחושבה בשלב הסטטיסטיקות - לא מחושבת מחדש בכל רינדור
+        corr_matrix, _ = load_correlations("outputs/clean_data.csv", "outputs")
         fig = px.imshow(
             corr_matrix,
             title='מטריצת קורלציות',
@@ -635,7 +670,7 @@ def prediction_page():
     col1, col2 = st.columns(2)
 
     with col1:
-        city = st.selectbox("עיר", ["תל אביב", "ירושלים", "חיפה", "באר שבע", "רמת גן", "אשדוד", "נתניה", "בני ברק", "חולון", "רעננה"])
+        city = st.selectbox("עיר", CITIES)
         size_sqm = st.slider("גודל (מ\"ר)", 40, 200, 100, 5)
         rooms = st.slider("מספר חדרים", 2, 6, 4, 1)
         floor = st.slider("קומה", 0, 15, 3, 1)
@@ -670,87 +705,29 @@ def prediction_page():
         city_coords = cities_coords.get(city, {'lat': 32.0, 'lon': 34.8})
         age = 2024 - year_built
         
-        # יצירת DataFrame עם הקלט
-        input_data = pd.DataFrame({
-            'City': [city],
-            'Size_sqm': [size_sqm],
-            'Rooms': [rooms],
-            'Floor': [floor],
-            'YearBuilt': [year_built],
-            'Age': [age],
-            'DistanceSea_km': [distance_sea],
-            'DistanceCenter_km': [distance_center],
-            'Population': [population],
-            'AvgIncome': [avg_income]
-        })
-
-        # הנדסת פיצ'רים (אותם פיצ'רים כמו באימון - מותאם לישראל)
-        # הסרנו price_per_sqm - זה data leakage
-        input_data['rooms_per_size'] = input_data['Rooms'] / (input_data['Size_sqm'] + 0.001)
-        input_data['income_per_size'] = input_data['AvgIncome'] / (input_data['Size_sqm'] + 0.001)
-
-        # פיצ'רי מרחק (ללא שימוש ב-Latitude/Longitude)
-        input_data['sea_proximity_score'] = 1 / (input_data['DistanceSea_km'] + 1)
-        input_data['center_proximity_score'] = 1 / (input_data['DistanceCenter_km'] + 1)
-        input_data['log_avg_income'] = np.log1p(input_data['AvgIncome'])
-
-        # קטגוריית הכנסה
-        if avg_income <= 10:
-            income_cat = 0
-        elif avg_income <= 15:
-            income_cat = 1
-        else:
-            income_cat = 2
-        input_data['income_category_encoded'] = income_cat
-
-        # קטגוריית גיל
-        if age <= 10:
-            age_cat = 0
-        elif age <= 30:
-            age_cat = 1
-        else:
-            age_cat = 2
-        input_data['age_category_encoded'] = age_cat
-
-        input_data['income_per_room'] = input_data['AvgIncome'] * input_data['Rooms']
-        input_data['size_income'] = input_data['Size_sqm'] * input_data['AvgIncome']
-        input_data['city_size_interaction'] = input_data['Size_sqm'] * input_data['Rooms']
-        input_data['age_size_interaction'] = input_data['Age'] * input_data['Size_sqm']
+        # רשומת הקלט (ללא בניית DataFrame)
+        record = {
+            'City': city,
+            'Size_sqm': size_sqm,
+            'Rooms': rooms,
+            'Floor': floor,
+            'YearBuilt': year_built,
+            'Age': age,
+            'DistanceSea_km': distance_sea,
+            'DistanceCenter_km': distance_center,
+            'Population': population,
+            'AvgIncome': avg_income
+        }
 
-        # המרת City ל-City_encoded (כמו באימון)
-        # טעינת מיפוי הערים
+        # הנדסת פיצ'רים - אותה טרנספורמציה בדיוק כמו באימון (core.features)
         try:
-            with open("outputs/city_mapping.json", 'r', encoding='utf-8') as f:
-                city_mapping = json.load(f)
-            input_data['City_encoded'] = city_mapping.get(city, 0)
-        except:
-            # אם אין מיפוי, נשתמש בקידוד פשוט
-            cities_list = ["תל אביב", "ירושלים", "חיפה", "באר שבע", "רמת גן", "אשדוד", "נתניה", "בני ברק", "חולון", "רעננה"]
-            input_data['City_encoded'] = cities_list.index(city) if city in cities_list else 0
-
-        # הסרת עמודות לא מספריות (City) וקווי האורך והרוחב לפני החיזוי
-        input_data_numeric = input_data.select_dtypes(include=[np.number])
-
-        # חיזוי - צריך לוודא שהעמודות תואמות למודל
-        # נטען את features.csv כדי לראות את המבנה
-        try:
-            features_df = pd.read_csv("outputs/features.csv")
-            # נסיר רק את עמודת המחיר
-            excluded_cols = ['Price_Millions']
-            feature_columns = [col for col in features_df.columns if col not in excluded_cols]
-            # נוודא שיש לנו את כל העמודות
-            for col in feature_columns:
-                if col not in input_data_numeric.columns:
-                    # אם חסר, נוסיף ערך ברירת מחדל
-                    input_data_numeric[col] = 0
-            
-            # נשתמש רק בעמודות שקיימות במודל
-            input_for_prediction = input_data_numeric[feature_columns]
-        except Exception as e:
-            st.error(f"שגיאה בהכנת הנתונים: {str(e)}")
-            # נשתמש בכל העמודות המספריות
-            input_for_prediction = input_data_numeric
-        
+            city_mapping = load_json("outputs/city_mapping.json")
+            transformer = HousingFeatureTransformer(city_categories=sorted(city_mapping, key=city_mapping.get))
+        except Exception:
+            # אם אין מיפוי, נשתמש בקידוד פשוט לפי רשימת הערים
+            transformer = HousingFeatureTransformer(city_categories=CITIES)
+        input_data_numeric = transformer.transform_frame(record)
+
         # חיזוי
         # בדיקה ש-model_data הוא dict לפני שימוש ב-get()
         if not isinstance(data['model_data'], dict):
@@ -764,6 +741,13 @@ def prediction_page():
             st.error("❌ המודל לא זמין. אנא אמן מחדש את המודל.")
             return
 
+        # סידור העמודות לפי סכמת הפיצ'רים השמורה במודל (ללא קריאת features.csv)
+        try:
+            input_for_prediction = prepare_features(data['model_data'], input_data_numeric)
+        except Exception as e:
+            st.error(f"שגיאה בהכנת הנתונים: {str(e)}")
+            return
+
         # דיכוי אזהרות בעת חיזוי
         with warnings.catch_warnings():
             warnings.simplefilter('ignore')
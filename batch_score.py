@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Batch Scoring - חיזוי מחירים לקובץ דירות גדול (CSV או Parquet)
+
+הקובץ נקרא במנות בגודל קבוע, כל מנה עוברת את טרנספורמציית הפיצ'רים
+המשותפת ואת model.pkl בתהליך עובד נפרד, והתוצאות נכתבות לקובץ הפלט
+בהדרגה ולפי הסדר. הזיכרון חסום ל-(מספר עובדים x 2) מנות בכל רגע.
+
+שימוש:
+    python batch_score.py listings.csv predictions.csv
+    python batch_score.py listings.parquet predictions.parquet --chunk-size 200000 --workers 8
+"""
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# הוספת נתיב הפרויקט
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.features import BASE_COLUMNS
+from core.predictor import Predictor
+
+PREDICTION_COLUMN = 'predicted_price'
+
+# Predictor של תהליך העובד - נטען פעם אחת ב-initializer
+_worker_predictor = None
+
+
+def _init_worker(model_path, city_mapping_path, mmap):
+    global _worker_predictor
+    _worker_predictor = Predictor.from_paths(model_path, city_mapping_path, mmap=mmap).limit_threads()
+
+
+def _score_chunk(chunk):
+    return _worker_predictor.predict(chunk)
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def iter_chunks(path, columns, chunk_size):
+    """קורא את קובץ הקלט במנות של chunk_size שורות (רק העמודות הנדרשות)"""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        available = set(parquet_file.schema_arrow.names)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size,
+                                               columns=[c for c in columns if c in available]):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=lambda col: col in columns, chunksize=chunk_size)
+
+
+class PredictionWriter:
+    """כותב תוצאות לקובץ הפלט בהדרגה (CSV או Parquet)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet_writer = None
+        self._header_written = False
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a' if self._header_written else 'w',
+                         header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(input_path, output_path, model_path="outputs/model.pkl",
+               city_mapping_path="outputs/city_mapping.json", chunk_size=100_000,
+               workers=None, id_column=None, mmap=True):
+    """
+    מריץ חיזוי על כל הקובץ ומחזיר (מספר שורות, שורות לשנייה).
+    mmap=True: כל עובד פותח רק את ה-header ואת מערכי העצים (ממופים מהדיסק,
+    משותפים לכל העובדים), ומודל sklearn נפרק בעובד רק כשמגיעה אליו מנה
+    גדולה מ-CompiledEnsemble.suits. mmap=False: כל עובד קורא את המודל המלא
+    לזיכרון משלו. בשני המצבים מנות גדולות עוברות דרך מודל sklearn, ורק מנות
+    קטנות דרך המנוע המהודר.
+    """
+    workers = workers or os.cpu_count() or 1
+    columns = set(BASE_COLUMNS) | {'City'}
+    if id_column:
+        columns.add(id_column)
+
+    writer = PredictionWriter(output_path)
+    pending = deque()
+    max_in_flight = workers * 2
+    rows_done = 0
+    start_time = time.time()
+
+    def flush(item):
+        nonlocal rows_done
+        ids, future = item
+        result = pd.DataFrame({PREDICTION_COLUMN: future.result()})
+        result.insert(0, id_column or 'row_id', ids)
+        writer.write(result)
+        rows_done += len(result)
+        elapsed = time.time() - start_time
+        print(f"  {rows_done:,} שורות | {rows_done / max(elapsed, 1e-9):,.0f} שורות/שנייה")
+
+    offset = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path, city_mapping_path, mmap)) as pool:
+            for chunk in iter_chunks(input_path, columns, chunk_size):
+                ids = chunk[id_column].to_numpy() if id_column else range(offset, offset + len(chunk))
+                offset += len(chunk)
+                pending.append((ids, pool.submit(_score_chunk, chunk)))
+                # שמירה על זיכרון חסום - כותבים לפני שקוראים עוד מנות
+                while len(pending) >= max_in_flight:
+                    flush(pending.popleft())
+            while pending:
+                flush(pending.popleft())
+    finally:
+        writer.close()
+
+    elapsed = time.time() - start_time
+    return rows_done, rows_done / max(elapsed, 1e-9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="חיזוי מחירים לקובץ דירות גדול")
+    parser.add_argument("input", help="קובץ קלט (CSV או Parquet)")
+    parser.add_argument("output", help="קובץ פלט (CSV או Parquet)")
+    parser.add_argument("--model", default="outputs/model.pkl")
+    parser.add_argument("--city-mapping", default="outputs/city_mapping.json")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None, help="ברירת מחדל: כל הליבות")
+    parser.add_argument("--id-column", default=None, help="עמודת מזהה שתועתק לפלט")
+    parser.add_argument("--no-mmap", action="store_true",
+                        help="טעינת מודל sklearn המלא בכל עובד במקום מערכי העצים ב-mmap")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Batch scoring: {args.input} -> {args.output}")
+    print("=" * 60)
+
+    rows, rate = score_file(args.input, args.output, args.model, args.city_mapping,
+                            args.chunk_size, args.workers, args.id_column, mmap=not args.no_mmap)
+
+    print("=" * 60)
+    print(f"הושלם: {rows:,} שורות ({rate:,.0f} שורות/שנייה)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,12 @@ import os
 import sys
 import joblib
 import pickle
+import time
 import numpy as np
 
+from core.model_bundle import header_path, load_bundle
+from core.prediction_cache import load_predictions, predictions_path, split_rmse
+
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 print("="*60)
@@ -45,5 +49,32 @@ try:
 except Exception as e:
     print(f"   ERROR: {str(e)}")
 
+print("\n3. Trying load_bundle (mmap)...")
+try:
+    start = time.perf_counter()
+    data = load_bundle("outputs/model.pkl")
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"   Header file: {os.path.exists(header_path('outputs/model.pkl'))}")
+    print(f"   Model name: {data.get('model_name')}")
+    print(f"   Compiled engine: {data.get('compiled_model') is not None}")
+    print(f"   sklearn model unpickled: {getattr(data, 'model_loaded', True)}")
+    print(f"   Load time: {elapsed:.1f} ms")
+except Exception as e:
+    print(f"   ERROR: {str(e)}")
+
+print("\n4. Cached trainer predictions...")
+try:
+    cached = load_predictions("outputs/model.pkl")
+    print(f"   Predictions file: {os.path.exists(predictions_path('outputs/model.pkl'))}")
+    if cached is None:
+        print("   Valid: False (missing, or model.pkl was saved since)")
+    else:
+        print(f"   Data hash: {cached['data_hash'][:16]}")
+        for split in ('train', 'test', 'oof'):
+            if split in cached:
+                print(f"   {split:5s}: {len(cached[split])} rows, RMSE {split_rmse(cached, split):.4f}")
+except Exception as e:
+    print(f"   ERROR: {str(e)}")
+
 print("\n" + "="*60)
 
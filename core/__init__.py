@@ -0,0 +1,4 @@
+"""Core - לוגיקה משותפת לאימון, ל-Dashboard ולחיזוי"""
+from .features import HousingFeatureTransformer
+
+__all__ = ["HousingFeatureTransformer"]
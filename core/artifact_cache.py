@@ -0,0 +1,95 @@
+"""
+Artifact Cache - מטמון לקבצי תוצרים (נתונים, מודל, דוחות)
+
+כל קובץ נטען פעם אחת לכל תהליך ונשמר בזיכרון. המפתח הוא הנתיב יחד עם
+mtime וגודל הקובץ, כך שהמטמון מתבטל רק כשהקובץ בדיסק משתנה (למשל אחרי
+אימון מחדש). האובייקטים המוחזרים משותפים - אין לשנות אותם במקום.
+"""
+import json
+import os
+import threading
+
+import pandas as pd
+
+from .model_bundle import load_bundle
+from .storage import read_table, read_table_columns, resolve_table
+
+
+def file_signature(path):
+    """חתימת קובץ: (mtime בננו-שניות, גודל בבתים)"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ArtifactCache:
+    """מטמון thread-safe של קבצים טעונים, לפי נתיב + חתימת קובץ"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load(self, path, loader):
+        """מחזיר את loader(path) מהמטמון, או טוען מחדש אם הקובץ השתנה"""
+        key = (os.path.abspath(path), getattr(loader, '__qualname__', repr(loader)))
+        signature = file_signature(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+
+        # טעינה מחוץ לנעילה - קבצים גדולים לא חוסמים קריאות אחרות
+        value = loader(path)
+        with self._lock:
+            self._entries[key] = (signature, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+# מטמון ברירת מחדל - אחד לכל תהליך
+artifact_cache = ArtifactCache()
+
+
+def load_csv(path):
+    return artifact_cache.load(path, pd.read_csv)
+
+
+def load_table(path):
+    """טבלת נתונים (parquet אם קיים, אחרת CSV)"""
+    resolved = resolve_table(path)
+    if resolved is None:
+        raise FileNotFoundError(f"הטבלה לא נמצאה: {path}")
+    return artifact_cache.load(resolved, read_table)
+
+
+def load_table_columns(path):
+    resolved = resolve_table(path)
+    if resolved is None:
+        raise FileNotFoundError(f"הטבלה לא נמצאה: {path}")
+    return artifact_cache.load(resolved, read_table_columns)
+
+
+def load_json(path):
+    return artifact_cache.load(path, _read_json)
+
+
+def load_text(path):
+    return artifact_cache.load(path, _read_text)
+
+
+def load_model(path):
+    """bundle של מודל (ב-mmap כשנשמר ב-save_bundle)"""
+    return artifact_cache.load(path, load_bundle)
@@ -0,0 +1,386 @@
+"""
+Data Cleaning - ניקוי טבלת הנתונים הגולמית, בזיכרון או בזרימה (streaming)
+
+שני המסלולים מבצעים את אותן פעולות ומחזירים את אותן סטטיסטיקות לחוזה:
+    1. ספירת ערכים חסרים לכל עמודה
+    2. החלפת inf ב-NaN
+    3. פרופיל outliers בשיטת IQR: גבולות, ספירה לכל עמודה מספרית ומספר
+       השורות שיש בהן לפחות ערך חריג אחד
+    4. מחיקת שורות עם ערכים חסרים
+
+המסלול הזורם קורא את הקובץ במנות ולא מחזיק אותו בזיכרון:
+    מעבר 1 - ספירות, טיפוסי עמודות וסקיצת קוונטילים ניתנת למיזוג לכל עמודה
+    מעבר 2 - כתיבת הנתונים המנוקים בהדרגה, ואיסוף הערכים שבטווח צר סביב
+             הקוונטילים המשוערים ו-גבולות ה-IQR המשוערים
+    מעבר 3 - ספירת השורות החריגות לפי הגבולות המדויקים (עמודות מספריות בלבד)
+מתוך הערכים שנאספו מחושבים Q1/Q3 וספירת ה-outliers המדויקים - זהים
+למסלול שבזיכרון (pandas.quantile). אם טווח משוער לא הכיל את הקוונטיל
+האמיתי (נדיר), הטווח מורחב ומתבצע מעבר נוסף לעמודות האלה בלבד.
+"""
+import numpy as np
+import pandas as pd
+
+from .quantile_sketch import QuantileSketch
+from .storage import TableWriter, iter_table, table_size
+
+IQR_QUANTILES = (0.25, 0.75)
+IQR_MULTIPLIER = 1.5
+
+DEFAULT_CHUNK_SIZE = 100_000
+# מעל גודל זה (בבתים) הניקוי עובר אוטומטית למסלול הזורם
+STREAMING_THRESHOLD_BYTES = 256 * 1024 ** 2
+
+# רוחב הטווח (בדירוג יחסי) סביב כל קוונטיל משוער, והרחבתו בניסיון חוזר
+BRACKET_MARGIN = 0.005
+BRACKET_GROWTH = 4
+
+
+def should_stream(path, threshold=STREAMING_THRESHOLD_BYTES):
+    return table_size(path) > threshold
+
+
+def _is_numeric(dtype):
+    """כמו select_dtypes(include=[np.number]) - בלי bool"""
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _iqr_fences(q1, q3):
+    iqr = q3 - q1
+    return q1 - IQR_MULTIPLIER * iqr, q3 + IQR_MULTIPLIER * iqr
+
+
+def _linear_quantile(previous, following, count, q):
+    """
+    אינטרפולציית linear של NumPy/pandas בין שני הערכים הסדורים הסמוכים -
+    אותו חישוב בדיוק כמו np.quantile (כולל ההיפוך ל-gamma >= 0.5).
+    """
+    virtual = (np.asarray(count, dtype=np.float64) - 1) * q
+    gamma = virtual - np.floor(virtual)
+    diff = following - previous
+    return np.where(gamma >= 0.5, following - diff * (1 - gamma), previous + diff * gamma)
+
+
+def _order_positions(count, q):
+    """מיקומי שני הערכים הסדורים שביניהם נמצא הקוונטיל q"""
+    previous = np.floor((count - 1) * q).astype(np.intp)
+    return previous, np.minimum(previous + 1, count - 1)
+
+
+class OutlierProfile:
+    """
+    פרופיל IQR של כל העמודות המספריות בבת אחת.
+
+    columns, q1, q3, lower, upper - מערכים לפי סדר העמודות
+    mask     - מטריצה בוליאנית (עמודות x שורות): האם הערך חריג
+    counts   - מספר הערכים החריגים בכל עמודה
+    row_mask - שורות שיש בהן לפחות ערך חריג אחד
+    """
+
+    def __init__(self, columns, q1, q3, mask):
+        self.columns = list(columns)
+        self.q1 = q1
+        self.q3 = q3
+        self.lower, self.upper = _iqr_fences(q1, q3)
+        self.mask = mask
+        self.counts = mask.sum(axis=1)
+        self.row_mask = mask.any(axis=0)
+
+    def outlier_counts(self):
+        """{עמודה: מספר outliers} לעמודות שיש בהן outliers"""
+        return {col: int(n) for col, n in zip(self.columns, self.counts) if n > 0}
+
+    def bounds(self):
+        return _bounds_report(self.columns, self.lower, self.upper)
+
+
+def _bounds_report(columns, lower, upper):
+    """גבולות IQR לחוזה (עמודות בלי ערכים - NaN - לא נכללות)"""
+    return {
+        col: {"lower": float(lo), "upper": float(hi)}
+        for col, lo, hi in zip(columns, lower, upper)
+        if np.isfinite(lo) and np.isfinite(hi)
+    }
+
+
+def profile_outliers(df):
+    """
+    Q1/Q3, גבולות ומסכות outliers לכל העמודות המספריות במעבר NumPy אחד.
+    כל עמודה היא שורה רציפה במטריצה, וכל המטריצה ממוינת בקריאה אחת (מיון
+    SIMD של NumPy מהיר כאן מ-partition). NaN ממוין לסוף, ולכן לכל עמודה
+    הקוונטילים נלקחים מתוך n_valid הערכים הראשונים. זהה ל-df[col].quantile.
+    """
+    numeric = df.select_dtypes(include=[np.number])
+    columns = numeric.columns
+    values = np.ascontiguousarray(numeric.to_numpy(dtype=np.float64).T)
+    n_columns = values.shape[0]
+
+    ordered = np.sort(values, axis=1)
+    n_valid = values.shape[1] - np.isnan(values).sum(axis=1)
+    has_values = n_valid > 0
+    rows = np.arange(n_columns)
+
+    quartiles = []
+    for q in IQR_QUANTILES:
+        if values.shape[1] == 0:
+            quartiles.append(np.full(n_columns, np.nan))
+            continue
+        previous, following = _order_positions(np.maximum(n_valid, 1), q)
+        quartile = _linear_quantile(ordered[rows, previous], ordered[rows, following], n_valid, q)
+        quartiles.append(np.where(has_values, quartile, np.nan))
+    q1, q3 = quartiles
+
+    lower, upper = _iqr_fences(q1, q3)
+    # NaN בערך או בגבול לא מסומן כחריג - כמו ההשוואות ב-pandas
+    mask = (values < lower[:, None]) | (values > upper[:, None])
+    return OutlierProfile(columns, q1, q3, mask)
+
+
+def clean_frame(df):
+    """ניקוי בזיכרון - מחזיר (df מנוקה, סטטיסטיקות)"""
+    original_rows = len(df)
+
+    # 1. בדיקת ערכים חסרים
+    missing_values = df.isnull().sum()
+    missing_report = {col: int(n) for col, n in missing_values[missing_values > 0].items()}
+
+    # 2. טיפול ב-inf values
+    df = df.replace([np.inf, -np.inf], np.nan)
+
+    # 3. פרופיל outliers (IQR) לכל העמודות המספריות בבת אחת
+    profile = profile_outliers(df)
+
+    # 4. מחיקת שורות עם ערכים חסרים (אם יש)
+    df = df.dropna()
+
+    return df, {
+        "original_rows": original_rows,
+        "cleaned_rows": len(df),
+        "missing_values_found": missing_report,
+        "outliers_detected": profile.outlier_counts(),
+        "outlier_rows": int(profile.row_mask.sum()),
+        "outlier_bounds": profile.bounds(),
+    }
+
+
+def _merge_dtype(current, new):
+    """הטיפוס של העמודה בקריאה מלאה - כמו ש-pandas היה מסיק על כל הקובץ"""
+    if current is None or current == new:
+        return new
+    if isinstance(current, np.dtype) and isinstance(new, np.dtype) and _is_numeric(current) and _is_numeric(new):
+        return np.result_type(current, new)
+    return np.dtype(object)
+
+
+class _ColumnRefinement:
+    """טווחי איסוף לעמודה אחת: סביב Q1, Q3 ושני גבולות ה-IQR"""
+
+    def __init__(self, sketch, margin):
+        self.count = sketch.count
+        q1_lo, q1_hi, q3_lo, q3_hi = sketch.quantile([
+            max(IQR_QUANTILES[0] - margin, 0), min(IQR_QUANTILES[0] + margin, 1),
+            max(IQR_QUANTILES[1] - margin, 0), min(IQR_QUANTILES[1] + margin, 1),
+        ])
+        # כל צירוף של Q1/Q3 בתוך הטווחים נותן גבולות בתוך הטווחים האלה
+        lower_lo = q1_lo - IQR_MULTIPLIER * (q3_hi - q1_lo)
+        lower_hi = q1_hi - IQR_MULTIPLIER * (q3_lo - q1_hi)
+        upper_lo = q3_lo + IQR_MULTIPLIER * (q3_lo - q1_hi)
+        upper_hi = q3_hi + IQR_MULTIPLIER * (q3_hi - q1_lo)
+        # מרווח קטן לשגיאות עיגול בחישוב הגבולות
+        tol = 1e-9 * max(abs(lower_lo), abs(upper_hi), 1.0)
+        self.ranges = [
+            (q1_lo, q1_hi),
+            (q3_lo, q3_hi),
+            (lower_lo - tol, lower_hi + tol),
+            (upper_lo - tol, upper_hi + tol),
+        ]
+        self.below = [0] * 4
+        self.inside = [[] for _ in range(4)]
+        self.above_upper = 0
+
+    def update(self, values):
+        values = values[np.isfinite(values)]
+        for i, (lo, hi) in enumerate(self.ranges):
+            self.below[i] += int(np.count_nonzero(values < lo))
+            self.inside[i].append(values[(values >= lo) & (values <= hi)])
+        # מעל טווח הגבול העליון - outliers בוודאות
+        self.above_upper += int(np.count_nonzero(values > self.ranges[3][1]))
+
+    def resolve(self):
+        """(Q1, Q3, מספר outliers), או None אם הקוונטילים לא נפלו בטווחים"""
+        if self.count == 0:
+            # עמודה ללא ערכים - pandas מחזיר NaN וההשוואות לא מסמנות אף שורה
+            return np.nan, np.nan, 0
+        inside = [np.sort(np.concatenate(parts)) if parts else np.empty(0) for parts in self.inside]
+
+        quantiles = []
+        for i, q in enumerate(IQR_QUANTILES):
+            previous, following = (int(pos) for pos in _order_positions(self.count, q))
+            start = self.below[i]
+            if previous < start or following >= start + len(inside[i]):
+                return None
+            quantiles.append(float(_linear_quantile(
+                inside[i][previous - start], inside[i][following - start], self.count, q)))
+
+        q1, q3 = quantiles
+        lower, upper = _iqr_fences(q1, q3)
+        (lower_lo, lower_hi), (upper_lo, upper_hi) = self.ranges[2], self.ranges[3]
+        if not (lower_lo <= lower <= lower_hi and upper_lo <= upper <= upper_hi):
+            return None
+
+        outliers = (self.below[2] + int(np.count_nonzero(inside[2] < lower))
+                    + int(np.count_nonzero(inside[3] > upper)) + self.above_upper)
+        return q1, q3, outliers
+
+
+def clean_table_streaming(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, formats=None):
+    """
+    ניקוי במנות: קורא את input_path וכותב את output_path בהדרגה.
+    מחזיר את אותן סטטיסטיקות כמו clean_frame.
+    """
+    # מעבר 1: ספירות, טיפוסים וסקיצות
+    original_rows = 0
+    missing = {}
+    dtypes = {}
+    sketches = {}
+    for chunk in iter_table(input_path, chunk_size):
+        original_rows += len(chunk)
+        for col, n in chunk.isnull().sum().items():
+            missing[col] = missing.get(col, 0) + int(n)
+        for col, dtype in chunk.dtypes.items():
+            dtypes[col] = _merge_dtype(dtypes.get(col), dtype)
+        for col in chunk.columns:
+            if _is_numeric(chunk[col].dtype):
+                sketches.setdefault(col, QuantileSketch()).update(chunk[col].to_numpy(dtype=np.float64))
+
+    columns = list(dtypes)
+    numeric = [col for col in columns if _is_numeric(dtypes[col]) and col in sketches]
+
+    # מעבר 2: כתיבת הנתונים המנוקים + איסוף ערכים סביב הקוונטילים
+    margin = BRACKET_MARGIN
+    refinements = {col: _ColumnRefinement(sketches[col], margin) for col in numeric}
+    cleaned_rows = 0
+    read_dtypes = {col: dtypes[col] for col in numeric}
+    # עמודות שהתערבבו בהן מספרים ומחרוזות נקראות כ-object בכל המנות (סכמה אחידה בפלט)
+    write_dtypes = dict(read_dtypes)
+    write_dtypes.update({col: object for col, dtype in dtypes.items() if dtype == np.dtype(object)})
+    with TableWriter(output_path, formats=formats) as writer:
+        for chunk in iter_table(input_path, chunk_size, dtype=write_dtypes):
+            chunk = chunk.astype(write_dtypes).replace([np.inf, -np.inf], np.nan)
+            for col, refinement in refinements.items():
+                refinement.update(chunk[col].to_numpy(dtype=np.float64))
+            chunk = chunk.dropna()
+            cleaned_rows += len(chunk)
+            writer.write(chunk)
+
+    # Q1/Q3 ו-outliers מדויקים; עמודות שהטווח שלהן החטיא - מעבר נוסף עם טווח רחב יותר
+    resolved = {}
+    while refinements:
+        for col, refinement in list(refinements.items()):
+            result = refinement.resolve()
+            if result is not None:
+                resolved[col] = result
+                del refinements[col]
+        if not refinements:
+            break
+        margin *= BRACKET_GROWTH
+        refinements = {col: _ColumnRefinement(sketches[col], margin) for col in refinements}
+        retry_dtypes = {col: read_dtypes[col] for col in refinements}
+        for chunk in iter_table(input_path, chunk_size, columns=list(refinements), dtype=retry_dtypes):
+            for col, refinement in refinements.items():
+                refinement.update(chunk[col].to_numpy(dtype=np.float64))
+
+    q1 = np.array([resolved[col][0] for col in numeric], dtype=np.float64)
+    q3 = np.array([resolved[col][1] for col in numeric], dtype=np.float64)
+    lower, upper = _iqr_fences(q1, q3)
+
+    # מעבר 3: שורות עם לפחות ערך חריג אחד, לפי הגבולות המדויקים
+    outlier_rows = 0
+    if numeric:
+        for chunk in iter_table(input_path, chunk_size, columns=numeric, dtype=read_dtypes):
+            values = chunk.to_numpy(dtype=np.float64)
+            values[np.isinf(values)] = np.nan
+            outlier_rows += int(((values < lower) | (values > upper)).any(axis=1).sum())
+
+    outliers_count = {col: resolved[col][2] for col in numeric if resolved[col][2] > 0}
+    return {
+        "original_rows": original_rows,
+        "cleaned_rows": cleaned_rows,
+        "missing_values_found": {col: missing[col] for col in columns if missing.get(col, 0) > 0},
+        "outliers_detected": outliers_count,
+        "outlier_rows": outlier_rows,
+        "outlier_bounds": _bounds_report(numeric, lower, upper),
+    }
+
+
+class OutlierHistory:
+    """
+    גבולות IQR משותפים לכל ה-partitions של טבלה שנקלטה במצטבר.
+
+    לכל עמודה מספרית נצברת QuantileSketch של כל הערכים שנקלטו עד כה, כך
+    ש-partition חדש נבדק מול הגבולות של כל ההיסטוריה - כמו בניקוי של הטבלה
+    כולה - ולא מול גבולות שחושבו מה-partition לבדו. הגבולות משוערים
+    (שגיאת דירוג של כ-1/k), וכל partition נקרא פעם אחת בלבד.
+    """
+
+    def __init__(self):
+        self.partitions = {}
+        self.sketches = {}
+
+    def covers(self, partitions):
+        """האם כל ה-partitions שבהיסטוריה עדיין קיימים במקור עם אותו מספר שורות"""
+        rows = {entry['name']: entry['rows'] for entry in partitions}
+        return all(rows.get(name) == n for name, n in self.partitions.items())
+
+    def add(self, name, rows, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        """מוסיף partition להיסטוריה (partition שכבר נוסף לא נקרא שוב)"""
+        if name in self.partitions:
+            return self
+        for chunk in iter_table(path, chunk_size):
+            for col in chunk.columns:
+                if _is_numeric(chunk[col].dtype):
+                    self.sketches.setdefault(col, QuantileSketch()).update(chunk[col].to_numpy(dtype=np.float64))
+        self.partitions[name] = rows
+        return self
+
+    def fences(self):
+        """(עמודות, גבול תחתון, גבול עליון) לפי כל ההיסטוריה"""
+        columns = list(self.sketches)
+        quartiles = np.array([self.sketches[col].quantile(IQR_QUANTILES) for col in columns],
+                             dtype=np.float64).reshape(len(columns), 2)
+        lower, upper = _iqr_fences(quartiles[:, 0], quartiles[:, 1])
+        return columns, lower, upper
+
+    def bounds(self):
+        return _bounds_report(*self.fences())
+
+    def count_outliers(self, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        """({עמודה: outliers}, שורות עם outlier אחד לפחות) של partition מול הגבולות המשותפים"""
+        columns, lower, upper = self.fences()
+        counts = np.zeros(len(columns), dtype=np.int64)
+        outlier_rows = 0
+        for chunk in iter_table(path, chunk_size):
+            present = np.array([col in chunk.columns and _is_numeric(chunk[col].dtype) for col in columns], dtype=bool)
+            values = np.full((len(chunk), len(columns)), np.nan)
+            values[:, present] = chunk[[col for col, ok in zip(columns, present) if ok]].to_numpy(dtype=np.float64)
+            values[np.isinf(values)] = np.nan
+            mask = (values < lower) | (values > upper)
+            counts += mask.sum(axis=0)
+            outlier_rows += int(mask.any(axis=1).sum())
+        return {col: int(n) for col, n in zip(columns, counts) if n > 0}, outlier_rows
+
+
+def merge_cleaning_stats(stats_list, bounds=None):
+    """
+    סטטיסטיקות ניקוי של כמה partitions כסטטיסטיקה אחת. הספירות מסתכמות -
+    partition שנוקה בעבר נספר מול הגבולות של ההיסטוריה באותה ריצה.
+    bounds - הגבולות המשותפים הנוכחיים (OutlierHistory.bounds), אם יש.
+    """
+    merged = {"original_rows": 0, "cleaned_rows": 0, "missing_values_found": {},
+              "outliers_detected": {}, "outlier_rows": 0, "outlier_bounds": bounds}
+    for stats in stats_list:
+        for key in ("original_rows", "cleaned_rows", "outlier_rows"):
+            merged[key] += stats[key]
+        for key in ("missing_values_found", "outliers_detected"):
+            for col, count in stats[key].items():
+                merged[key][col] = merged[key].get(col, 0) + count
+    return merged
@@ -0,0 +1,250 @@
+"""
+Compiled Ensemble - מנוע חיזוי מהודר ליערות עצים (RandomForest / GradientBoosting)
+
+בזמן השמירה כל העצים של האנסמבל נפרשים למערכי NumPy ארוזים (פיצ'ר, סף,
+ילדים, ערך עלה) שנשמרים כקבצי .npy בתיקייה ליד model.pkl. החיזוי טוען
+אותם ב-mmap ומטייל בכל העצים במקביל בפעולות וקטוריות, בלי לעבור על גרף
+האובייקטים של sklearn. התוצאות זהות ביט-לביט ל-model.predict: X מומר
+ל-float32 כמו ב-sklearn, וסכימת העצים נעשית לפי אותו סדר.
+
+המנוע חוסך את התקורה הקבועה של sklearn (בדיקות קלט, joblib לכל עץ) ולכן
+מהיר בהרבה לבקשות קטנות - שורה בודדת ב-Dashboard או micro-batch בשרת.
+באצוות גדולות המעבר המהודר של sklearn ב-C מהיר יותר, ולכן Predictor
+בוחר במנוע לפי גודל האצווה (COMPILED_MAX_ROWS).
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'missing_left', 'is_leaf', 'roots')
+META_FILE = 'meta.json'
+
+# מספר שורות לבלוק - מגביל את מערכי המצבים (שורות x עצים) בזיכרון
+ROW_BLOCK = 1024
+
+# כל כמה רמות מסירים מהמעבר זוגות (שורה, עץ) שכבר הגיעו לעלה
+COMPACT_EVERY = 4
+
+# גודל האצווה המקסימלי שבו המנוע המהודר מהיר מ-sklearn (נמדד על 200 עצים).
+# ביער התקורה של joblib לכל קריאה גבוהה, ולכן נקודת החיתוך גבוהה יותר
+COMPILED_MAX_ROWS = {'mean': 512, 'boosting': 64}
+
+
+def compiled_dir(model_path):
+    """תיקיית המודל המהודר: outputs/model.pkl -> outputs/model_compiled"""
+    return os.path.splitext(model_path)[0] + '_compiled'
+
+
+def _ensemble_trees(model):
+    """(רשימת עצים, פרמטרי צבירה) לאנסמבלים נתמכים, אחרת None"""
+    if isinstance(model, RandomForestRegressor):
+        return [est.tree_ for est in model.estimators_], {'kind': 'mean'}
+
+    if isinstance(model, GradientBoostingRegressor):
+        init = model.init_
+        if init == 'zero':
+            base = 0.0
+        elif hasattr(init, 'constant_'):
+            base = float(np.ravel(init.constant_)[0])
+        else:
+            # init מותאם אישית (מודל שתלוי ב-X) - לא נתמך
+            return None
+        return [est.tree_ for est in model.estimators_[:, 0]], {
+            'kind': 'boosting',
+            'learning_rate': float(model.learning_rate),
+            'base': base,
+        }
+    return None
+
+
+def compile_ensemble(model):
+    """פורש את האנסמבל למערכים ארוזים. מחזיר CompiledEnsemble או None אם לא נתמך"""
+    spec = _ensemble_trees(model)
+    if spec is None:
+        return None
+    trees, meta = spec
+
+    sizes = np.array([tree.node_count for tree in trees], dtype=np.int64)
+    roots = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int32)
+    total = int(sizes.sum())
+
+    feature = np.zeros(total, dtype=np.int32)
+    threshold = np.zeros(total, dtype=np.float64)
+    # children[2 * node] = שמאל, children[2 * node + 1] = ימין
+    children = np.empty((total, 2), dtype=np.int32)
+    value = np.empty(total, dtype=np.float64)
+    missing_left = np.zeros(total, dtype=np.bool_)
+    leaf = np.empty(total, dtype=np.bool_)
+
+    for tree, offset, size in zip(trees, roots, sizes):
+        nodes = slice(offset, offset + size)
+        own = np.arange(offset, offset + size, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        # עלה מצביע על עצמו, כך שמעבר נוסף לא מזיז שורה שכבר הגיעה לעלה
+        feature[nodes] = np.where(is_leaf, 0, tree.feature)
+        threshold[nodes] = tree.threshold
+        children[nodes, 0] = np.where(is_leaf, own, tree.children_left + offset)
+        children[nodes, 1] = np.where(is_leaf, own, tree.children_right + offset)
+        value[nodes] = tree.value[:, 0, 0]
+        leaf[nodes] = is_leaf
+        if hasattr(tree, 'missing_go_to_left'):
+            missing_left[nodes] = np.asarray(tree.missing_go_to_left, dtype=np.bool_) & ~is_leaf
+
+    meta.update(
+        n_trees=len(trees),
+        n_features=int(model.n_features_in_),
+        max_depth=int(max(tree.max_depth for tree in trees)),
+    )
+    arrays = dict(feature=feature, threshold=threshold, children=children.ravel(),
+                  value=value, missing_left=missing_left, is_leaf=leaf, roots=roots)
+    return CompiledEnsemble(arrays, meta)
+
+
+class CompiledEnsemble:
+    """אנסמבל עצים כמערכים ארוזים + מעבר וקטורי לחיזוי"""
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        # המערכים נשארים ממופים - שום דבר לא נקרא מהדיסק עד החיזוי הראשון
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+
+    @property
+    def n_features_in_(self):
+        return self.meta['n_features']
+
+    def __repr__(self):
+        return f"CompiledEnsemble(kind={self.meta['kind']!r}, n_trees={self.meta['n_trees']})"
+
+    def suits(self, n_rows):
+        """האם כדאי להשתמש במנוע המהודר לאצווה בגודל n_rows"""
+        return n_rows <= COMPILED_MAX_ROWS[self.meta['kind']]
+
+    def checksum(self):
+        """טביעת אצבע של המערכים - לזיהוי מודל מהודר שלא תואם ל-bundle"""
+        digest = hashlib.sha1()
+        for name in ARRAY_NAMES:
+            digest.update(np.ascontiguousarray(self.arrays[name]).tobytes())
+        return digest.hexdigest()
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f'{name}.npy'), self.arrays[name])
+        meta = dict(self.meta, checksum=self.checksum())
+        with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        return meta['checksum']
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """טעינה מהדיסק - ב-mmap המערכים לא נקראים לזיכרון עד השימוש"""
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode)
+                  for name in ARRAY_NAMES}
+        return cls(arrays, meta)
+
+    def _leaf_values(self, X):
+        """
+        ערכי העלים לכל (שורה, עץ) כמטריצה (שורות x עצים).
+        כל זוגות (שורה, עץ) מתקדמים יחד רמה אחר רמה; עלה מצביע על עצמו, כך
+        שזוג שהגיע לעלה נשאר במקומו עד שמסירים אותו בדחיסה הבאה.
+        """
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        flat_X = X.ravel()
+        has_nan = bool(np.isnan(flat_X).any())
+
+        nodes = np.tile(self.roots.astype(np.intp), n_rows)
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        leaves = None
+        positions = None
+        max_depth = self.meta['max_depth']
+
+        for level in range(max_depth):
+            x = flat_X.take(row_offsets + self.feature.take(nodes))
+            threshold = self.threshold.take(nodes)
+            if has_nan:
+                # כמו sklearn: NaN הולך לצד שנלמד באימון (missing_go_to_left)
+                go_right = ~((x <= threshold) | (np.isnan(x) & self.missing_left.take(nodes)))
+            else:
+                go_right = x > threshold
+            nodes = self.children.take((nodes << 1) + go_right)
+
+            if (level + 1) % COMPACT_EVERY == 0 and level + 1 < max_depth:
+                done = self.is_leaf.take(nodes)
+                if np.count_nonzero(done) > len(nodes) // 3:
+                    if leaves is None:
+                        leaves = nodes.astype(np.intp)
+                        positions = np.arange(len(nodes))
+                    else:
+                        leaves[positions] = nodes
+                    keep = ~done
+                    nodes, row_offsets, positions = nodes[keep], row_offsets[keep], positions[keep]
+
+        if leaves is None:
+            leaves = nodes
+        else:
+            leaves[positions] = nodes
+        return self.value.take(leaves).reshape(n_rows, n_trees)
+
+    def predict(self, X):
+        """חיזוי זהה ל-model.predict של sklearn - מחזיר מערך float64"""
+        # sklearn משווה ערכי float32 לספים - אותה המרה בדיוק
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.meta['n_features']:
+            raise ValueError(f"צפויים {self.meta['n_features']} פיצ'רים, התקבל מערך בצורה {X.shape}")
+
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            block = slice(start, start + ROW_BLOCK)
+            out[block] = self._aggregate(self._leaf_values(X[block]))
+        return out
+
+    def _aggregate(self, leaves):
+        # cumsum סוכם עץ אחר עץ לפי הסדר - כמו הלולאות של sklearn (ולא סכימה זוגית)
+        if self.meta['kind'] == 'mean':
+            return np.cumsum(leaves, axis=1)[:, -1] / leaves.shape[1]
+
+        terms = np.empty((leaves.shape[0], leaves.shape[1] + 1), dtype=np.float64)
+        terms[:, 0] = self.meta['base']
+        np.multiply(leaves, self.meta['learning_rate'], out=terms[:, 1:])
+        return np.cumsum(terms, axis=1)[:, -1]
+
+
+def export_compiled(model, model_path):
+    """
+    מהדר ושומר את המודל ליד model.pkl.
+    מחזיר רשומה לשמירה ב-bundle ({'path', 'checksum'}), או None אם המודל לא נתמך.
+    """
+    compiled = compile_ensemble(model)
+    if compiled is None:
+        return None
+    path = compiled_dir(model_path)
+    checksum = compiled.save(path)
+    return {'path': os.path.basename(path), 'checksum': checksum}
+
+
+def load_compiled(model_data, model_path, mmap=True):
+    """
+    המודל המהודר של ה-bundle, או None אם אין / לא תואם.
+    bundles שנשמרו בלי הידור (או שהתיקייה שייכת למודל אחר) חוזרים ל-model.predict.
+    """
+    entry = model_data.get('compiled') if isinstance(model_data, dict) else None
+    if not entry:
+        return None
+    path = os.path.join(os.path.dirname(os.path.abspath(model_path)), entry['path'])
+    try:
+        compiled = CompiledEnsemble.load(path, mmap=mmap)
+    except (OSError, ValueError, KeyError):
+        return None
+    if compiled.meta.get('checksum') != entry.get('checksum'):
+        return None
+    return compiled
@@ -0,0 +1,128 @@
+"""
+Dataset Contract Profiler - פרופיל עמודות לחוזה הנתונים במעבר אחד
+
+לכל עמודה נאספים טיפוס, מספר ערכים חסרים, מספר ערכים שונים ו-min/max
+(לעמודות מספריות). הנתונים נקראים במנות, כך שגם dump גדול לא נטען
+לזיכרון, ומספר הערכים השונים מחושב ב-HyperLogLog (DistinctSketch) במקום
+nunique מלא - שעל עמודות float עם הרבה ערכים (קו רוחב, שטח) יקר במיוחד.
+
+exact=True שומר את הערכים השונים עצמם ומחזיר nunique מדויק.
+"""
+import numpy as np
+import pandas as pd
+
+from core.cleaning import DEFAULT_CHUNK_SIZE, _is_numeric, _merge_dtype
+from core.distinct_sketch import DistinctSketch, _normalize
+from core.storage import iter_table
+
+
+class _ExactDistinct:
+    """אותו ממשק כמו DistinctSketch - שומר את כל הערכים השונים"""
+
+    is_exact = True
+    relative_error = 0.0
+
+    def __init__(self):
+        self._chunks = []
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if not values.empty:
+            self._chunks.append(_normalize(np.asarray(values.unique())))
+        return self
+
+    def merge(self, other):
+        self._chunks.extend(other._chunks)
+        return self
+
+    def count(self):
+        # איחוד אחד בסוף במקום איחוד מחדש של כל מה שנצבר בכל מנה
+        if not self._chunks:
+            return 0
+        return len(pd.unique(np.concatenate(self._chunks)))
+
+
+class ContractProfiler:
+    """צובר פרופיל עמודות מנה אחר מנה"""
+
+    def __init__(self, exact=False):
+        self.exact = exact
+        self.rows = 0
+        self.columns = {}
+
+    def merge(self, other):
+        """ממזג פרופיל של נתונים אחרים (למשל partition חדש) לתוך זה"""
+        self.rows += other.rows
+        for col, theirs in other.columns.items():
+            state = self.columns.get(col)
+            if state is None:
+                self.columns[col] = theirs
+                continue
+            state['dtype'] = _merge_dtype(state['dtype'], theirs['dtype'])
+            state['nulls'] += theirs['nulls']
+            state['min'] = min(state['min'], theirs['min'])
+            state['max'] = max(state['max'], theirs['max'])
+            state['distinct'].merge(theirs['distinct'])
+        return self
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for col in chunk.columns:
+            values = chunk[col]
+            state = self.columns.get(col)
+            if state is None:
+                state = self.columns[col] = {
+                    'dtype': None, 'nulls': 0, 'min': np.inf, 'max': -np.inf,
+                    'distinct': _ExactDistinct() if self.exact else DistinctSketch(),
+                }
+            # מנה ריקה (למשל parquet בלי שורות) לא קובעת טיפוס
+            if len(values) or state['dtype'] is None:
+                state['dtype'] = _merge_dtype(state['dtype'], values.dtype)
+            nulls = values.isna()
+            state['nulls'] += int(nulls.sum())
+            state['distinct'].update(values)
+            if _is_numeric(values.dtype) and not nulls.all():
+                numeric = values.to_numpy(dtype=np.float64, na_value=np.nan)
+                state['min'] = min(state['min'], float(np.nanmin(numeric)))
+                state['max'] = max(state['max'], float(np.nanmax(numeric)))
+        return self
+
+    def result(self):
+        """{עמודה: {dtype, null_count, unique_count, [min, max]}}"""
+        columns = {}
+        for col, state in self.columns.items():
+            entry = {
+                'dtype': str(state['dtype']),
+                'null_count': state['nulls'],
+                'unique_count': state['distinct'].count(),
+            }
+            if not self.exact:
+                entry['unique_count_exact'] = state['distinct'].is_exact
+            if _is_numeric(state['dtype']):
+                cast = int if state['dtype'].kind in 'iu' else float
+                entry['min'] = cast(state['min']) if np.isfinite(state['min']) else None
+                entry['max'] = cast(state['max']) if np.isfinite(state['max']) else None
+            columns[col] = entry
+        return columns
+
+    def method(self):
+        """תיאור שיטת הספירה לחוזה"""
+        if self.exact:
+            return {'distinct_counts': 'exact'}
+        return {'distinct_counts': 'hyperloglog', 'relative_error': round(DistinctSketch().relative_error, 4)}
+
+
+def profile_frame(df, exact=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """פרופיל של DataFrame שכבר בזיכרון (במנות, כדי לא לשכפל עמודות שלמות)"""
+    profiler = ContractProfiler(exact=exact)
+    for start in range(0, max(len(df), 1), chunk_size):
+        profiler.update(df.iloc[start:start + chunk_size])
+    return profiler
+
+
+def profile_table(path, exact=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """פרופיל של טבלה מהדיסק במעבר אחד, בלי לטעון אותה לזיכרון"""
+    profiler = ContractProfiler(exact=exact)
+    for chunk in iter_table(path, chunk_size):
+        profiler.update(chunk)
+    return profiler
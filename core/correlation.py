@@ -0,0 +1,133 @@
+"""
+Correlation Statistics - מטריצת קורלציות שמחושבת פעם אחת ומשותפת
+
+df.corr() עובר על כל זוג עמודות בנפרד. כאן העמודות המספריות מתוקננות
+(מרכוז ונרמול לאורך 1) והמטריצה כולה היא מכפלת מטריצות אחת Z.T @ Z -
+קריאת BLAS אחת במקום p^2 מעברים. עם ערכים חסרים מחושבת קורלציה על השורות
+המשותפות לכל זוג (כמו pandas) מארבע מכפלות מטריצות (core.summary_stats).
+
+המטריצה של טבלה מהדיסק נגזרת מהסיכום המצטבר שלה (load_summary - במנות,
+בלי לטעון את הטבלה) ונשמרת ב-outputs/correlation_matrix.json יחד עם חתימת
+הטבלה (mtime וגודל של הקבצים שלה). ניתוח הקורלציות, מחולל התובנות
+וה-Dashboard קוראים ממנה דרך load_correlations, והיא מחושבת מחדש רק
+כשהטבלה השתנתה.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .summary_stats import correlation_from_sums, load_summary, pairwise_sums, table_signature
+
+CORRELATION_FILE = 'correlation_matrix.json'
+
+
+def numeric_columns(df):
+    return [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+
+
+def _as_matrix(df):
+    """מטריצת float64 חדשה (עותק אחד) - מותר לשנות אותה במקום"""
+    X = np.empty((len(df), len(df.columns)), dtype=np.float64)
+    for j, col in enumerate(df.columns):
+        X[:, j] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    return X
+
+
+def _standardize(X):
+    """מתקנן את העמודות במקום: ממורכזות ובאורך 1 (עמודה קבועה מקבלת NaN)"""
+    X -= X.mean(axis=0)
+    norms = np.sqrt(np.einsum('ij,ij->j', X, X))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        X /= np.where(norms > 0, norms, np.nan)
+    return X
+
+
+def correlation_matrix(df):
+    """מטריצת קורלציות Pearson של העמודות המספריות (כמו df.corr(numeric_only=True))"""
+    columns = numeric_columns(df)
+    X = _as_matrix(df[columns])
+    if np.isnan(X).any():
+        # מרכוז לפי ממוצע העמודה מקטין ביטול נומרי בסכומים
+        with np.errstate(invalid='ignore'):
+            shift = np.nan_to_num(np.nanmean(X, axis=0))
+        corr = correlation_from_sums(*pairwise_sums(X, shift))
+    else:
+        Z = _standardize(X)
+        corr = np.clip(Z.T @ Z, -1.0, 1.0)
+        defined = ~np.isnan(np.diag(corr))
+        corr[np.diag_indices_from(corr)] = np.where(defined, 1.0, np.nan)
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def target_correlations(df, target, columns=None):
+    """
+    קורלציה של כל עמודה מספרית (או columns) עם target - מכפלת מטריצה-וקטור
+    אחת. עמודות קבועות או בלי מספיק שורות משותפות מושמטות.
+    """
+    columns = [col for col in (numeric_columns(df) if columns is None else columns)
+               if col != target and pd.api.types.is_numeric_dtype(df[col])]
+    frame = df[columns + [target]]
+    if frame.isna().to_numpy().any():
+        corr = correlation_matrix(frame)[target].drop(target)
+    else:
+        Z = _standardize(_as_matrix(frame))
+        corr = pd.Series(np.clip(Z[:, :-1].T @ Z[:, -1], -1.0, 1.0), index=columns)
+    return corr.dropna()
+
+
+def _to_json(value):
+    return None if np.isnan(value) else float(value)
+
+
+def save_correlations(corr, path, source=None, signature=None, rows=None):
+    data = {
+        'source': source,
+        'signature': signature,
+        'rows': rows,
+        'columns': list(corr.columns),
+        'matrix': [[_to_json(v) for v in row] for row in corr.to_numpy()],
+    }
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _to_frame(data):
+    matrix = np.array([[np.nan if v is None else v for v in row] for row in data['matrix']],
+                      dtype=np.float64).reshape(len(data['columns']), len(data['columns']))
+    return pd.DataFrame(matrix, index=data['columns'], columns=data['columns'])
+
+
+def compute_correlations(table_path, output_dir='outputs'):
+    """גוזר את המטריצה מהסיכום המצטבר של הטבלה ושומר אותה"""
+    signature = table_signature(table_path)
+    summary = load_summary(table_path, output_dir)
+    corr = summary.corr()
+    os.makedirs(output_dir, exist_ok=True)
+    save_correlations(corr, os.path.join(output_dir, CORRELATION_FILE),
+                      source=table_path, signature=signature, rows=summary.rows)
+    return corr, summary.rows
+
+
+def load_correlations(table_path, output_dir='outputs', refresh=False):
+    """
+    מטריצת הקורלציות של הטבלה: מהקובץ השמור אם הוא נוצר מאותה גרסה של
+    הטבלה, אחרת מחושבת ונשמרת. מחזיר (DataFrame, מספר שורות).
+    """
+    path = os.path.join(output_dir, CORRELATION_FILE)
+    data = None if refresh else _read(path)
+    if (data is not None and data.get('source') == table_path
+            and data.get('signature') == table_signature(table_path)):
+        return _to_frame(data), data.get('rows')
+    return compute_correlations(table_path, output_dir)
@@ -0,0 +1,153 @@
+"""
+Feature Engineering - טרנספורמציית פיצ'רים משותפת לאימון ולחיזוי
+
+מימוש יחיד ווקטורי של כל הפיצ'רים הנגזרים. משמש גם את FeatureEngineeringTool
+(אימון על כל הנתונים) וגם את ה-Dashboard (חיזוי של שורה בודדת), כך ששני
+המסלולים לא יכולים לסטות זה מזה.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+
+TARGET_COLUMN = 'Price_Millions'
+
+# עמודות שמוסרות מהמודל (City מקודדת, קואורדינטות הוסרו בגלל פרטיות)
+DROPPED_COLUMNS = ['City', 'Latitude', 'Longitude']
+
+# עמודות מספריות מקוריות שעוברות למודל כמו שהן (לפי סדר הנתונים הגולמיים)
+BASE_COLUMNS = [
+    'Size_sqm', 'Rooms', 'Floor', 'YearBuilt', 'Age',
+    'DistanceSea_km', 'DistanceCenter_km', 'Population', 'AvgIncome'
+]
+
+# פיצ'רים נגזרים - הסדר כאן הוא הסדר בקובץ features.csv
+DERIVED_COLUMNS = [
+    'rooms_per_size',
+    'income_per_size',
+    'sea_proximity_score',
+    'center_proximity_score',
+    'log_avg_income',
+    'income_category_encoded',
+    'age_category_encoded',
+    'income_per_room',
+    'size_income',
+    'city_size_interaction',
+    'age_size_interaction',
+]
+
+# גבולות הקטגוריות (זהים ל-pd.cut: ימין כלול, מחוץ לטווח = -1)
+INCOME_BINS = np.array([0, 10, 15, 25], dtype=np.float64)
+AGE_BINS = np.array([0, 10, 30, 100], dtype=np.float64)
+
+
+def _bucketize(values, bins):
+    """קידוד וקטורי לקטגוריות - שקול ל-pd.cut(...).cat.codes"""
+    codes = np.searchsorted(bins, values, side='left') - 1
+    outside = ~((values > bins[0]) & (values <= bins[-1]))
+    codes[outside] = -1
+    return codes
+
+
+class HousingFeatureTransformer:
+    """
+    טרנספורמציית פיצ'רים בסגנון fit/transform
+
+    fit לומד את סדר העמודות ואת קידוד הערים, transform מחשב את כל הפיצ'רים
+    במעבר אחד לתוך מטריצת float64 מוקצית מראש (אותו dtype כמו בחישוב ה-pandas
+    המקורי, כך ש-features.csv, ה-data_hash והחיזוי לא משתנים). הקלט יכול להיות DataFrame
+    או dict של ערכים (לחיזוי שורה בודדת ללא בניית DataFrame).
+    """
+
+    def __init__(self, city_categories=None, passthrough_columns=None):
+        self.city_categories_ = list(city_categories) if city_categories is not None else None
+        self.passthrough_columns_ = list(passthrough_columns) if passthrough_columns is not None else list(BASE_COLUMNS)
+        self._city_index = pd.Index(self.city_categories_) if self.city_categories_ is not None else None
+
+    @classmethod
+    def from_city_mapping(cls, mapping_path, passthrough_columns=None):
+        """בונה טרנספורמציה מקובץ city_mapping.json שנשמר באימון"""
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            city_mapping = json.load(f)
+        categories = sorted(city_mapping, key=city_mapping.get)
+        return cls(city_categories=categories, passthrough_columns=passthrough_columns)
+
+    @property
+    def feature_names_(self):
+        """שמות הפיצ'רים לפי סדר העמודות במטריצה"""
+        city = ['City_encoded'] if self.city_categories_ is not None else []
+        return self.passthrough_columns_ + city + DERIVED_COLUMNS
+
+    @property
+    def city_mapping_(self):
+        """מיפוי עיר -> קוד, תואם בדיוק לקידוד במטריצה"""
+        if self.city_categories_ is None:
+            return {}
+        return {city: code for code, city in enumerate(self.city_categories_)}
+
+    def fit(self, df, y=None):
+        """לומד את סדר העמודות המספריות ואת רשימת הערים"""
+        self.passthrough_columns_ = [
+            col for col in df.columns
+            if col not in DROPPED_COLUMNS and col != TARGET_COLUMN
+        ]
+        if 'City' in df.columns:
+            # אותו סדר כמו pd.Categorical (קטגוריות ממוינות)
+            self.city_categories_ = sorted(pd.unique(df['City'].dropna()))
+            self._city_index = pd.Index(self.city_categories_)
+        else:
+            self.city_categories_ = None
+            self._city_index = None
+        return self
+
+    def transform(self, data):
+        """מחשב את כל הפיצ'רים ומחזיר מטריצת float64 בגודל (n, n_features)"""
+        size = np.atleast_1d(np.asarray(data['Size_sqm'], dtype=np.float64))
+        rooms = np.atleast_1d(np.asarray(data['Rooms'], dtype=np.float64))
+        income = np.atleast_1d(np.asarray(data['AvgIncome'], dtype=np.float64))
+        age = np.atleast_1d(np.asarray(data['Age'], dtype=np.float64))
+        sea = np.atleast_1d(np.asarray(data['DistanceSea_km'], dtype=np.float64))
+        center = np.atleast_1d(np.asarray(data['DistanceCenter_km'], dtype=np.float64))
+
+        n_rows = len(size)
+        out = np.empty((n_rows, len(self.feature_names_)), dtype=np.float64)
+
+        # 0. עמודות מקוריות
+        for j, col in enumerate(self.passthrough_columns_):
+            out[:, j] = np.atleast_1d(np.asarray(data[col], dtype=np.float64))
+        j = len(self.passthrough_columns_)
+
+        # קידוד עיר (ערים לא מוכרות = -1, כמו pd.Categorical)
+        if self._city_index is not None:
+            out[:, j] = self._city_index.get_indexer(np.atleast_1d(np.asarray(data['City'], dtype=object)))
+            j += 1
+
+        # 1. יחסים
+        size_eps = size + 0.001
+        out[:, j] = rooms / size_eps
+        out[:, j + 1] = income / size_eps
+
+        # 2. פיצ'רי מרחק
+        out[:, j + 2] = 1 / (sea + 1)
+        out[:, j + 3] = 1 / (center + 1)
+
+        # 3. טרנספורמציות וקטגוריות
+        out[:, j + 4] = np.log1p(income)
+        out[:, j + 5] = _bucketize(income, INCOME_BINS)
+        out[:, j + 6] = _bucketize(age, AGE_BINS)
+
+        # 4. אינטראקציות
+        out[:, j + 7] = income * rooms
+        out[:, j + 8] = size * income
+        out[:, j + 9] = size * rooms
+        out[:, j + 10] = age * size
+
+        return out
+
+    def fit_transform(self, df, y=None):
+        return self.fit(df, y).transform(df)
+
+    def transform_frame(self, data):
+        """כמו transform אבל מחזיר DataFrame עם שמות הפיצ'רים"""
+        return pd.DataFrame(self.transform(data), columns=self.feature_names_)
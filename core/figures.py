@@ -0,0 +1,134 @@
+"""
+Figures - רינדור גרפים במקביל ובשני מצבי איכות
+
+    full     - 300 dpi, tight_layout ו-bbox_inches='tight' (ההתנהגות המקורית, לדוחות)
+    preview  - 100 dpi, בלי חישובי layout חוזרים, scatter מרוסטר ומדוגם
+               (עד 5000 נקודות), box plot בלי נקודות outlier - לריצות פיתוח מהירות
+
+המצב נבחר בפרמטר mode או במשתנה הסביבה FIGURE_MODE (ברירת מחדל: full).
+
+כל גרף נבנה כ-Figure עצמאי (בלי pyplot ובלי מצב גלובלי), ולכן כמה גרפים
+יכולים להיות מרונדרים במקביל בתהליכים נפרדים - render_parallel מפזר
+משימות (func, args) על ProcessPoolExecutor לפי מספר הליבות.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+FIGURE_MODES = {
+    'full': {'dpi': 300, 'tight': True, 'rasterized': False, 'max_points': None, 'fliers': True},
+    'preview': {'dpi': 100, 'tight': False, 'rasterized': True, 'max_points': 5000, 'fliers': False},
+}
+DEFAULT_MODE = 'full'
+
+
+def resolve_mode(mode=None):
+    mode = (mode or os.environ.get('FIGURE_MODE') or DEFAULT_MODE).lower()
+    if mode not in FIGURE_MODES:
+        raise ValueError(f"מצב גרפים לא מוכר: {mode}. אפשרויות: {tuple(FIGURE_MODES)}")
+    return mode
+
+
+def save_figure(fig, path, mode=None):
+    """שומר Figure לפי הגדרות המצב"""
+    settings = FIGURE_MODES[resolve_mode(mode)]
+    if settings['tight']:
+        fig.tight_layout()
+        fig.savefig(path, dpi=settings['dpi'], bbox_inches='tight')
+    else:
+        fig.savefig(path, dpi=settings['dpi'])
+    return path
+
+
+def _sample(max_points, *arrays):
+    """מדגם קבוע (seed 0) של אותן שורות מכל המערכים, אם יש יותר מ-max_points"""
+    n = len(arrays[0])
+    if not max_points or n <= max_points:
+        return arrays
+    rows = np.sort(np.random.default_rng(0).choice(n, max_points, replace=False))
+    return tuple(a[rows] for a in arrays)
+
+
+def figure_filename(name):
+    """שם קובץ בטוח לעמודה (בלי תווי נתיב)"""
+    return re.sub(r'[^\w\-.]+', '_', str(name)).strip('_') or 'column'
+
+
+def distribution_figure(values, column, path, mode=None):
+    """היסטוגרמה ו-box plot של עמודה אחת לקובץ משלה"""
+    settings = FIGURE_MODES[resolve_mode(mode)]
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+
+    fig = Figure(figsize=(15, 4))
+    hist_ax, box_ax = fig.subplots(1, 2)
+
+    hist_ax.hist(values, bins=50, edgecolor='black', alpha=0.7)
+    hist_ax.set_title(f'Distribution of {column}')
+    hist_ax.set_xlabel(column)
+    hist_ax.set_ylabel('Frequency')
+
+    box_ax.boxplot(values, showfliers=settings['fliers'])
+    box_ax.set_title(f'Box Plot of {column}')
+    box_ax.set_ylabel(column)
+
+    return save_figure(fig, path, mode)
+
+
+def scatter_figure(x, y, path, title, xlabel, ylabel, reference=None, mode=None):
+    """
+    גרף פיזור. reference: 'diagonal' (קו y=x) או 'zero' (קו y=0).
+    ב-preview הנקודות מדוגמות ומרוסטרות - הקווים והצירים נשארים מלאים.
+    """
+    settings = FIGURE_MODES[resolve_mode(mode)]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    shown_x, shown_y = _sample(settings['max_points'], x, y)
+    ax.scatter(shown_x, shown_y, alpha=0.5, rasterized=settings['rasterized'])
+    if reference == 'diagonal':
+        ax.plot([x.min(), x.max()], [x.min(), x.max()], 'r--', lw=2)
+    elif reference == 'zero':
+        ax.axhline(y=0, color='r', linestyle='--')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+
+    return save_figure(fig, path, mode)
+
+
+def render_parallel(jobs, n_jobs=None):
+    """
+    מריץ משימות רינדור [(func, args), ...] ומחזיר את התוצאות לפי הסדר.
+    עם ליבה אחת או משימה אחת - בתהליך הנוכחי, בלי עלות הרמת תהליכים.
+    """
+    jobs = list(jobs)
+    n_jobs = min(len(jobs), n_jobs or os.cpu_count() or 1)
+    if n_jobs <= 1:
+        return [func(*args) for func, args in jobs]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        futures = [pool.submit(func, *args) for func, args in jobs]
+        return [future.result() for future in futures]
+
+
+def render_distributions(df, fig_dir, mode=None, n_jobs=None):
+    """
+    גרף התפלגות לכל עמודה מספרית ב-fig_dir/<עמודה>.png, במקביל.
+    מחזיר את נתיבי הקבצים.
+    """
+    mode = resolve_mode(mode)
+    os.makedirs(fig_dir, exist_ok=True)
+    jobs = []
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        path = os.path.join(fig_dir, figure_filename(col) + '.png')
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        jobs.append((distribution_figure, (values, col, path, mode)))
+    return render_parallel(jobs, n_jobs)
@@ -0,0 +1,151 @@
+"""
+Geo Views - תצוגות גיאוגרפיות בגודל חסום לנתונים גדולים
+
+גרף פיזור של כל הדירות שולח לדפדפן נקודה לכל שורה, ועם מאות אלפי שורות
+קובץ ה-HTML עצום והדפדפן נתקע. כאן הנתונים מצטמצמים לפני הציור:
+
+    hex     - תאים משושים (כמו hexbin) עם סטטיסטיקות מחיר לכל תא
+    grid    - תאים ריבועיים באותו אופן
+    sample  - מדגם מרובד (לפי עיר, או לפי תאי רשת) בגודל max_points,
+              שומר על היחס בין האזורים ולא מעלים אזורים קטנים
+    points  - כל השורות (ההתנהגות המקורית)
+    auto    - points עד max_points שורות, אחרת hex
+
+ב-hex/grid מספר התאים חסום ע"י gridsize (התאים לאורך הציר הארוך), ולכן גודל
+הגרף לא תלוי במספר השורות. המצב נבחר בפרמטר או במשתנה הסביבה GEO_MODE.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+GEO_MODES = ('auto', 'points', 'sample', 'hex', 'grid')
+DEFAULT_MODE = 'auto'
+DEFAULT_MAX_POINTS = 20_000
+DEFAULT_GRIDSIZE = 60
+CELL_STATS = ('mean', 'median', 'min', 'max')
+
+
+def resolve_mode(mode=None):
+    mode = (mode or os.environ.get('GEO_MODE') or DEFAULT_MODE).lower()
+    if mode not in GEO_MODES:
+        raise ValueError(f"מצב תצוגה גיאוגרפית לא מוכר: {mode}. אפשרויות: {GEO_MODES}")
+    return mode
+
+
+def _extent(values):
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return 0.0, 0.0
+    return float(finite.min()), float(finite.max())
+
+
+def grid_cells(x, y, gridsize=DEFAULT_GRIDSIZE):
+    """
+    תא ריבועי לכל נקודה. מחזיר (מזהה תא, מרכז x, מרכז y).
+    גודל התא נקבע לפי הציר הארוך - לכל היותר (gridsize + 1)^2 תאים.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    (x0, x1), (y0, y1) = _extent(x), _extent(y)
+    size = max(x1 - x0, y1 - y0) / gridsize or 1.0
+
+    ix = np.floor((x - x0) / size)
+    iy = np.floor((y - y0) / size)
+    ids = ix * (gridsize + 1) + iy
+    return ids, x0 + (ix + 0.5) * size, y0 + (iy + 0.5) * size
+
+
+def hex_cells(x, y, gridsize=DEFAULT_GRIDSIZE):
+    """
+    תא משושה לכל נקודה - שתי רשתות מלבניות מוזזות בחצי תא, וכל נקודה
+    משויכת למרכז הקרוב מביניהן (אותו חישוב כמו matplotlib.hexbin).
+    מחזיר (מזהה תא, מרכז x, מרכז y).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    (x0, x1), (y0, y1) = _extent(x), _extent(y)
+    # משושים משוכללים: גובה שורה = רוחב * sqrt(3)
+    sx = max(x1 - x0, (y1 - y0) / np.sqrt(3)) / gridsize or 1.0
+    sy = sx * np.sqrt(3)
+
+    u = (x - x0) / sx
+    v = (y - y0) / sy
+    i1, j1 = np.round(u), np.round(v)
+    i2, j2 = np.floor(u), np.floor(v)
+    d1 = (u - i1) ** 2 + 3.0 * (v - j1) ** 2
+    d2 = (u - i2 - 0.5) ** 2 + 3.0 * (v - j2 - 0.5) ** 2
+    second = d2 < d1
+
+    i = np.where(second, i2 + 0.5, i1)
+    j = np.where(second, j2 + 0.5, j1)
+    # i, j כפולות של חצי - מזהה שלם ייחודי לכל מרכז
+    ids = (2 * i) * (2 * gridsize + 3) + 2 * j
+    return ids, x0 + i * sx, y0 + j * sy
+
+
+def aggregate_cells(df, x='Longitude', y='Latitude', value='Price_Millions',
+                    kind='hex', gridsize=DEFAULT_GRIDSIZE):
+    """
+    טבלת תאים: מרכז התא (בשמות העמודות x, y), count וסטטיסטיקות value
+    (<value>_mean / _median / _min / _max). שורות בלי קואורדינטות לא נספרות.
+    """
+    cells = hex_cells if kind == 'hex' else grid_cells
+    ids, cx, cy = cells(df[x].to_numpy(dtype=np.float64, na_value=np.nan),
+                        df[y].to_numpy(dtype=np.float64, na_value=np.nan), gridsize)
+
+    frame = pd.DataFrame({'cell': ids, x: cx, y: cy,
+                          value: df[value].to_numpy(dtype=np.float64, na_value=np.nan)})
+    frame = frame[np.isfinite(ids)]
+    grouped = frame.groupby('cell', sort=True)
+
+    result = grouped[[x, y]].first()
+    result['count'] = grouped.size()
+    stats = grouped[value].agg(list(CELL_STATS))
+    for stat in CELL_STATS:
+        result[f'{value}_{stat}'] = stats[stat]
+    return result.reset_index(drop=True)
+
+
+def stratified_sample(df, n, by=None, x='Longitude', y='Latitude',
+                      gridsize=20, random_state=42):
+    """
+    מדגם של כ-n שורות שמחולק בין השכבות לפי גודלן. by: עמודה לשכבות (למשל
+    City); בלי by השכבות הן תאי רשת גסה. כל שכבה מקבלת לפחות שורה אחת כשיש
+    מספיק מקום, כך שאזורים קטנים לא נעלמים. סדר השורות המקורי נשמר.
+    """
+    if len(df) <= n:
+        return df
+    if by is not None and by in df.columns:
+        strata = pd.factorize(df[by], use_na_sentinel=False)[0]
+    else:
+        strata = pd.factorize(grid_cells(df[x], df[y], gridsize)[0], use_na_sentinel=False)[0]
+
+    sizes = np.bincount(strata)
+    quota = np.floor(sizes * (n / len(df))).astype(np.int64)
+    if len(sizes) <= n:
+        quota = np.maximum(quota, 1)
+
+    # מיקום אקראי של כל שורה בתוך השכבה שלה - שומרים את quota הראשונות
+    rng = np.random.default_rng(random_state)
+    order = rng.permutation(len(df))
+    rank = np.empty(len(df), dtype=np.int64)
+    rank[order] = pd.Series(strata[order]).groupby(strata[order]).cumcount().to_numpy()
+    return df[rank < quota[strata]]
+
+
+def geo_view(df, mode=None, max_points=DEFAULT_MAX_POINTS, gridsize=DEFAULT_GRIDSIZE,
+             x='Longitude', y='Latitude', value='Price_Millions', strata='City'):
+    """
+    הנתונים לגרף גיאוגרפי לפי המצב. מחזיר (טבלה, המצב שנבחר בפועל) -
+    ב-points/sample שורות של df, ב-hex/grid טבלת תאים (aggregate_cells).
+    """
+    mode = resolve_mode(mode)
+    if mode == 'auto':
+        mode = 'points' if len(df) <= max_points else 'hex'
+
+    if mode == 'points':
+        return df, mode
+    if mode == 'sample':
+        return stratified_sample(df, max_points, by=strata, x=x, y=y), mode
+    return aggregate_cells(df, x, y, value, kind=mode, gridsize=gridsize), mode
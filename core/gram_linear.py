@@ -0,0 +1,206 @@
+"""
+Gram Linear Regression - רגרסיה לינארית מסטטיסטיקות מספיקות, במעבר אחד
+
+לרגרסיה לינארית כל מה שצריך הוא X^T X, X^T y, y^T y והסכומים. לכל fold
+(וגם ל-test) נצברות המטריצות האלה בנפרד - מכפלת מטריצות אחת על [X, y] -
+ומהן נפתרים:
+
+    - המודל של כל fold ב-CV: סכום ה-folds האחרים ופתרון מערכת p x p
+    - ה-RMSE על ה-fold שבחוץ - ישירות מהסטטיסטיקות שלו, בלי חיזוי
+    - המודל הסופי על כל ה-train, ו-RMSE / R^2 על ה-test
+
+כך 5-fold CV ועוד אימון מלא הם מעבר יחיד על הנתונים במקום שש התאמות,
+והמעבר יכול לרוץ במנות מהדיסק (fit_table) - גם לטבלה שלא נכנסת לזיכרון.
+הנתונים מוזזים בממוצע המנה הראשונה (shift), כדי שהסכומים יישארו מדויקים.
+
+הפתרון זהה ל-LinearRegression (lstsq, min-norm גם כשיש עמודות תלויות), וה-
+folds זהים ל-KFold(n_splits) בלי ערבוב - כמו cross_val_score(cv=5).
+"""
+import numpy as np
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from .cleaning import DEFAULT_CHUNK_SIZE
+from .model_bundle import feature_schema
+from .storage import iter_table
+
+HOLDOUT = -1
+
+
+def kfold_ids(n_samples, n_folds=5):
+    """מספר ה-fold של כל שורה - אותה חלוקה כמו KFold(n_folds) בלי ערבוב"""
+    sizes = np.full(n_folds, n_samples // n_folds)
+    sizes[:n_samples % n_folds] += 1
+    return np.repeat(np.arange(n_folds), sizes)
+
+
+class GramStatistics:
+    """n, סכומים ו-[X, y]^T [X, y] לכל fold (האינדקס האחרון - holdout/test)"""
+
+    def __init__(self, n_features, n_folds=5):
+        self.n_features = n_features
+        self.n_folds = n_folds
+        size = n_features + 1
+        self.shift = None
+        self.n = np.zeros(n_folds + 1)
+        self.sums = np.zeros((n_folds + 1, size))
+        self.gram = np.zeros((n_folds + 1, size, size))
+
+    def _slot(self, fold):
+        return self.n_folds if fold == HOLDOUT else fold
+
+    def update(self, X, y, folds):
+        """מוסיף שורות. folds: מספר fold לכל שורה, HOLDOUT (-1) לשורות test"""
+        A = np.column_stack((np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)))
+        if not len(A):
+            return self
+        if self.shift is None:
+            self.shift = A.mean(axis=0)
+        A -= self.shift
+        folds = np.asarray(folds)
+        for fold in np.unique(folds):
+            block = A[folds == fold]
+            slot = self._slot(fold)
+            self.n[slot] += len(block)
+            self.sums[slot] += block.sum(axis=0)
+            self.gram[slot] += block.T @ block
+        return self
+
+    def merge(self, other):
+        """ממזג סטטיסטיקות של שורות אחרות (מוזזות ל-shift של self)"""
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        d = other.shift - self.shift
+        for slot in range(self.n_folds + 1):
+            n, s = other.n[slot], other.sums[slot]
+            self.gram[slot] += other.gram[slot] + np.outer(d, s) + np.outer(s, d) + n * np.outer(d, d)
+            self.sums[slot] += s + n * d
+            self.n[slot] += n
+        return self
+
+    def _block(self, folds):
+        slots = [self._slot(f) for f in folds]
+        return self.n[slots].sum(), self.sums[slots].sum(axis=0), self.gram[slots].sum(axis=0)
+
+    def train_folds(self, exclude=None):
+        return [f for f in range(self.n_folds) if f != exclude]
+
+    def solve(self, folds):
+        """(coef, intercept) של רגרסיה על השורות של folds, ביחידות המקוריות"""
+        n, sums, gram = self._block(folds)
+        p = self.n_features
+        mean = sums / n
+        centered = gram - n * np.outer(mean, mean)
+        cxx, cxy = centered[:p, :p], centered[:p, p]
+        # פתרון על עמודות מנורמלות - מערכת מאוזנת יותר, אותו פתרון
+        scale = np.sqrt(np.clip(np.diag(cxx), 0.0, None))
+        scale[scale == 0] = 1.0
+        coef = np.linalg.lstsq(cxx / np.outer(scale, scale), cxy / scale, rcond=None)[0] / scale
+        intercept = self.shift[p] + mean[p] - coef @ (mean[:p] + self.shift[:p])
+        return coef, float(intercept)
+
+    def sse(self, coef, intercept, folds):
+        """סכום ריבועי השגיאות של המודל על השורות של folds - בלי לחזות"""
+        n, sums, gram = self._block(folds)
+        p = self.n_features
+        # שארית = w . (A - shift) - a, עם w = [-coef, 1]
+        w = np.append(-coef, 1.0)
+        a = intercept - self.shift[p] + coef @ self.shift[:p]
+        return float(max(w @ gram @ w - 2 * a * (w @ sums) + n * a * a, 0.0))
+
+    def rmse(self, coef, intercept, folds):
+        return float(np.sqrt(self.sse(coef, intercept, folds) / self._block(folds)[0]))
+
+    def r2(self, coef, intercept, folds):
+        n, sums, gram = self._block(folds)
+        p = self.n_features
+        total = gram[p, p] - sums[p] ** 2 / n
+        return float(1.0 - self.sse(coef, intercept, folds) / total) if total > 0 else float('nan')
+
+    def cv_rmse(self):
+        """RMSE של כל fold כשהמודל אומן על שאר ה-folds (כמו cross_val_score)"""
+        scores = []
+        for fold in range(self.n_folds):
+            coef, intercept = self.solve(self.train_folds(exclude=fold))
+            scores.append(self.rmse(coef, intercept, [fold]))
+        return np.array(scores)
+
+    def oof_predict(self, X_train):
+        """חיזוי out-of-fold לשורות ה-train (X_train בסדר של update) - מאותם מודלים של cv_rmse"""
+        X_train = np.asarray(X_train, dtype=np.float64)
+        folds = kfold_ids(len(X_train), self.n_folds)
+        oof = np.empty(len(X_train))
+        for fold in range(self.n_folds):
+            coef, intercept = self.solve(self.train_folds(exclude=fold))
+            rows = folds == fold
+            oof[rows] = X_train[rows] @ coef + intercept
+        return oof
+
+    def to_sklearn(self, folds=None):
+        """
+        המודל על folds (ברירת מחדל: כל ה-train) כ-(LinearRegression, StandardScaler)
+        מאומנים - אותו פורמט bundle כמו מאמן sklearn עם scaling.
+        """
+        folds = self.train_folds() if folds is None else folds
+        coef, intercept = self.solve(folds)
+        n, sums, gram = self._block(folds)
+        p = self.n_features
+        mean = sums[:p] / n
+        var = np.clip(np.diag(gram)[:p] / n - mean ** 2, 0.0, None)
+
+        scaler = StandardScaler()
+        scaler.n_features_in_ = p
+        scaler.n_samples_seen_ = int(n)
+        scaler.mean_ = mean + self.shift[:p]
+        scaler.var_ = var
+        scale = np.sqrt(var)
+        scaler.scale_ = np.where(scale == 0, 1.0, scale)
+
+        model = LinearRegression()
+        model.n_features_in_ = p
+        model.coef_ = coef * scaler.scale_
+        model.intercept_ = intercept + coef @ scaler.mean_
+        return model, scaler
+
+
+def fit_arrays(X_train, y_train, X_test=None, y_test=None, n_folds=5, chunk_size=DEFAULT_CHUNK_SIZE):
+    """סטטיסטיקות מ-train/test שכבר בזיכרון (במנות - בלי עותק של המטריצה כולה)"""
+    stats = GramStatistics(X_train.shape[1], n_folds)
+    folds = kfold_ids(len(y_train), n_folds)
+    for start in range(0, len(y_train), chunk_size):
+        end = start + chunk_size
+        stats.update(X_train[start:end], y_train[start:end], folds[start:end])
+    if X_test is not None:
+        for start in range(0, len(y_test), chunk_size):
+            end = start + chunk_size
+            stats.update(X_test[start:end], y_test[start:end], np.full(len(y_test[start:end]), HOLDOUT))
+    return stats
+
+
+def fit_table(path, target_col, n_folds=5, test_size=0.2, random_state=42, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    סטטיסטיקות ישירות מטבלה בדיסק, במנות. הפיצול ל-train/test ול-folds זהה
+    לזה של TrainingContext + cross_val_score, ורק מערך אינדקסים (לא הנתונים)
+    מוחזק בזיכרון. מחזיר (סטטיסטיקות, סכמת הפיצ'רים).
+    """
+    n_rows = sum(len(chunk) for chunk in iter_table(path, chunk_size, columns=[target_col]))
+    train_idx, test_idx = train_test_split(np.arange(n_rows), test_size=test_size, random_state=random_state)
+    # KFold רץ על שורות ה-train לפי הסדר שבו train_test_split החזיר אותן
+    folds = np.empty(n_rows, dtype=np.int64)
+    folds[train_idx] = kfold_ids(len(train_idx), n_folds)
+    folds[test_idx] = HOLDOUT
+
+    stats, schema, offset = None, None, 0
+    for chunk in iter_table(path, chunk_size):
+        if stats is None:
+            features = [col for col in chunk.columns if col != target_col]
+            schema = feature_schema(chunk[features])
+            stats = GramStatistics(len(features), n_folds)
+        stats.update(chunk[features].to_numpy(dtype=np.float64),
+                     chunk[target_col].to_numpy(dtype=np.float64),
+                     folds[offset:offset + len(chunk)])
+        offset += len(chunk)
+    return stats, schema
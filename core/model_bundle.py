@@ -0,0 +1,166 @@
+"""
+Model Bundle - סכמת הפיצ'רים שנשמרת יחד עם המודל ב-model.pkl
+
+כל bundle שנשמר מכיל את רשימת הפיצ'רים לפי הסדר ואת ה-dtypes שלהם, כך
+שמסלול החיזוי לא צריך לקרוא את features.csv כדי לשחזר את סדר העמודות.
+
+פורמט השמירה (save_bundle):
+    model.pkl           - ה-bundle המלא (joblib ללא דחיסה)
+    model_header.pkl    - כל ה-bundle פרט למודל עצמו (קילובייטים)
+    model_compiled/     - מערכי העצים כ-.npy (core.compiled_ensemble)
+
+load_bundle פותח רק את ה-header ואת מערכי העצים ב-mmap (LazyBundle): תהליך
+חדש עולה במילישניות, וכל התהליכים חולקים עותק אחד של המערכים ב-page cache
+של מערכת ההפעלה. מודל sklearn נפרק מ-model.pkl רק כשניגשים אליו - לאצוות
+גדולות מ-CompiledEnsemble.suits, שבהן הוא מהיר יותר. mmap_mode לא חוסך את
+הפריקה הזו: Tree.__setstate__ מעתיק את מערכי הצמתים לזיכרון פרטי של התהליך.
+מודל שלא ניתן להדר (למשל Linear Regression) נטען מ-model.pkl כרגיל.
+"""
+import os
+
+import joblib
+
+from .compiled_ensemble import export_compiled, load_compiled
+
+
+def feature_schema(X):
+    """מחזיר את סכמת הפיצ'רים של מטריצת אימון (DataFrame)"""
+    return {
+        'features': list(X.columns),
+        'feature_dtypes': {col: str(dtype) for col, dtype in X.dtypes.items()}
+    }
+
+
+def bundle_features(model_data):
+    """
+    רשימת הפיצ'רים של ה-bundle לפי הסדר.
+
+    bundles ישנים (ללא 'features') נופלים חזרה ל-feature_names_in_ ש-sklearn
+    שומר כשהמודל/scaler אומנו על DataFrame.
+    """
+    features = model_data.get('features')
+    if features:
+        return list(features)
+    for key in ('scaler', 'model'):
+        names = getattr(model_data.get(key), 'feature_names_in_', None)
+        if names is not None:
+            return list(names)
+    return None
+
+
+def _names_in(model_data):
+    return any(hasattr(model_data.get(key), 'feature_names_in_') for key in ('scaler', 'model'))
+
+
+def _fitted_with_names(model_data):
+    # save_bundle שומר את התשובה ב-header, כך שלא צריך לפרוק את המודל כדי לדעת
+    fitted_with_names = model_data.get('fitted_with_names')
+    if fitted_with_names is not None:
+        return fitted_with_names
+    return _names_in(model_data)
+
+
+def prepare_features(model_data, features_frame):
+    """
+    מסדר DataFrame של פיצ'רים לפי הסכמה השמורה ב-bundle.
+
+    מודלים שאומנו על מערכי NumPy (TrainingContext) מקבלים מערך, ומודלים
+    שאומנו על DataFrame מקבלים DataFrame - כך sklearn לא מתריע על שמות.
+    """
+    columns = bundle_features(model_data)
+    if columns is None:
+        return features_frame
+
+    missing = [col for col in columns if col not in features_frame.columns]
+    if missing:
+        raise ValueError(f"חסרים פיצ'רים שהמודל אומן עליהם: {missing}")
+
+    X = features_frame[columns]
+    dtypes = model_data.get('feature_dtypes')
+    if dtypes:
+        X = X.astype(dtypes)
+    return X if _fitted_with_names(model_data) else X.to_numpy()
+
+
+def header_path(model_path):
+    """outputs/model.pkl -> outputs/model_header.pkl"""
+    stem, ext = os.path.splitext(model_path)
+    return f"{stem}_header{ext}"
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def save_bundle(model_data, model_path):
+    """
+    שומר bundle בפורמט הניתן ל-mmap: model.pkl מלא, מערכי העצים המהודרים
+    ו-header קטן. מחזיר את ה-bundle כפי שנשמר (עם רשומת 'compiled').
+    """
+    model_data = dict(model_data, compiled=export_compiled(model_data['model'], model_path),
+                      fitted_with_names=_names_in(model_data))
+    joblib.dump(model_data, model_path)
+
+    # ה-header נכתב אחרון ומצביע על model.pkl שנכתב - שמירה אחרת של model.pkl
+    # (בלי save_bundle) משנה את החתימה וה-header מתעלם מעצמו
+    header = {key: value for key, value in model_data.items() if key != 'model'}
+    header['source_signature'] = _source_signature(model_path)
+    joblib.dump(header, header_path(model_path))
+    return model_data
+
+
+def _read_header(model_path):
+    path = header_path(model_path)
+    if not os.path.exists(path):
+        return None
+    header = joblib.load(path)
+    if header.pop('source_signature', None) != _source_signature(model_path):
+        return None
+    return header
+
+
+class LazyBundle(dict):
+    """
+    bundle שנפתח מה-header: כל המפתחות פרט ל-'model', והאנסמבל המהודר (ממופה
+    מהדיסק) תחת 'compiled_model'. מודל sklearn נפרק מ-model.pkl רק בגישה
+    הראשונה ל-'model' (כולל get ו-in).
+    """
+
+    def __init__(self, header, model_path, compiled):
+        super().__init__(header, compiled_model=compiled)
+        self.model_path = model_path
+        self.signature = _source_signature(model_path)
+
+    @property
+    def model_loaded(self):
+        return dict.__contains__(self, 'model')
+
+    def __missing__(self, key):
+        if key != 'model':
+            raise KeyError(key)
+        if _source_signature(self.model_path) != self.signature:
+            raise ValueError(f"{self.model_path} נשמר מחדש מאז שה-bundle נפתח - יש לטעון אותו מחדש")
+        model = joblib.load(self.model_path)['model']
+        self['model'] = model
+        return model
+
+    def __contains__(self, key):
+        return key == 'model' or dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+def load_bundle(model_path, mmap=True):
+    """
+    טוען bundle. עם mmap=True ו-header תקף מוחזר LazyBundle - ה-header והאנסמבל
+    המהודר ב-mmap, ומודל sklearn רק כשניגשים אליו. אחרת - model.pkl המלא,
+    כשעם mmap=True מערכי NumPy שבו ממופים (mmap_mode) במקום להיקרא לזיכרון.
+    """
+    if mmap:
+        header = _read_header(model_path)
+        compiled = load_compiled(header, model_path) if header else None
+        if compiled is not None:
+            return LazyBundle(header, model_path, compiled)
+    return joblib.load(model_path, mmap_mode='r' if mmap else None)
@@ -0,0 +1,241 @@
+"""
+Partitioned Tables - קליטה מצטברת (append-only) של נתונים בתוספות יומיות
+
+טבלה מחולקת היא תיקייה (outputs/raw_data/) עם קובץ partition לכל תוספת
+(part-00001.parquet / .csv) ו-manifest (_partitions.json) שמתעד את סדר
+ה-partitions, מקורם, מספר השורות ואילו שלבים עוד צריכים לעבד כל אחד.
+
+הזרימה:
+    append_delta      - קובץ delta נכתב כ-partition חדש, ופרופיל החוזה
+                        (ContractProfiler שנשמר ליד ה-partitions) ממוזג
+                        איתו בלי לקרוא את ההיסטוריה
+    process_pending   - שלב (ניקוי, פיצ'רים) מעבד רק partitions שממתינים
+                        לו, וכותב partition באותו שם בטבלת היעד. הניקוי
+                        בודק outliers מול גבולות IQR של כל ההיסטוריה
+                        (OutlierHistory שנשמרת ליד ה-partitions המנוקים)
+
+הקוראים (read_table, iter_table) רואים טבלה מחולקת כטבלה אחת - ראו core.storage.
+"""
+import json
+import os
+from datetime import datetime
+
+import joblib
+
+from .cleaning import OutlierHistory
+from .contract import ContractProfiler, profile_frame, profile_table
+from .stage_cache import content_digest
+from .storage import (
+    PARTITION_MANIFEST,
+    TABLE_EXTENSIONS,
+    read_table,
+    read_table_columns,
+    table_exists,
+    table_path,
+    table_stem,
+    write_table,
+)
+
+PROFILE_FILE = '_contract_profile.pkl'
+OUTLIER_HISTORY_FILE = '_outlier_history.pkl'
+
+
+class PartitionedTable:
+    """טבלה שמורכבת מ-partitions לפי סדר ההוספה"""
+
+    def __init__(self, path):
+        self.path = path
+        self.root = table_stem(path)
+        self.manifest_path = os.path.join(self.root, PARTITION_MANIFEST)
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'partitions': [], 'next_id': 1, 'meta': {}}
+
+    @property
+    def exists(self):
+        return os.path.isfile(self.manifest_path)
+
+    @property
+    def partitions(self):
+        return self.manifest['partitions']
+
+    @property
+    def meta(self):
+        """מידע ברמת הטבלה (למשל סדר העמודות של טרנספורמציית הפיצ'רים)"""
+        return self.manifest.setdefault('meta', {})
+
+    @property
+    def rows(self):
+        return sum(entry['rows'] for entry in self.partitions)
+
+    def names(self):
+        return [entry['name'] for entry in self.partitions]
+
+    def entry(self, name):
+        return next((entry for entry in self.partitions if entry['name'] == name), None)
+
+    def find(self, **fields):
+        """ה-partition הראשון שכל השדות שלו תואמים, או None"""
+        return next((entry for entry in self.partitions
+                     if all(entry.get(k) == v for k, v in fields.items())), None)
+
+    def partition_path(self, name):
+        return os.path.join(self.root, name + TABLE_EXTENSIONS['csv'])
+
+    def read_partition(self, name, columns=None):
+        return read_table(self.partition_path(name), columns)
+
+    def pending(self, stage):
+        """partitions שעוד לא עובדו בשלב stage"""
+        return [entry['name'] for entry in self.partitions if stage in entry.get('pending', [])]
+
+    def _new_name(self):
+        name = f"part-{self.manifest['next_id']:05d}"
+        self.manifest['next_id'] += 1
+        return name
+
+    def append(self, df, pending=(), formats=None, **fields):
+        """כותב df כ-partition חדש בסוף הטבלה ומחזיר את שמו"""
+        name = self._new_name()
+        os.makedirs(self.root, exist_ok=True)
+        write_table(df, self.partition_path(name), formats)
+        self.record(name, rows=len(df), pending=pending, **fields)
+        return name
+
+    def adopt(self, path, rows, pending=(), **fields):
+        """מעביר טבלה רגילה קיימת (קובץ אחד) להיות ה-partition הראשון, בלי להעתיק נתונים"""
+        name = self._new_name()
+        os.makedirs(self.root, exist_ok=True)
+        for fmt in TABLE_EXTENSIONS:
+            source = table_path(path, fmt)
+            if os.path.exists(source):
+                os.replace(source, table_path(self.partition_path(name), fmt))
+        self.record(name, rows=rows, pending=pending, **fields)
+        return name
+
+    def record(self, name, rows, pending=(), **fields):
+        """רושם (או מעדכן) partition שהקובץ שלו כבר נכתב"""
+        entry = {'name': name, 'rows': int(rows), 'created': datetime.now().isoformat(),
+                 'pending': list(pending), **fields}
+        existing = self.entry(name)
+        if existing is None:
+            self.partitions.append(entry)
+        else:
+            existing.clear()
+            existing.update(entry)
+        self.save()
+
+    def mark_done(self, stage, name):
+        entry = self.entry(name)
+        if entry is not None and stage in entry.get('pending', []):
+            entry['pending'].remove(stage)
+            self.save()
+
+    def save(self):
+        created = not self.exists
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, self.manifest_path)
+        if created:
+            # טבלה היא או קובץ אחד או מחולקת - הגרסה הישנה כקובץ אחד כבר לא רלוונטית
+            for fmt in TABLE_EXTENSIONS:
+                stale = table_path(self.path, fmt)
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+
+def _profile_path(table):
+    return os.path.join(table.root, PROFILE_FILE)
+
+
+def load_profile(table, exact=False):
+    """פרופיל החוזה המצטבר של הטבלה (נבנה מחדש מכל ה-partitions אם חסר)"""
+    path = _profile_path(table)
+    if os.path.exists(path):
+        profiler = joblib.load(path)
+        if profiler.exact == exact:
+            return profiler
+    if table.exists and table.partitions:
+        return profile_table(table.path, exact=exact)
+    return ContractProfiler(exact=exact)
+
+
+def load_outlier_history(source, target_path):
+    """
+    גבולות ה-IQR המצטברים של הניקוי (נשמרים ליד הטבלה המנוקה). היסטוריה
+    שלא תואמת את ה-partitions של המקור (למשל raw_data שנבנה מחדש) מתחילה מחדש.
+    """
+    path = os.path.join(table_stem(target_path), OUTLIER_HISTORY_FILE)
+    if os.path.exists(path):
+        history = joblib.load(path)
+        if history.covers(source.partitions):
+            return history
+    return OutlierHistory()
+
+
+def save_outlier_history(target, history):
+    os.makedirs(target.root, exist_ok=True)
+    joblib.dump(history, os.path.join(target.root, OUTLIER_HISTORY_FILE))
+
+
+def append_delta(raw_path, delta_path, exact=False, pending=('cleaning',)):
+    """
+    קולט קובץ delta כ-partition חדש של raw_path ומעדכן את פרופיל החוזה.
+    אם raw_path עדיין קובץ אחד, הוא הופך ל-partition הראשון.
+    מחזיר (טבלה, פרופיל, שם ה-partition) - השם None אם הקובץ כבר נקלט בעבר.
+    """
+    table = PartitionedTable(raw_path)
+    if not table.exists and table_exists(raw_path):
+        profiler = profile_table(raw_path, exact=exact)
+        table.adopt(raw_path, rows=profiler.rows, pending=pending,
+                    source=os.path.basename(raw_path))
+        joblib.dump(profiler, _profile_path(table))
+    else:
+        profiler = load_profile(table, exact=exact)
+
+    digest = content_digest(delta_path)
+    if table.find(digest=digest) is not None:
+        return table, profiler, None
+
+    df = read_table(delta_path)
+    if table.partitions:
+        expected = read_table_columns(table.partition_path(table.partitions[0]['name']))
+        if list(df.columns) != expected:
+            raise ValueError(f"העמודות בקובץ {delta_path} לא תואמות לטבלה: {list(df.columns)} != {expected}")
+
+    name = table.append(df, pending=pending, source=os.path.basename(delta_path), digest=digest)
+    profiler.merge(profile_frame(df, exact=exact))
+    joblib.dump(profiler, _profile_path(table))
+    return table, profiler, name
+
+
+def process_pending(source_path, target_path, stage, func, next_stages=()):
+    """
+    מריץ func(קובץ מקור, קובץ יעד) על כל partition של המקור שממתין לשלב stage
+    (או שחסר ביעד). func כותב את ה-partition ומחזיר dict עם 'rows' ושדות
+    נוספים לרישום. מחזיר (טבלת היעד, שמות ה-partitions שעובדו).
+    """
+    source = PartitionedTable(source_path)
+    target = PartitionedTable(target_path)
+    waiting = set(source.pending(stage))
+    done = set(target.names())
+    processed = []
+
+    os.makedirs(target.root, exist_ok=True)
+    for name in source.names():
+        if name not in waiting and name in done:
+            continue
+        fields = func(source.partition_path(name), target.partition_path(name))
+        target.record(name, pending=next_stages, **fields)
+        source.mark_done(stage, name)
+        processed.append(name)
+
+    # partition שעובד מחדש (למשל כי נמחק מהיעד) חוזר למקומו לפי סדר המקור
+    order = {name: i for i, name in enumerate(source.names())}
+    target.partitions.sort(key=lambda entry: order.get(entry['name'], len(order)))
+    target.save()
+    return target, processed
@@ -0,0 +1,111 @@
+"""
+Prediction Cache - החיזויים של המאמן נשמרים ליד המודל ולא מחושבים שוב
+
+המאמנים כבר חוזים את ה-train וה-test כדי לחשב מטריקות. ModelComparisonTool
+שומר את החיזויים של המודל הזוכה ליד ה-bundle:
+
+    model.pkl               - ה-bundle (core.model_bundle)
+    model_predictions.npz   - y_true וחיזויים ל-train ול-test, ו-out-of-fold
+                              (חיזוי כל שורת train ממודל שלא ראה אותה) כשיש
+
+הקובץ מפתח לפי hash של הנתונים (מטריצת הפיצ'רים, ה-target והפיצול - כמו
+ב-TrainingContext.data_hash) ולפי חתימת model.pkl. הערכה, גרפי residuals,
+ניתוח overfitting ו-Model Card קוראים ממנו, וחוזים מחדש רק כשהנתונים או
+המודל השתנו.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from .model_bundle import _source_signature
+
+SPLITS = ('train', 'test', 'oof')
+
+
+def predictions_path(model_path):
+    """outputs/model.pkl -> outputs/model_predictions.npz"""
+    stem, _ = os.path.splitext(model_path)
+    return f"{stem}_predictions.npz"
+
+
+def data_hash(*arrays):
+    """sha256 של מערכים (צורה, dtype ותוכן) - מזהה של הנתונים והפיצול"""
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode('ascii'))
+        digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+def trainer_predictions(context, train, test, oof=None):
+    """רשומת 'predictions' שהמאמנים מחזירים (נשמרת ע"י save_predictions)"""
+    return {
+        'data_hash': context.data_hash,
+        'y_train': context.y_train,
+        'y_test': context.y_test,
+        'train': train,
+        'test': test,
+        'oof': oof,
+    }
+
+
+def save_predictions(model_path, predictions):
+    """
+    שומר את החיזויים של המאמן (dict עם data_hash, y_train/y_test ו-train/test,
+    ואופציונלית oof) ליד model.pkl שכבר נשמר.
+    """
+    arrays = {key: np.asarray(predictions[key], dtype=np.float64)
+              for key in ('y_train', 'y_test', *SPLITS) if predictions.get(key) is not None}
+    path = predictions_path(model_path)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, data_hash=np.array(predictions['data_hash']),
+             model_signature=np.array(_source_signature(model_path)), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def load_predictions(model_path, expected_hash=None):
+    """
+    החיזויים השמורים של model.pkl, או None אם אין, אם model.pkl נשמר מאז,
+    או אם הם חושבו על נתונים אחרים (expected_hash).
+    """
+    path = predictions_path(model_path)
+    if not os.path.exists(path) or not os.path.exists(model_path):
+        return None
+    try:
+        with np.load(path) as saved:
+            cached = {key: saved[key] for key in saved.files}
+    except (OSError, ValueError):
+        return None
+    if list(cached.pop('model_signature')) != _source_signature(model_path):
+        return None
+    cached['data_hash'] = str(cached['data_hash'])
+    if expected_hash is not None and cached['data_hash'] != expected_hash:
+        return None
+    return cached
+
+
+def split_predictions(model_path, model_data, context, split='test'):
+    """
+    החיזויים של split ('train' או 'test') ב-context: מה-cache כשהוא תקף,
+    אחרת חיזוי (עם ה-scaler של ה-bundle) - במנוע המהודר כשהוא מתאים לגודל.
+    """
+    cached = load_predictions(model_path, context.data_hash)
+    if cached is not None and split in cached:
+        return cached[split]
+    X = context.X_train if split == 'train' else context.X_test
+    scaler = model_data.get('scaler')
+    if scaler:
+        X = scaler.transform(X)
+    compiled = model_data.get('compiled_model')
+    if compiled is not None and compiled.suits(len(X)):
+        return compiled.predict(X)
+    return model_data['model'].predict(X)
+
+
+def split_rmse(cached, split):
+    """RMSE של split מתוך חיזויים שמורים (oof מושווה ל-y_train)"""
+    y_true = cached['y_test'] if split == 'test' else cached['y_train']
+    return float(np.sqrt(np.mean((y_true - cached[split]) ** 2)))
@@ -0,0 +1,66 @@
+"""
+Predictor - חיזוי מחירים מרשומות גולמיות בעזרת ה-bundle השמור
+
+מחבר בין טרנספורמציית הפיצ'רים המשותפת (core.features) לבין model.pkl,
+כך שכל משטחי החיזוי (batch, שרת, dashboard) עוברים באותו מסלול בדיוק.
+אם נשמר לצד המודל אנסמבל מהודר (core.compiled_ensemble), אצוות קטנות
+(CompiledEnsemble.suits) עוברות דרכו - עם תוצאות זהות ל-model.predict -
+ואצוות גדולות עוברות דרך מודל sklearn, שנפרק מ-model.pkl רק באצווה הגדולה
+הראשונה (core.model_bundle.LazyBundle).
+"""
+import os
+
+import numpy as np
+
+from .compiled_ensemble import load_compiled
+from .features import HousingFeatureTransformer
+from .model_bundle import load_bundle, prepare_features
+
+
+class Predictor:
+    """מודל + טרנספורמציה, מוכן לחיזוי על DataFrame או dict של עמודות"""
+
+    def __init__(self, model_data, transformer, compiled=None):
+        self.model_data = model_data
+        self.scaler = model_data.get('scaler')
+        self.transformer = transformer
+        # load_bundle(mmap=True) כבר טוען את המנוע המהודר לצד המודל
+        self.compiled = compiled if compiled is not None else model_data.get('compiled_model')
+        self.single_threaded = False
+
+    @classmethod
+    def from_paths(cls, model_path="outputs/model.pkl", city_mapping_path="outputs/city_mapping.json",
+                   mmap=True):
+        """
+        טוען את ה-bundle ואת מיפוי הערים מהדיסק.
+        mmap=False קורא את מערכי המודל לזיכרון במקום למפות אותם מהדיסק.
+        """
+        model_data = load_bundle(model_path, mmap=mmap)
+        if city_mapping_path and os.path.exists(city_mapping_path):
+            transformer = HousingFeatureTransformer.from_city_mapping(city_mapping_path)
+        else:
+            transformer = HousingFeatureTransformer()
+        compiled = model_data.get('compiled_model') or load_compiled(model_data, model_path)
+        return cls(model_data, transformer, compiled=compiled)
+
+    @property
+    def model(self):
+        """מודל sklearn - נפרק מ-model.pkl בגישה הראשונה כשה-bundle נפתח מה-header"""
+        model = self.model_data['model']
+        if self.single_threaded and hasattr(model, 'n_jobs'):
+            model.n_jobs = 1
+        return model
+
+    def limit_threads(self):
+        """מכבה n_jobs פנימי של המודל - כשהמקביליות מנוהלת מבחוץ"""
+        self.single_threaded = True
+        return self
+
+    def predict(self, data):
+        """חיזוי לכל השורות - מחזיר מערך float64 בגודל n"""
+        X = prepare_features(self.model_data, self.transformer.transform_frame(data))
+        if self.scaler:
+            X = self.scaler.transform(X)
+        if self.compiled is not None and self.compiled.suits(len(X)):
+            return self.compiled.predict(X)
+        return np.asarray(self.model.predict(X), dtype=np.float64)
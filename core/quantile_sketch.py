@@ -0,0 +1,84 @@
+"""
+Quantile Sketch - סקיצת קוונטילים ניתנת למיזוג (בסגנון KLL)
+
+הסקיצה מחזיקה מדרג של "דוחסים": רמה h מחזיקה ערכים שכל אחד מהם מייצג
+2^h ערכים מקוריים. כשרמה מתמלאת היא ממוינת, ומחצית מהערכים (זוגיים או
+אי-זוגיים, לסירוגין) עוברת לרמה הבאה. הזיכרון חסום בכ-k * log(n) ערכים,
+ושתי סקיצות של מנות שונות מתמזגות לסקיצה אחת של כל הנתונים - כך אפשר
+לעבד קובץ במנות (או במקביל) ולקבל קוונטילים משוערים של הקובץ כולו.
+"""
+import numpy as np
+
+
+class QuantileSketch:
+    """סקיצת קוונטילים משוערת עם שגיאת דירוג של כ-1/k מהנתונים"""
+
+    def __init__(self, k=2048):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._flip = False
+
+    def update(self, values):
+        """מוסיף מערך ערכים (NaN ו-inf מתעלמים - כמו pandas.quantile אחרי ניקוי)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """ממזג סקיצה אחרת לתוך זו"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate((self.levels[h], items))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # מספר אי-זוגי של פריטים - האחרון נשאר ברמה הנוכחית
+                keep = items[len(items) - len(items) % 2:]
+                pairs = items[:len(items) - len(items) % 2]
+                # בחירה לסירוגין של הזוגיים/האי-זוגיים - דטרמיניסטית ולא מוטה
+                self._flip = not self._flip
+                promoted = pairs[int(self._flip)::2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate((self.levels[h + 1], promoted))
+            h += 1
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """קוונטיל משוער (q יחיד או מערך) - NaN אם הסקיצה ריקה"""
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        values, cumulative = self._weighted()
+        ranks = q * cumulative[-1]
+        idx = np.clip(np.searchsorted(cumulative, ranks, side='left'), 0, len(values) - 1)
+        result = values[idx]
+        # הקצוות ידועים במדויק
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result if q.ndim else float(result)
@@ -0,0 +1,309 @@
+"""
+Hyperparameter Search - מנוע חיפוש היפר-פרמטרים עם אסטרטגיות ניתנות להחלפה
+
+אסטרטגיות:
+    grid           - GridSearchCV מלא (ההתנהגות המקורית)
+    random         - RandomizedSearchCV עם תקציב של n_iter מועמדים
+    halving        - Successive Halving על הגריד: כל המועמדים מתחילים עם מעט
+                     משאבים (דגימות או n_estimators), והחלשים נגזמים בכל סבב
+    halving_random - Successive Halving על מדגם אקראי של מועמדים
+    staged         - למודלי boosting: לכל צירוף של שאר הפרמטרים מאמנים רק את
+                     האנסמבל הגדול ביותר, וכל ערך קטן יותר של n_estimators
+                     מוערך מ-staged_predict (קידומת של אותו אנסמבל)
+
+האסטרטגיה נבחרת בפרמטר strategy או במשתנה הסביבה SEARCH_STRATEGY
+(ברירת מחדל: halving, או ברירת המחדל של הקורא). כל האובייקטים המוחזרים הם חיפושים עם
+ממשק sklearn: fit, best_estimator_, best_params_, best_score_, cv_results_.
+
+כל האסטרטגיות מריצות את משימות (מועמד, fold) ב-SharedCVExecutor
+(core.shared_cv): X ו-y עוברים לעובדים פעם אחת בזיכרון משותף במקום להיארז
+לכל משימה. המועמדים, ה-folds, הדגימה של Halving והבחירה זהים לאלה של
+GridSearchCV / RandomizedSearchCV / Halving*SearchCV, ולכן גם התוצאות.
+"""
+import os
+from math import ceil, floor, log
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import get_scorer, mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, check_cv
+from sklearn.utils import resample
+
+from .shared_cv import SharedCVExecutor
+
+
+SEARCH_STRATEGIES = ('grid', 'random', 'halving', 'halving_random', 'staged')
+DEFAULT_STRATEGY = 'halving'
+
+
+def resolve_strategy(strategy=None, default=None):
+    strategy = (strategy or os.environ.get('SEARCH_STRATEGY') or default or DEFAULT_STRATEGY).lower()
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"אסטרטגיית חיפוש לא מוכרת: {strategy}. אפשרויות: {SEARCH_STRATEGIES}")
+    return strategy
+
+
+def make_search(estimator, param_grid, strategy=None, resource='n_samples', cv=3,
+                scoring='neg_root_mean_squared_error', n_jobs=-1, n_iter=10,
+                factor=3, random_state=42, default=None):
+    """
+    בונה אובייקט חיפוש לפי האסטרטגיה.
+
+    resource: המשאב שמוקצה בהדרגה ב-halving - 'n_samples' או שם של פרמטר
+    המודל (למשל 'n_estimators'). אם המשאב מופיע בגריד, הוא מוסר ממנו
+    והערך המקסימלי שלו הופך לתקציב של הסבב האחרון.
+
+    default: אסטרטגיה לשימוש כשלא נבחרה אחת במפורש או ב-SEARCH_STRATEGY.
+
+    לאובייקט המוחזר יש מאפיין strategy - האסטרטגיה שבה החיפוש רץ בפועל.
+    """
+    strategy = resolve_strategy(strategy, default)
+    if strategy == 'staged' and not (hasattr(estimator, 'staged_predict')
+                                     and 'n_estimators' in estimator.get_params()):
+        # רק למודלים עם staged_predict ו-n_estimators; לשאר - גריד רגיל
+        strategy = 'grid'
+
+    search = _build_search(estimator, param_grid, strategy, resource, dict(cv=cv, scoring=scoring, n_jobs=n_jobs),
+                           n_iter, factor, random_state)
+    search.strategy = strategy
+    return search
+
+
+def _build_search(estimator, param_grid, strategy, resource, common, n_iter, factor, random_state):
+    if strategy == 'grid':
+        return SharedSearchCV(estimator, list(ParameterGrid(param_grid)), **common)
+
+    if strategy == 'staged':
+        return StagedBoostingSearch(estimator, param_grid, **common)
+
+    if strategy == 'random':
+        return SharedSearchCV(estimator, _sample_candidates(param_grid, n_iter, random_state), **common)
+
+    # Successive Halving
+    param_grid = dict(param_grid)
+    halving = dict(factor=factor, resource=resource, random_state=random_state, **common)
+    if resource != 'n_samples':
+        values = param_grid.pop(resource, None)
+        halving['max_resources'] = max(values) if values else getattr(estimator, resource)
+
+    if strategy == 'halving':
+        return SharedHalvingSearch(estimator, list(ParameterGrid(param_grid)), **halving)
+    # ברירות המחדל של HalvingRandomSearchCV: דגימות מתחילות מהמינימום
+    if resource == 'n_samples':
+        halving['min_resources'] = 'smallest'
+    return SharedHalvingSearch(estimator, _sample_candidates(param_grid, n_iter, random_state), **halving)
+
+
+def _sample_candidates(param_grid, n_iter, random_state):
+    """מדגם המועמדים של RandomizedSearchCV (אותו ParameterSampler ואותו seed)"""
+    return list(ParameterSampler(param_grid, min(n_iter, len(ParameterGrid(param_grid))),
+                                 random_state=random_state))
+
+
+def _fit_and_score(X, y, train, test, estimator, params, scoring):
+    """מאמן מועמד אחד על fold אחד ומחזיר את הציון על חלק ה-test (רץ בעובד)"""
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train], y[train])
+    return float(get_scorer(scoring)(model, X[test], y[test]))
+
+
+def _ranks(means):
+    """דירוג 1..n לפי ציון יורד (שוויון - לפי הסדר)"""
+    order = np.argsort(-np.asarray(means), kind='stable')
+    ranks = np.empty(len(order), dtype=int)
+    ranks[order] = np.arange(1, len(order) + 1)
+    return ranks
+
+
+class SharedSearchCV:
+    """
+    חיפוש על רשימת מועמדים (גריד מלא או מדגם אקראי) - אותה בחירה כמו
+    GridSearchCV / RandomizedSearchCV, כשכל משימות (מועמד, fold) רצות
+    ב-SharedCVExecutor על X, y בזיכרון משותף.
+    """
+
+    def __init__(self, estimator, candidates, cv=3, scoring='neg_root_mean_squared_error', n_jobs=-1):
+        self.estimator = estimator
+        self.candidates = candidates
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+
+    def _evaluate(self, executor, candidates, folds, results, **extra):
+        """מעריך מועמדים על folds, מוסיף שורות ל-results ומחזיר את ממוצע הציונים"""
+        estimator = executor.worker_estimator(self.estimator)
+        jobs = [(train, test, (estimator, params, self.scoring))
+                for params in candidates for train, test in folds]
+        scores = np.array(executor.map(_fit_and_score, jobs)).reshape(len(candidates), len(folds))
+        means = scores.mean(axis=1)
+        results['params'].extend(candidates)
+        results['mean_test_score'].extend(means.tolist())
+        results['std_test_score'].extend(scores.std(axis=1).tolist())
+        for key, value in extra.items():
+            results.setdefault(key, []).extend([value] * len(candidates))
+        return means
+
+    def _search(self, executor, folds, results):
+        """מריץ את החיפוש ומחזיר את האינדקס של המועמד הנבחר ב-results"""
+        return int(np.argmax(self._evaluate(executor, self.candidates, folds, results)))
+
+    def fit(self, X, y):
+        X, y = np.asarray(X), np.asarray(y)
+        folds = list(check_cv(self.cv, y).split(X, y))
+        self.n_splits_ = len(folds)
+
+        results = {'params': [], 'mean_test_score': [], 'std_test_score': []}
+        with SharedCVExecutor(X, y, self.n_jobs) as executor:
+            self.best_index_ = self._search(executor, folds, results)
+        results['rank_test_score'] = _ranks(results['mean_test_score'])
+        self.cv_results_ = results
+
+        self.best_params_ = results['params'][self.best_index_]
+        self.best_score_ = results['mean_test_score'][self.best_index_]
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+
+class SharedHalvingSearch(SharedSearchCV):
+    """
+    Successive Halving (כמו Halving*SearchCV): בכל סבב המועמדים מוערכים עם
+    משאב גדל פי factor, ורק השליש העליון (1/factor) עובר הלאה.
+    min_resources: 'exhaust' (הסבב האחרון מגיע ל-max_resources) או 'smallest'. resource הוא 'n_samples' (דגימה מכל fold) או פרמטר של המודל
+    (למשל n_estimators) שערכו המקסימלי max_resources. כל הסבבים רצים על אותו
+    pool ואותו זיכרון משותף.
+    """
+
+    def __init__(self, estimator, candidates, cv=3, scoring='neg_root_mean_squared_error', n_jobs=-1,
+                 factor=3, resource='n_samples', max_resources='auto', min_resources='exhaust',
+                 random_state=None):
+        super().__init__(estimator, candidates, cv=cv, scoring=scoring, n_jobs=n_jobs)
+        self.factor = factor
+        self.resource = resource
+        self.max_resources = max_resources
+        self.min_resources = min_resources
+        self.random_state = random_state
+
+    def _subsample(self, folds, fraction):
+        return [(resample(train, replace=False, random_state=self.random_state,
+                          n_samples=int(fraction * len(train))),
+                 resample(test, replace=False, random_state=self.random_state,
+                          n_samples=int(fraction * len(test))))
+                for train, test in folds]
+
+    def _search(self, executor, folds, results):
+        candidates = list(self.candidates)
+        n_samples = len(executor.y)
+        if self.resource == 'n_samples':
+            min_resources = self.n_splits_ * 2
+            max_resources = n_samples if self.max_resources == 'auto' else self.max_resources
+        else:
+            min_resources, max_resources = 1, self.max_resources
+
+        n_required = 1 + floor(log(len(candidates), self.factor))
+        if self.min_resources == 'exhaust':
+            # המשאב ההתחלתי הגדול ביותר שבו הסבב האחרון מגיע ל-max_resources
+            min_resources = max(min_resources, max_resources // self.factor ** (n_required - 1))
+        n_possible = 1 + floor(log(max_resources // min_resources, self.factor))
+
+        self.n_resources_, self.n_candidates_ = [], []
+        for itr in range(min(n_possible, n_required)):
+            n_resources = min(int(self.factor ** itr * min_resources), max_resources)
+            self.n_resources_.append(n_resources)
+            self.n_candidates_.append(len(candidates))
+
+            if self.resource == 'n_samples':
+                round_folds = self._subsample(folds, n_resources / n_samples)
+            else:
+                round_folds = folds
+                candidates = [{**params, self.resource: n_resources} for params in candidates]
+
+            start = len(results['params'])
+            means = self._evaluate(executor, candidates, round_folds, results,
+                                   iter=itr, n_resources=n_resources)
+
+            # הטובים עוברים לסבב הבא (אותו סדר כמו sklearn: NaN בהתחלה, הטוב אחרון)
+            order = np.roll(np.argsort(means), np.count_nonzero(np.isnan(means)))
+            best = start + (0 if np.isnan(means).all() else int(np.nanargmax(means)))
+            candidates = [candidates[i] for i in order[-ceil(len(candidates) / self.factor):]]
+        return best
+
+
+# מטריקות שמחושבות ישירות מחיזויים (staged_predict לא עובר דרך scorer)
+_STAGED_SCORERS = {
+    'neg_root_mean_squared_error': lambda y, pred: -np.sqrt(mean_squared_error(y, pred)),
+    'neg_mean_squared_error': lambda y, pred: -mean_squared_error(y, pred),
+    'neg_mean_absolute_error': lambda y, pred: -mean_absolute_error(y, pred),
+    'r2': r2_score,
+}
+
+
+def _staged_fold_scores(X, y, train, test, estimator, params, n_estimators, scoring):
+    """מאמן את האנסמבל הגדול פעם אחת ומחזיר ציון לכל גודל קידומת (רץ בעובד)"""
+    score_func = _STAGED_SCORERS[scoring]
+    model = clone(estimator).set_params(**params, n_estimators=max(n_estimators))
+    model.fit(X[train], y[train])
+
+    wanted = set(n_estimators)
+    scores = {}
+    for stage, pred in enumerate(model.staged_predict(X[test]), start=1):
+        if stage in wanted:
+            scores[stage] = score_func(y[test], pred)
+    return scores
+
+
+class StagedBoostingSearch:
+    """
+    חיפוש גריד למודלי boosting שבו n_estimators לא מוסיף אימונים.
+
+    לכל צירוף של שאר הפרמטרים ולכל fold מאומן אנסמבל אחד בגודל המקסימלי,
+    וכל הערכים הקטנים יותר של n_estimators מוערכים מהחיזויים המדורגים שלו.
+    התוצאות זהות לחיפוש גריד מלא (הקידומת של אנסמבל היא אותו מודל), והממשק
+    זהה לחיפושי sklearn: best_params_, best_score_, best_estimator_, cv_results_.
+    """
+
+    def __init__(self, estimator, param_grid, cv=3, scoring='neg_root_mean_squared_error', n_jobs=-1):
+        if scoring not in _STAGED_SCORERS:
+            raise ValueError(f"מטריקה לא נתמכת בחיפוש staged: {scoring}")
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        X, y = np.asarray(X), np.asarray(y)
+        grid = dict(self.param_grid)
+        n_estimators = sorted(grid.pop('n_estimators', [self.estimator.n_estimators]))
+        combos = list(ParameterGrid(grid))
+        folds = list(check_cv(self.cv, y).split(X, y))
+
+        with SharedCVExecutor(X, y, self.n_jobs) as executor:
+            estimator = executor.worker_estimator(self.estimator)
+            jobs = [(train, test, (estimator, params, n_estimators, self.scoring))
+                    for params in combos for train, test in folds]
+            fold_scores = executor.map(_staged_fold_scores, jobs)
+
+        # טבלת תוצאות בפורמט של cv_results_ - שורה לכל (צירוף, n_estimators)
+        results = {'params': [], 'mean_test_score': [], 'std_test_score': []}
+        for i, params in enumerate(combos):
+            per_fold = fold_scores[i * len(folds):(i + 1) * len(folds)]
+            for n in n_estimators:
+                scores = [fold[n] for fold in per_fold]
+                results['params'].append({**params, 'n_estimators': n})
+                results['mean_test_score'].append(float(np.mean(scores)))
+                results['std_test_score'].append(float(np.std(scores)))
+
+        results['rank_test_score'] = _ranks(results['mean_test_score'])
+        self.cv_results_ = results
+
+        self.best_index_ = int(np.argmax(results['mean_test_score']))
+        self.best_params_ = results['params'][self.best_index_]
+        self.best_score_ = results['mean_test_score'][self.best_index_]
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
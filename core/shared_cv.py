@@ -0,0 +1,142 @@
+"""
+Shared CV - cross-validation על process pool עם נתוני אימון בזיכרון משותף
+
+חיפוש היפר-פרמטרים מריץ משימה לכל (מועמד, fold). כשכל משימה מקבלת את X
+ו-y כארגומנטים, המטריצה נארזת ונשלחת לעובדים שוב ושוב, ולכל עובד יש עותק
+משלו - הזיכרון גדל עם מספר העובדים.
+
+SharedCVExecutor מעתיק את X ו-y פעם אחת ל-multiprocessing.shared_memory,
+וכל עובד ב-pool מתחבר אליהם פעם אחת (ב-initializer) כמערך קריאה-בלבד על
+אותו buffer. משימה שולחת רק את אינדקסי ה-fold ואת הפרמטרים, ורק תת-המטריצה
+של ה-fold (X[train]) מועתקת - לזמן האימון. עם עובד אחד הכל רץ בתהליך הנוכחי,
+בלי זיכרון משותף ובלי הרמת תהליכים.
+
+המקביליות היא ברמת ה-pool: כל עובד מוגבל ל-thread אחד (BLAS/OpenMP), ומודל
+עם n_jobs מאומן בו עם n_jobs=1 (worker_estimator) - אחרת cpu_count עובדים
+שכל אחד מהם פותח cpu_count threads מעמיסים cpu_count^2 threads על המכונה.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from sklearn.base import clone
+from threadpoolctl import threadpool_limits
+
+# המערכים שהעובד הנוכחי מחובר אליהם (מוגדר ב-initializer של ה-pool)
+_WORKER = {}
+
+
+def effective_n_jobs(n_jobs):
+    """מספר העובדים בפועל, באותה משמעות כמו ב-sklearn (None=1, -1=כל הליבות)"""
+    cores = os.cpu_count() or 1
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, cores + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+class SharedArrays:
+    """מערכי NumPy בזיכרון משותף. spec (שם, צורה, dtype) נשלח לעובדים במקום הנתונים"""
+
+    def __init__(self, **arrays):
+        self._segments = []
+        self.spec = {}
+        try:
+            for key, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._segments.append(segment)
+                np.ndarray(array.shape, array.dtype, buffer=segment.buf)[...] = array
+                self.spec[key] = (segment.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(spec):
+    """מחבר את התהליך הנוכחי למערכים של spec. מחזיר {שם: מערך קריאה-בלבד}"""
+    arrays = {}
+    for key, (name, shape, dtype) in spec.items():
+        segment = shared_memory.SharedMemory(name=name)
+        array = np.ndarray(shape, dtype, buffer=segment.buf)
+        array.flags.writeable = False
+        # ה-segment נשמר כדי שה-buffer יישאר ממופה כל עוד העובד חי
+        _WORKER.setdefault('segments', []).append(segment)
+        arrays[key] = array
+    return arrays
+
+
+def _attach_worker(spec):
+    # ה-limits נשארים בתוקף לכל חיי העובד
+    _WORKER['threadpool_limits'] = threadpool_limits(limits=1)
+    _WORKER.update(attach(spec))
+
+
+def _run_job(func, train, test, args):
+    return func(_WORKER['X'], _WORKER['y'], train, test, *args)
+
+
+class SharedCVExecutor:
+    """
+    מריץ משימות CV - func(X, y, train, test, *args) - על X, y משותפים.
+
+        with SharedCVExecutor(X, y, n_jobs=-1) as executor:
+            scores = executor.map(func, [(train, test, args), ...])
+
+    ה-pool והזיכרון המשותף חיים לאורך כל ה-with, כך שכמה סבבים (למשל
+    ב-Successive Halving) משתמשים באותם עובדים מחוברים.
+    """
+
+    def __init__(self, X, y, n_jobs=-1):
+        self.X = np.asarray(X)
+        self.y = np.asarray(y)
+        self.n_workers = effective_n_jobs(n_jobs)
+        self._shared = None
+        self._pool = None
+
+    def __enter__(self):
+        if self.n_workers > 1:
+            self._shared = SharedArrays(X=self.X, y=self.y)
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_attach_worker,
+                                                 initargs=(self._shared.spec,))
+            except Exception:
+                self._shared.close()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def worker_estimator(self, estimator):
+        """המודל לשליחה לעובדים: עם n_jobs=1 כשהמשימות רצות ב-pool"""
+        if self.n_workers > 1 and 'n_jobs' in estimator.get_params(deep=False):
+            return clone(estimator).set_params(n_jobs=1)
+        return estimator
+
+    def map(self, func, jobs):
+        """מריץ [(train, test, args), ...] ומחזיר את התוצאות לפי הסדר"""
+        jobs = list(jobs)
+        if self._pool is None or len(jobs) <= 1:
+            return [func(self.X, self.y, train, test, *args) for train, test, args in jobs]
+        futures = [self._pool.submit(_run_job, func, train, test, args) for train, test, args in jobs]
+        return [future.result() for future in futures]
@@ -0,0 +1,173 @@
+"""
+Stage Cache - דילוג על שלבי pipeline שהקלטים שלהם לא השתנו
+
+לכל שלב (טעינה, ניקוי, פיצ'רים, אימון...) נשמר manifest עם מפתח שמורכב מ:
+    - hash של תוכן קבצי הקלט (כל הפורמטים של טבלה - csv ו-parquet)
+    - hash של קוד השלב (קבצי המקור של המודולים / החבילות שהשלב תלוי בהם)
+    - הפרמטרים של השלב
+    - המפתחות של השלבים שלפניו (depends) - שלב שרץ מחדש מבטל את מה שאחריו
+אם המפתח זהה לריצה הקודמת וכל התוצרים עדיין קיימים, השלב לא רץ והתוצאה
+השמורה מוחזרת. raw_data.csv שנכתב מחדש עם אותו תוכן בדיוק לא מפעיל דבר.
+המפתח נשמר אחרי שהשלב רץ, כך שקבצים שהשלב עצמו כותב לצד הקלטים שלו (למשל
+raw_data.parquet) לא מבטלים אותו בריצה הבאה.
+
+טבלה מחולקת (core.partitions) מפתחת לפי קבצי ה-partitions ושמותיהם בלבד - לא
+לפי _partitions.json או פרופיל החוזה, שהשלבים הבאים מעדכנים.
+
+ה-hash של קובץ נשמר לפי (mtime, גודל), כך שקבצים שלא נגעו בהם לא נקראים שוב.
+STAGE_CACHE=off (או force=True) מריץ את כל השלבים מחדש.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from .storage import TABLE_EXTENSIONS, partition_paths, partition_root, table_exists, table_path
+
+CACHE_DIR = '.stage_cache'
+HASHES_FILE = 'file_hashes.json'
+HASH_BLOCK = 1 << 20
+
+
+def content_digest(path):
+    """sha256 של תוכן קובץ"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_disabled():
+    return os.environ.get('STAGE_CACHE', '').lower() in ('0', 'off', 'false', 'no')
+
+
+def _input_files(path):
+    """הקבצים שמרכיבים קלט: טבלה -> כל הפורמטים שלה (או ה-partitions), תיקייה -> כל הקבצים בה"""
+    root = partition_root(path)
+    if root is not None:
+        # רק קבצי הנתונים לפי סדר ה-partitions: ה-manifest (מצב pending) ופרופיל החוזה
+        # משתנים כשהשלבים הבאים מעבדים את הטבלה, בלי שהנתונים עצמם השתנו
+        return [f for partition in partition_paths(root) for f in _input_files(partition)]
+    if os.path.isdir(path):
+        files = []
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            files.extend(os.path.join(root, name) for name in sorted(names))
+        return files
+    candidates = [path]
+    if os.path.splitext(path)[1].lower() in TABLE_EXTENSIONS.values():
+        candidates += [table_path(path, fmt) for fmt in TABLE_EXTENSIONS]
+    return [p for p in dict.fromkeys(candidates) if os.path.isfile(p)]
+
+
+def _module_files(module):
+    """קבצי המקור של מודול, או של כל החבילה אם זו חבילה"""
+    if hasattr(module, '__path__'):
+        return [f for directory in module.__path__ for f in _input_files(directory) if f.endswith('.py')]
+    return [module.__file__]
+
+
+class StageCache:
+    """manifest-ים של שלבי pipeline תחת output_dir/.stage_cache"""
+
+    def __init__(self, output_dir='outputs', force=False):
+        self.root = os.path.join(output_dir, CACHE_DIR)
+        self.force = force or cache_disabled()
+        self.keys = {}
+        self._hashes = self._read(HASHES_FILE) or {}
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.root, name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name, data):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, name)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, path)
+
+    def file_digest(self, path):
+        """sha256 של תוכן הקובץ - מחושב מחדש רק אם mtime או הגודל השתנו"""
+        stat = os.stat(path)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        key = os.path.abspath(path)
+        entry = self._hashes.get(key)
+        if entry is not None and entry[:2] == signature:
+            return entry[2]
+
+        digest = content_digest(path)
+        self._hashes[key] = signature + [digest]
+        return digest
+
+    def _digest_files(self, files):
+        digest = hashlib.sha256()
+        for path in files:
+            digest.update(os.path.basename(path).encode('utf-8'))
+            digest.update(self.file_digest(path).encode('ascii'))
+        return digest.hexdigest()
+
+    def stage_key(self, name, inputs=(), params=None, code=(), depends=()):
+        """המפתח של שלב - משתנה אם משהו מהקלטים, הקוד, הפרמטרים או השלבים הקודמים השתנה"""
+        description = {
+            'stage': name,
+            'inputs': {path: self._digest_files(_input_files(path)) for path in inputs},
+            'code': self._digest_files([f for module in code for f in _module_files(module)]),
+            'params': params or {},
+            'depends': {stage: self.keys.get(stage) for stage in depends},
+        }
+        encoded = json.dumps(description, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def lookup(self, name, key):
+        """ה-manifest השמור אם המפתח תואם וכל התוצרים קיימים, אחרת None"""
+        manifest = self._read(f'{name}.json')
+        if manifest is None or manifest.get('key') != key:
+            return None
+        if not all(table_exists(path) for path in manifest.get('outputs', [])):
+            return None
+        return manifest
+
+    def record(self, name, key, outputs=(), result=None):
+        self._write(f'{name}.json', {
+            'stage': name,
+            'key': key,
+            'created': datetime.now().isoformat(),
+            'outputs': list(outputs),
+            'result': result,
+        })
+
+    def run(self, name, func, inputs=(), outputs=(), params=None, code=(), depends=(), succeeded=None):
+        """
+        מריץ func() רק אם השלב השתנה מאז הריצה הקודמת.
+        מחזיר (תוצאה, האם נלקחה מהמטמון). התוצאה נשמרת כ-JSON, ולכן func
+        צריך להחזיר ערך פשוט (מחרוזת / dict). succeeded(result) שמחזיר False
+        מונע שמירה - שלב שנכשל ירוץ שוב בפעם הבאה.
+        """
+        key = self.stage_key(name, inputs, params, code, depends)
+        self.keys[name] = key
+
+        if not self.force:
+            manifest = self.lookup(name, key)
+            if manifest is not None:
+                self._write(HASHES_FILE, self._hashes)
+                return manifest.get('result'), True
+
+        result = func()
+        if succeeded is None or succeeded(result):
+            # שלב יכול לכתוב לתוך הקלטים של עצמו (הטעינה כותבת raw_data.parquet ליד
+            # raw_data.csv) - המפתח נשמר לפי הקלטים כפי שהשלב השאיר אותם, אחרת
+            # הריצה הבאה תחשב מפתח אחר ותריץ מחדש את כל השרשרת
+            key = self.stage_key(name, inputs, params, code, depends)
+            self.keys[name] = key
+            self.record(name, key, outputs, result)
+        else:
+            # לא נשמר - גם השלבים שאחריו לא יסתמכו על המפתח הזה
+            self.keys[name] = None
+        self._write(HASHES_FILE, self._hashes)
+        return result, False
@@ -0,0 +1,267 @@
+"""
+Artifact Storage - שמירה וטעינה של טבלאות הנתונים (raw / clean / features)
+
+כל טבלה נשמרת לפי "שם בסיס" (למשל outputs/clean_data) בפורמטים שהוגדרו:
+    parquet - עמודתי, טיפוסי ודחוס (zstd). פורמט הקריאה המועדף.
+    csv     - נשמר כאפשרות ייצוא (תאימות לאחור וקריאה ידנית).
+
+הפורמטים נקבעים במשתנה הסביבה ARTIFACT_FORMATS (למשל "parquet" או
+"parquet,csv"). ברירת המחדל: parquet + csv כש-pyarrow מותקן, אחרת csv בלבד.
+
+הקוראים מעבירים את הנתיב הרגיל (outputs/clean_data.csv) - אם קיים קובץ
+parquet עדכני לאותה טבלה הוא נקרא במקום, וניתן לטעון רק חלק מהעמודות.
+
+טבלה יכולה להיות גם מחולקת ל-partitions (קליטה מצטברת, core.partitions):
+תיקייה בשם הבסיס (outputs/raw_data/) עם קובץ _partitions.json. טבלה כזו
+נקראת כאן בשקיפות כשרשור כל ה-partitions לפי סדר ההוספה. טבלה היא או
+קובץ אחד או מחולקת - כתיבה באחת הצורות מוחקת את השנייה.
+"""
+import json
+import os
+import shutil
+
+import pandas as pd
+
+
+TABLE_EXTENSIONS = {
+    'parquet': '.parquet',
+    'csv': '.csv',
+}
+
+# סדר עדיפות בקריאה
+READ_PREFERENCE = ['parquet', 'csv']
+
+PARTITION_MANIFEST = '_partitions.json'
+
+
+def parquet_available():
+    try:
+        __import__('pyarrow')
+        return True
+    except ImportError:
+        return False
+
+
+def configured_formats():
+    """הפורמטים שבהם טבלאות נכתבות"""
+    value = os.environ.get('ARTIFACT_FORMATS')
+    if value:
+        formats = [fmt.strip().lower() for fmt in value.split(',') if fmt.strip()]
+    else:
+        formats = ['parquet', 'csv'] if parquet_available() else ['csv']
+
+    unknown = [fmt for fmt in formats if fmt not in TABLE_EXTENSIONS]
+    if unknown:
+        raise ValueError(f"פורמט לא נתמך ב-ARTIFACT_FORMATS: {unknown}")
+    if 'parquet' in formats and not parquet_available():
+        formats = [fmt for fmt in formats if fmt != 'parquet'] or ['csv']
+    return formats
+
+
+def table_stem(path):
+    """outputs/clean_data.csv -> outputs/clean_data"""
+    root, ext = os.path.splitext(path)
+    return root if ext.lower() in TABLE_EXTENSIONS.values() else path
+
+
+def table_path(path, fmt):
+    return table_stem(path) + TABLE_EXTENSIONS[fmt]
+
+
+def partition_root(path):
+    """תיקיית ה-partitions של הטבלה (outputs/raw_data), או None אם הטבלה לא מחולקת"""
+    root = table_stem(path)
+    return root if os.path.isfile(os.path.join(root, PARTITION_MANIFEST)) else None
+
+
+def partition_paths(root):
+    """נתיבי ה-partitions (part-00001.csv ...) לפי סדר ההוספה"""
+    with open(os.path.join(root, PARTITION_MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    return [os.path.join(root, entry['name'] + TABLE_EXTENSIONS['csv']) for entry in manifest['partitions']]
+
+
+def _drop_partitions(path):
+    """טבלה שנכתבה כקובץ אחד מחליפה גרסה מחולקת קודמת שלה"""
+    root = partition_root(path)
+    if root is not None:
+        shutil.rmtree(root)
+
+
+def resolve_table(path):
+    """
+    הקובץ שממנו תיקרא הטבלה: parquet אם קיים ואינו ישן מהקובץ שביקשו,
+    אחרת הנתיב עצמו. לטבלה מחולקת - תיקיית ה-partitions.
+    מחזיר None אם אין אף קובץ.
+    """
+    root = partition_root(path)
+    if root is not None:
+        return root
+
+    candidates = []
+    for fmt in READ_PREFERENCE:
+        candidate = table_path(path, fmt)
+        if os.path.exists(candidate):
+            candidates.append(candidate)
+    if not candidates:
+        return path if os.path.exists(path) else None
+
+    # קובץ שהוחלף ידנית (למשל raw_data.csv חדש) גובר על parquet ישן
+    if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(candidates[0]):
+        return path
+    return candidates[0]
+
+
+def table_exists(path):
+    return resolve_table(path) is not None
+
+
+def table_size(path):
+    """גודל הטבלה בדיסק בבתים (סכום ה-partitions לטבלה מחולקת)"""
+    resolved = resolve_table(path)
+    if resolved is None:
+        return 0
+    if os.path.isdir(resolved):
+        return sum(table_size(part) for part in partition_paths(resolved))
+    return os.path.getsize(resolved)
+
+
+def read_table(path, columns=None):
+    """טוען טבלה (רק העמודות המבוקשות, אם צוינו)"""
+    resolved = resolve_table(path)
+    if resolved is None:
+        raise FileNotFoundError(f"הטבלה לא נמצאה: {path}")
+
+    if os.path.isdir(resolved):
+        frames = [read_table(part, columns) for part in partition_paths(resolved)]
+        if not frames:
+            return pd.DataFrame(columns=list(columns) if columns is not None else None)
+        return pd.concat(frames, ignore_index=True)
+
+    if resolved.endswith(TABLE_EXTENSIONS['parquet']):
+        return pd.read_parquet(resolved, columns=list(columns) if columns is not None else None)
+
+    if columns is None:
+        return pd.read_csv(resolved)
+    wanted = set(columns)
+    return pd.read_csv(resolved, usecols=lambda col: col in wanted)[list(columns)]
+
+
+def read_table_columns(path):
+    """שמות העמודות בלבד - בלי לטעון את הנתונים"""
+    resolved = resolve_table(path)
+    if resolved is None:
+        raise FileNotFoundError(f"הטבלה לא נמצאה: {path}")
+    if os.path.isdir(resolved):
+        parts = partition_paths(resolved)
+        return read_table_columns(parts[0]) if parts else []
+    if resolved.endswith(TABLE_EXTENSIONS['parquet']):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(resolved).names)
+    return list(pd.read_csv(resolved, nrows=0).columns)
+
+
+def iter_table(path, chunk_size, columns=None, dtype=None):
+    """קורא טבלה במנות של chunk_size שורות (רק העמודות המבוקשות, אם צוינו)"""
+    resolved = resolve_table(path)
+    if resolved is None:
+        raise FileNotFoundError(f"הטבלה לא נמצאה: {path}")
+
+    if os.path.isdir(resolved):
+        for part in partition_paths(resolved):
+            yield from iter_table(part, chunk_size, columns=columns, dtype=dtype)
+        return
+
+    if resolved.endswith(TABLE_EXTENSIONS['parquet']):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(resolved)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size,
+                                               columns=list(columns) if columns is not None else None):
+            chunk = batch.to_pandas()
+            yield chunk.astype(dtype) if dtype else chunk
+        return
+
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda col: col in wanted  # noqa: E731
+    for chunk in pd.read_csv(resolved, usecols=usecols, dtype=dtype, chunksize=chunk_size):
+        yield chunk if columns is None else chunk[list(columns)]
+
+
+class TableWriter:
+    """
+    כותב טבלה בהדרגה, מנה אחר מנה, באותם פורמטים וכללים כמו write_table.
+    כל המנות חייבות להיות עם אותן עמודות וטיפוסים.
+    """
+
+    def __init__(self, path, formats=None):
+        self.path = path
+        self.formats = formats or configured_formats()
+        self.rows = 0
+        self._csv_started = False
+        self._parquet_writer = None
+        self._empty = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, frame):
+        if frame.empty:
+            # מנה ריקה לא קובעת סכמה (עמודות object ריקות הן null ב-arrow)
+            if self._empty is None:
+                self._empty = frame
+            return
+        # parquet נכתב אחרון - כמו ב-write_table
+        for fmt in sorted(self.formats, key=lambda f: f == 'parquet'):
+            target = table_path(self.path, fmt)
+            if fmt == 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if self._parquet_writer is None:
+                    self._parquet_writer = pq.ParquetWriter(target, table.schema, compression='zstd')
+                self._parquet_writer.write_table(table)
+            else:
+                frame.to_csv(target, mode='a' if self._csv_started else 'w',
+                             header=not self._csv_started, index=False)
+                self._csv_started = True
+        self.rows += len(frame)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        elif not self._csv_started and self._empty is not None:
+            # כל המנות היו ריקות - נכתבת טבלה ריקה עם העמודות
+            write_table(self._empty, self.path, self.formats)
+            return
+
+        stale_parquet = table_path(self.path, 'parquet')
+        if 'parquet' not in self.formats and os.path.exists(stale_parquet):
+            os.remove(stale_parquet)
+        _drop_partitions(self.path)
+
+
+def write_table(df, path, formats=None):
+    """שומר טבלה בכל הפורמטים המוגדרים ומחזיר את רשימת הקבצים שנכתבו"""
+    formats = formats or configured_formats()
+    written = []
+    # parquet נכתב אחרון - כך הוא לעולם לא ייראה ישן יותר מה-CSV שלצידו
+    for fmt in sorted(formats, key=lambda f: f == 'parquet'):
+        target = table_path(path, fmt)
+        if fmt == 'parquet':
+            df.to_parquet(target, index=False, compression='zstd')
+        else:
+            df.to_csv(target, index=False)
+        written.append(target)
+
+    # parquet ישן שלא נכתב הפעם היה נקרא במקום הנתונים החדשים
+    stale_parquet = table_path(path, 'parquet')
+    if 'parquet' not in formats and os.path.exists(stale_parquet):
+        os.remove(stale_parquet)
+    _drop_partitions(path)
+    return written
@@ -0,0 +1,264 @@
+"""
+Summary Statistics - סטטיסטיקות EDA מצטברות במנות, ניתנות למיזוג
+
+SummaryAccumulator עובר על הטבלה מנה אחר מנה ושומר לכל העמודות המספריות
+סכומים מצטברים בלבד - לא את הנתונים עצמם:
+
+    n[i, j]    - מספר השורות שבהן גם i וגם j קיימים
+    sx[i, j]   - סכום (x_i - shift_i) על השורות האלה
+    sxx[i, j]  - סכום (x_i - shift_i)^2 על השורות האלה
+    sxy[i, j]  - סכום (x_i - shift_i)(x_j - shift_j)
+
+ועוד min/max וסקיצת קוונטילים (QuantileSketch) לכל עמודה. האלכסון נותן
+count / mean / std, והמטריצות נותנות covariance וקורלציה על השורות
+המשותפות לכל זוג (כמו pandas). הסכומים של כל מנה הם מכפלות מטריצות (BLAS),
+ו-shift (ממוצע המנה הראשונה) שומר על דיוק נומרי. שני מצברים מתמזגים
+(הזזת הסכומים ל-shift משותף וחיבור), ולכן partitions מסוכמים במקביל.
+
+load_summary שומר את הסיכום ב-outputs/summary_stats.pkl לפי חתימת הטבלה.
+בטבלה מחולקת נשמר סיכום לכל partition, ותוספת חדשה מסוכמת לבד וממוזגת -
+בלי לקרוא שוב את כל ההיסטוריה.
+"""
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .cleaning import DEFAULT_CHUNK_SIZE, _is_numeric
+from .quantile_sketch import QuantileSketch
+from .stage_cache import _input_files
+from .storage import iter_table, partition_paths, partition_root
+
+SUMMARY_FILE = 'summary_stats.pkl'
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+
+def pairwise_sums(X, shift):
+    """(n, sx, sxx, sxy) של מטריצה X (שורות x עמודות, NaN = חסר) סביב shift"""
+    Xc = X - shift
+    present = ~np.isnan(Xc)
+    if present.all():
+        rows, p = Xc.shape
+        sums = Xc.sum(axis=0)
+        squares = np.einsum('ij,ij->j', Xc, Xc)
+        n = np.full((p, p), float(rows))
+        sx = np.repeat(sums[:, None], p, axis=1)
+        sxx = np.repeat(squares[:, None], p, axis=1)
+    else:
+        M = present.astype(np.float64)
+        Xc[~present] = 0.0
+        n = M.T @ M
+        sx = Xc.T @ M
+        sxx = (Xc * Xc).T @ M
+    return n, sx, sxx, Xc.T @ Xc
+
+
+def correlation_from_sums(n, sx, sxx, sxy):
+    """קורלציית Pearson על השורות המשותפות לכל זוג"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx * sx / n
+        corr = cov / np.sqrt(var * var.T)
+    corr[n < 2] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    defined = ~np.isnan(np.diag(corr))
+    corr[np.diag_indices_from(corr)] = np.where(defined, 1.0, np.nan)
+    return corr
+
+
+class SummaryAccumulator:
+    """סטטיסטיקות של העמודות המספריות, מנה אחר מנה"""
+
+    def __init__(self, k=2048):
+        self.k = k
+        self.rows = 0
+        self.columns = None
+
+    def _start(self, columns, shift):
+        p = len(columns)
+        self.columns = list(columns)
+        self.shift = shift
+        self.n, self.sx, self.sxx, self.sxy = (np.zeros((p, p)) for _ in range(4))
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+        self.sketches = [QuantileSketch(self.k) for _ in range(p)]
+
+    def update(self, chunk):
+        if self.columns is None:
+            columns = [col for col in chunk.columns if _is_numeric(chunk[col].dtype)]
+            X = _matrix(chunk, columns)
+            with np.errstate(invalid='ignore'):
+                shift = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(len(columns))
+            self._start(columns, shift)
+        else:
+            X = _matrix(chunk, self.columns)
+
+        self.rows += len(chunk)
+        if not len(X):
+            return self
+        for total, part in zip((self.n, self.sx, self.sxx, self.sxy), pairwise_sums(X, self.shift)):
+            total += part
+        with np.errstate(invalid='ignore'):
+            self.min = np.fmin(self.min, np.nanmin(X, axis=0, initial=np.inf))
+            self.max = np.fmax(self.max, np.nanmax(X, axis=0, initial=-np.inf))
+        for sketch, values in zip(self.sketches, X.T):
+            sketch.update(values)
+        return self
+
+    def merge(self, other):
+        """ממזג סיכום של נתונים אחרים (למשל partition אחר) לתוך זה"""
+        if other.columns is None:
+            self.rows += other.rows
+            return self
+        if self.columns is None:
+            rows = self.rows
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            self.rows += rows
+            return self
+        if other.columns != self.columns:
+            raise ValueError(f"אי אפשר למזג סיכומים של עמודות שונות: {other.columns} != {self.columns}")
+
+        # הזזת הסכומים של other ל-shift של self
+        d = other.shift - self.shift
+        di, dj = d[:, None], d[None, :]
+        self.n += other.n
+        self.sxy += other.sxy + dj * other.sx + di * other.sx.T + di * dj * other.n
+        self.sxx += other.sxx + 2 * di * other.sx + di * di * other.n
+        self.sx += other.sx + di * other.n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        for sketch, theirs in zip(self.sketches, other.sketches):
+            sketch.merge(theirs)
+        self.rows += other.rows
+        return self
+
+    def _series(self, values):
+        return pd.Series(values, index=self.columns, dtype=np.float64)
+
+    def count(self):
+        return self._series(np.diag(self.n))
+
+    def mean(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._series(self.shift + np.diag(self.sx) / np.diag(self.n))
+
+    def var(self, ddof=1):
+        n = np.diag(self.n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = (np.diag(self.sxx) - np.diag(self.sx) ** 2 / n) / (n - ddof)
+        return self._series(np.where(n > ddof, np.maximum(var, 0.0), np.nan))
+
+    def std(self, ddof=1):
+        return np.sqrt(self.var(ddof))
+
+    def quantile(self, q):
+        """קוונטיל משוער לכל עמודה (מהסקיצות)"""
+        return self._series([sketch.quantile(q) for sketch in self.sketches])
+
+    def cov(self, ddof=1):
+        """covariance על השורות המשותפות לכל זוג (כמו DataFrame.cov)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self.sxy - self.sx * self.sx.T / self.n) / (self.n - ddof)
+        cov[self.n <= ddof] = np.nan
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def corr(self):
+        corr = correlation_from_sums(self.n, self.sx, self.sxx, self.sxy)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def describe(self, percentiles=DESCRIBE_PERCENTILES):
+        """אותה טבלה כמו DataFrame.describe() - האחוזונים משוערים"""
+        columns = self.columns or []
+        if not columns:
+            return pd.DataFrame()
+        stats = {'count': self.count(), 'mean': self.mean(), 'std': self.std(),
+                 'min': self._series(np.where(np.isfinite(self.min), self.min, np.nan))}
+        for q in percentiles:
+            stats[f'{q * 100:g}%'] = self.quantile(q)
+        stats['max'] = self._series(np.where(np.isfinite(self.max), self.max, np.nan))
+        return pd.DataFrame(stats).T
+
+
+def _matrix(chunk, columns):
+    X = np.empty((len(chunk), len(columns)), dtype=np.float64)
+    for j, col in enumerate(columns):
+        X[:, j] = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    return X
+
+
+def summarize_frame(df, chunk_size=DEFAULT_CHUNK_SIZE):
+    summary = SummaryAccumulator()
+    for start in range(0, max(len(df), 1), chunk_size):
+        summary.update(df.iloc[start:start + chunk_size])
+    return summary
+
+
+def summarize_table(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """סיכום של טבלה מהדיסק במעבר אחד, בלי לטעון אותה לזיכרון"""
+    summary = SummaryAccumulator()
+    for chunk in iter_table(path, chunk_size):
+        summary.update(chunk)
+    return summary
+
+
+def table_signature(path):
+    """(שם, mtime, גודל) של כל הקבצים שמרכיבים את הטבלה"""
+    signature = []
+    for file_path in _input_files(path):
+        stat = os.stat(file_path)
+        signature.append([os.path.basename(file_path), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def _summarize_parts(paths, chunk_size, n_jobs=None):
+    """סיכום לכל partition - במקביל כשיש יותר מאחד וכמה ליבות"""
+    n_jobs = min(len(paths), n_jobs or os.cpu_count() or 1)
+    if n_jobs <= 1:
+        return [summarize_table(path, chunk_size) for path in paths]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(summarize_table, paths, [chunk_size] * len(paths)))
+
+
+def load_summary(table_path, output_dir='outputs', refresh=False, chunk_size=DEFAULT_CHUNK_SIZE, n_jobs=None):
+    """
+    הסיכום של הטבלה: מהקובץ השמור אם הטבלה לא השתנתה, אחרת מחושב ונשמר.
+    בטבלה מחולקת רק partitions חדשים (או ששונו) מסוכמים מחדש.
+    """
+    path = os.path.join(output_dir, SUMMARY_FILE)
+    saved = None
+    if not refresh and os.path.exists(path):
+        try:
+            saved = joblib.load(path)
+        except Exception:
+            saved = None
+    if saved is not None and saved.get('source') != table_path:
+        saved = None
+
+    signature = table_signature(table_path)
+    if saved is not None and saved['signature'] == signature:
+        return saved['summary']
+
+    parts = {}
+    root = partition_root(table_path)
+    if root is not None:
+        previous = (saved or {}).get('partitions', {})
+        paths = partition_paths(root)
+        names = [os.path.basename(p) for p in paths]
+        signatures = {name: table_signature(p) for name, p in zip(names, paths)}
+        missing = [p for name, p in zip(names, paths)
+                   if name not in previous or previous[name][0] != signatures[name]]
+        computed = dict(zip(map(os.path.basename, missing), _summarize_parts(missing, chunk_size, n_jobs)))
+        summary = SummaryAccumulator()
+        for name in names:
+            part = computed[name] if name in computed else previous[name][1]
+            parts[name] = (signatures[name], part)
+            summary.merge(part)
+    else:
+        summary = summarize_table(table_path, chunk_size)
+
+    os.makedirs(output_dir, exist_ok=True)
+    joblib.dump({'source': table_path, 'signature': signature, 'summary': summary, 'partitions': parts}, path)
+    return summary
@@ -0,0 +1,76 @@
+"""
+Training Context - טעינה ופיצול חד-פעמיים של מטריצת הפיצ'רים
+
+כל המאמנים והמעריכים באותו תהליך מקבלים את אותו context: הקובץ נקרא פעם
+אחת, עמודת המחיר מזוהה פעם אחת, והפיצול train/test מחושב פעם אחת כמערכי
+NumPy רציפים (C-contiguous) מוכנים ל-sklearn.
+"""
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from .artifact_cache import artifact_cache
+from .model_bundle import feature_schema
+from .prediction_cache import data_hash
+from .storage import read_table, resolve_table
+
+
+DEFAULT_TARGET = 'Price_Millions'
+
+
+def find_target_column(columns):
+    """מציאת עמודת המחיר (Price_Millions, או עמודה שמכילה price/מחיר)"""
+    if DEFAULT_TARGET in columns:
+        return DEFAULT_TARGET
+    possible_targets = [col for col in columns if 'price' in col.lower() or 'מחיר' in col.lower()]
+    if possible_targets:
+        return possible_targets[0]
+    raise ValueError(f'לא נמצאה עמודת מחיר. עמודות זמינות: {list(columns)}')
+
+
+class TrainingContext:
+    """מטריצת פיצ'רים + פיצול train/test, משותפים לכל המאמנים"""
+
+    def __init__(self, df, target_col=None, test_size=0.2, random_state=42, source=None):
+        self.source = source
+        self.target_col = target_col or find_target_column(df.columns)
+        X = df.drop(self.target_col, axis=1)
+
+        self.schema = feature_schema(X)
+        self.feature_names = self.schema['features']
+        self.X = np.ascontiguousarray(X.to_numpy(dtype=np.float64))
+        self.y = np.ascontiguousarray(df[self.target_col].to_numpy(dtype=np.float64))
+
+        # פיצול על אינדקסים - אותה חלוקה בדיוק כמו train_test_split(X, y, ...)
+        self.train_idx, self.test_idx = train_test_split(
+            np.arange(len(self.y)), test_size=test_size, random_state=random_state
+        )
+        self.X_train = self.X[self.train_idx]
+        self.X_test = self.X[self.test_idx]
+        self.y_train = self.y[self.train_idx]
+        self.y_test = self.y[self.test_idx]
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(read_table(path), source=path, **kwargs)
+
+    @classmethod
+    def shared(cls, path):
+        """
+        context לקובץ, נטען פעם אחת לכל תהליך (עם פרמטרי פיצול ברירת מחדל).
+        נטען מחדש רק אם הקובץ בדיסק השתנה.
+        """
+        resolved = resolve_table(path)
+        if resolved is None:
+            raise FileNotFoundError(f"הטבלה לא נמצאה: {path}")
+        return artifact_cache.load(resolved, cls.from_file)
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    @property
+    def data_hash(self):
+        """מזהה של הנתונים והפיצול - המפתח של החיזויים השמורים (core.prediction_cache)"""
+        if getattr(self, '_data_hash', None) is None:
+            self._data_hash = data_hash(self.X, self.y, self.train_idx, self.test_idx)
+        return self._data_hash
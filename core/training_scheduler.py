@@ -0,0 +1,71 @@
+"""
+Training Scheduler - אימון כמה משפחות מודלים במקביל
+
+כל מאמן רץ בתהליך נפרד ומקבל תקציב ליבות משלו (n_jobs), כך שה-n_jobs
+הפנימי של GridSearchCV / RandomForest לא מעמיס על המכונה יותר ליבות ממה
+שיש בה. זמן האימון הכולל קרוב לזמן של המאמן האיטי ביותר במקום לסכום.
+כשיש יותר מאמנים מליבות, רצים במקביל לכל היותר מאמן אחד לליבה והשאר
+ממתינים בתור.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def budget_cores(weights, total_cores=None):
+    """
+    מחלק את הליבות בין המאמנים לפי משקל - כל מאמן מקבל לפחות ליבה אחת.
+    מחזיר רשימת n_jobs באותו סדר כמו weights. הסכום לא עולה על total_cores,
+    חוץ ממקרה שיש יותר מאמנים מליבות - אז כל מאמן מקבל ליבה אחת ו-
+    run_trainers_parallel מריץ במקביל רק total_cores מהם.
+    """
+    total_cores = total_cores or os.cpu_count() or 1
+    if len(weights) >= total_cores:
+        return [1] * len(weights)
+
+    total_weight = float(sum(weights))
+    budgets = [max(1, int(total_cores * weight / total_weight)) for weight in weights]
+
+    # המינימום של ליבה אחת יכול לחרוג מהתקציב - הליבות העודפות נלקחות מהתקציב הגדול ביותר
+    while sum(budgets) > total_cores:
+        largest = max(range(len(budgets)), key=lambda i: budgets[i])
+        budgets[largest] -= 1
+
+    # ליבות שנשארו בגלל עיגול כלפי מטה הולכות למאמן הכבד ביותר
+    leftover = total_cores - sum(budgets)
+    if leftover > 0:
+        heaviest = max(range(len(weights)), key=lambda i: weights[i])
+        budgets[heaviest] += leftover
+    return budgets
+
+
+def _train_one(trainer_cls, input_file, output_dir, context, n_jobs):
+    """רץ בתהליך העובד - מגביל גם את threads של BLAS לתקציב"""
+    from threadpoolctl import threadpool_limits
+
+    with threadpool_limits(limits=n_jobs):
+        return trainer_cls()._run(input_file, output_dir, context=context, n_jobs=n_jobs)
+
+
+def run_trainers_parallel(trainers, input_file, output_dir="outputs", context=None, total_cores=None):
+    """
+    מאמן את כל המאמנים במקביל ומחזיר את התוצאות באותו סדר.
+
+    trainers: רשימה של (מחלקת מאמן, משקל) - המשקל קובע את חלקו בליבות.
+    context: TrainingContext משותף (מועבר לכל תהליך במקום לקרוא את הקובץ שוב).
+    """
+    total_cores = total_cores or os.cpu_count() or 1
+    budgets = budget_cores([weight for _, weight in trainers], total_cores)
+
+    # לא יותר מאמנים במקביל מליבות - השאר ממתינים בתור של ה-pool
+    with ProcessPoolExecutor(max_workers=min(len(trainers), total_cores)) as pool:
+        futures = [
+            pool.submit(_train_one, trainer_cls, input_file, output_dir, context, n_jobs)
+            for (trainer_cls, _), n_jobs in zip(trainers, budgets)
+        ]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({'error': str(e)})
+    return results
@@ -1,8 +1,6 @@
 """Tools for Data Analyst Crew - כלים לצוות מנתחי הנתונים"""
 import os
 import json
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.express as px
@@ -14,17 +12,49 @@ from typing import Type, Any
 from pydantic import BaseModel, Field
 from datetime import datetime
 
+from core.cleaning import (
+    DEFAULT_CHUNK_SIZE,
+    clean_frame,
+    clean_table_streaming,
+    merge_cleaning_stats,
+    should_stream,
+)
+from core.contract import profile_frame, profile_table
+from core.correlation import load_correlations
+from core.summary_stats import load_summary
+from core.figures import render_distributions, resolve_mode, save_figure
+from core.geo import DEFAULT_GRIDSIZE, DEFAULT_MAX_POINTS, geo_view
+from core.partitions import (
+    PartitionedTable,
+    append_delta,
+    load_outlier_history,
+    load_profile,
+    process_pending,
+    save_outlier_history,
+)
+from core.storage import (
+    configured_formats,
+    partition_root,
+    read_table,
+    read_table_columns,
+    resolve_table,
+    table_exists,
+    write_table,
+)
+
 
 class DataIngestionInput(BaseModel):
     """Input schema for Data Ingestion Tool"""
     output_dir: str = Field(default="outputs", description="Directory to save outputs")
+    exact_distinct: bool = Field(default=False, description="ספירה מדויקת של ערכים שונים (איטי יותר) במקום HyperLogLog")
+    delta_file: str = Field(default=None, description="קובץ תוספת (דירות חדשות) לקליטה מצטברת כ-partition חדש")
 
 
 class DataIngestionTool(BaseTool):
     name: str = "Data Ingestion Tool"
     description: str = "טוען את Israel Housing dataset ושומר אותו"
 
-    def _run(self, output_dir: str = "outputs") -> str:
+    def _run(self, output_dir: str = "outputs", exact_distinct: bool = False, delta_file: str = None) -> str:
         """טוען את הנתונים ויוצר dataset contract"""
         try:
             # יצירת תיקייה אם לא קיימת
@@ -33,9 +63,12 @@ class DataIngestionTool(BaseTool):
             # טעינת הנתונים מישראל
             # נבדוק אם קיים קובץ raw_data.csv, אם לא - נטען מהנתיב היחסי
             raw_data_path = os.path.join(output_dir, "raw_data.csv")
-            
+
+            if delta_file:
+                return self._ingest_delta(raw_data_path, delta_file, output_dir, exact_distinct)
+
             # אם הקובץ לא קיים, ננסה לטעון מהתיקייה הראשית
-            if not os.path.exists(raw_data_path):
+            if not table_exists(raw_data_path):
                 # ננסה לטעון מהתיקייה הראשית (אם הסקריפט create_israel_dataset.py כבר רץ)
                 parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
                 possible_paths = [
@@ -47,84 +80,142 @@ class DataIngestionTool(BaseTool):
                 # אם אין נתונים, נצטרך להריץ את create_israel_dataset.py
                 return "❌ קובץ raw_data.csv לא נמצא. אנא הרץ תחילה: python create_israel_dataset.py"
             
-            # טעינת הנתונים
-            df = pd.read_csv(raw_data_path, encoding='utf-8')
-
-            # יצירת dataset contract
-            contract = {
-                "dataset_name": "Israel Housing Dataset",
-                "source": "Generated dataset based on Israeli real estate market",
-                "load_date": datetime.now().isoformat(),
-                "num_rows": len(df),
-                "num_columns": len(df.columns),
-                "columns": {
-                    col: {
-                        "dtype": str(df[col].dtype),
-                        "null_count": int(df[col].isnull().sum()),
-                        "unique_count": int(df[col].nunique())
-                    }
-                    for col in df.columns
-                },
-                "description": "Dataset של דירות בישראל עם מידע על ערים, גודל, חדרים, מיקום ומחירים",
-                "target": "Price_Millions"
-            }
-
-            # שמירת החוזה
-            contract_path = os.path.join(output_dir, "dataset_contract.json")
-            with open(contract_path, 'w', encoding='utf-8') as f:
-                json.dump(contract, f, ensure_ascii=False, indent=2)
+            # שמירת עותק עמודתי של הנתונים הגולמיים - שלב הניקוי יקרא אותו במקום ה-CSV.
+            # הפרופיל לחוזה נאסף במעבר אחד במנות (HyperLogLog לערכים שונים)
+            partitions = None
+            if partition_root(raw_data_path):
+                # נתונים שנקלטו במצטבר - הפרופיל כבר שמור ליד ה-partitions
+                partitions = PartitionedTable(raw_data_path)
+                profile = load_profile(partitions, exact=exact_distinct)
+            elif resolve_table(raw_data_path).endswith('.csv') and 'parquet' in configured_formats():
+                df = read_table(raw_data_path)
+                write_table(df, raw_data_path, formats=['parquet'])
+                profile = profile_frame(df, exact=exact_distinct)
+            else:
+                profile = profile_table(raw_data_path, exact=exact_distinct)
+            columns = self._write_contract(profile, output_dir, partitions=partitions)
 
             return f"✓ טעינת נתונים הצליחה!\n" \
-                   f"- שורות: {len(df):,}\n" \
-                   f"- עמודות: {len(df.columns)}\n" \
+                   f"- שורות: {profile.rows:,}\n" \
+                   f"- עמודות: {len(columns)}\n" \
                    f"- קבצים נשמרו ב: {output_dir}"
 
         except Exception as e:
             return f"❌ שגיאה בטעינת הנתונים: {str(e)}"
 
+    def _ingest_delta(self, raw_data_path, delta_file, output_dir, exact_distinct):
+        """קליטה מצטברת: הקובץ נוסף כ-partition חדש, וההיסטוריה לא נקראת שוב"""
+        if not os.path.exists(delta_file):
+            return f"❌ קובץ התוספת לא נמצא: {delta_file}"
+
+        table, profile, partition = append_delta(raw_data_path, delta_file, exact=exact_distinct)
+        if partition is None:
+            return f"✓ הקובץ {delta_file} כבר נקלט בעבר - לא נוספו שורות\n" \
+                   f"- שורות בסך הכל: {profile.rows:,}"
+
+        # החוזה מתעדכן מהפרופיל המצטבר; סטטיסטיקות הניקוי הקודמות נשמרות עד הניקוי הבא
+        self._write_contract(profile, output_dir, partitions=table)
+        return f"✓ קליטה מצטברת הצליחה!\n" \
+               f"- partition חדש: {partition} ({table.entry(partition)['rows']:,} שורות)\n" \
+               f"- partitions: {len(table.partitions)}\n" \
+               f"- שורות בסך הכל: {profile.rows:,}"
+
+    def _write_contract(self, profile, output_dir, partitions=None):
+        """כותב את dataset_contract.json מהפרופיל ומחזיר את פרופיל העמודות"""
+        columns = profile.result()
+
+        # יצירת dataset contract
+        contract = {
+            "dataset_name": "Israel Housing Dataset",
+            "source": "Generated dataset based on Israeli real estate market",
+            "load_date": datetime.now().isoformat(),
+            "num_rows": profile.rows,
+            "num_columns": len(columns),
+            "columns": columns,
+            "profile": profile.method(),
+            "description": "Dataset של דירות בישראל עם מידע על ערים, גודל, חדרים, מיקום ומחירים",
+            "target": "Price_Millions"
+        }
+
+        contract_path = os.path.join(output_dir, "dataset_contract.json")
+        if partitions is not None:
+            contract["partitions"] = {
+                "count": len(partitions.partitions),
+                "latest": partitions.partitions[-1]["name"],
+            }
+            if os.path.exists(contract_path):
+                with open(contract_path, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+                if "cleaning" in previous:
+                    contract["cleaning"] = previous["cleaning"]
+
+        # שמירת החוזה
+        with open(contract_path, 'w', encoding='utf-8') as f:
+            json.dump(contract, f, ensure_ascii=False, indent=2)
+        return columns
+
 
 class DataCleaningInput(BaseModel):
     """Input schema for Data Cleaning Tool"""
     input_file: str = Field(default="outputs/raw_data.csv")
     output_dir: str = Field(default="outputs")
+    streaming: bool = Field(default=None, description="ניקוי במנות (ברירת מחדל: לפי גודל הקובץ)")
+    chunk_size: int = Field(default=DEFAULT_CHUNK_SIZE)
 
 
 class DataCleaningTool(BaseTool):
     name: str = "Data Cleaning Tool"
     description: str = "מנקה את הנתונים ומטפל בערכים חסרים וחריגים"
 
-    def _run(self, input_file: str = "outputs/raw_data.csv", output_dir: str = "outputs") -> str:
+    def _run(self, input_file: str = "outputs/raw_data.csv", output_dir: str = "outputs",
+             streaming: bool = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
         """מנקה את הנתונים"""
         try:
-            # קריאת הנתונים
-            df = pd.read_csv(input_file)
-            original_rows = len(df)
-
-            # 1. בדיקת ערכים חסרים
-            missing_values = df.isnull().sum()
-            missing_report = missing_values[missing_values > 0].to_dict()
-
-            # 2. טיפול ב-inf values
-            df.replace([np.inf, -np.inf], np.nan, inplace=True)
-
-            # 3. זיהוי outliers עם IQR method
-            outliers_count = {}
-            for col in df.select_dtypes(include=[np.number]).columns:
-                Q1 = df[col].quantile(0.25)
-                Q3 = df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                outliers = ((df[col] < (Q1 - 1.5 * IQR)) | (df[col] > (Q3 + 1.5 * IQR))).sum()
-                if outliers > 0:
-                    outliers_count[col] = int(outliers)
-
-            # 4. מחיקת שורות עם ערכים חסרים (אם יש)
-            df.dropna(inplace=True)
-
-            # 5. שמירת הנתונים המנוקים
             clean_data_path = os.path.join(output_dir, "clean_data.csv")
-            df.to_csv(clean_data_path, index=False)
-
-            # 6. עדכון dataset contract (אם קיים)
+            if streaming is None:
+                streaming = should_stream(input_file)
+            partitions_note = ""
+
+            if partition_root(input_file):
+                # נתונים שנקלטו במצטבר - מנקים רק partitions חדשים, כל אחד בנפרד.
+                # outliers נבדקים מול גבולות IQR של כל ההיסטוריה (כולל ה-partitions
+                # החדשים), כך שהתוצאה לא תלויה ביום שבו הדירה נקלטה
+                source_table = PartitionedTable(input_file)
+                history = load_outlier_history(source_table, clean_data_path)
+                for entry in source_table.partitions:
+                    history.add(entry['name'], entry['rows'], source_table.partition_path(entry['name']), chunk_size)
+
+                def clean_partition(source, target):
+                    if should_stream(source):
+                        stats = clean_table_streaming(source, target, chunk_size=chunk_size)
+                    else:
+                        df, stats = clean_frame(read_table(source))
+                        write_table(df, target)
+                    outliers, outlier_rows = history.count_outliers(source, chunk_size)
+                    stats.update(outliers_detected=outliers, outlier_rows=outlier_rows,
+                                 outlier_bounds=history.bounds())
+                    return {'rows': stats['cleaned_rows'], 'stats': stats}
+
+                table, processed = process_pending(input_file, clean_data_path, 'cleaning',
+                                                   clean_partition, next_stages=('features',))
+                save_outlier_history(table, history)
+                stats = merge_cleaning_stats((entry['stats'] for entry in table.partitions),
+                                             bounds=history.bounds())
+                stats["outlier_bounds_method"] = "quantile sketch over all partitions"
+                partitions_note = f"- partitions שנוקו בריצה זו: {len(processed)} מתוך {len(table.partitions)}\n"
+            elif streaming:
+                # ניקוי במנות - הקובץ לא נטען לזיכרון, והפלט נכתב בהדרגה
+                stats = clean_table_streaming(input_file, clean_data_path, chunk_size=chunk_size)
+            else:
+                # ניקוי בזיכרון: חסרים, inf, outliers (IQR), מחיקת שורות חסרות
+                df, stats = clean_frame(read_table(input_file))
+                write_table(df, clean_data_path)
+
+            original_rows = stats["original_rows"]
+            cleaned_rows = stats["cleaned_rows"]
+            outliers_count = stats["outliers_detected"]
+
+            # עדכון dataset contract (אם קיים)
             contract_path = os.path.join(output_dir, "dataset_contract.json")
             if os.path.exists(contract_path):
                 try:
@@ -134,10 +225,13 @@ class DataCleaningTool(BaseTool):
                     contract["cleaning"] = {
                         "cleaning_date": datetime.now().isoformat(),
                         "original_rows": original_rows,
-                        "cleaned_rows": len(df),
-                        "rows_removed": original_rows - len(df),
-                        "missing_values_found": missing_report,
+                        "cleaned_rows": cleaned_rows,
+                        "rows_removed": original_rows - cleaned_rows,
+                        "missing_values_found": stats["missing_values_found"],
                         "outliers_detected": outliers_count,
+                        "outlier_rows": stats["outlier_rows"],
+                        "outlier_bounds": stats["outlier_bounds"],
+                        "outlier_bounds_method": stats.get("outlier_bounds_method", "exact"),
                         "cleaning_actions": [
                             "הסרת ערכי inf",
                             "מחיקת שורות עם ערכים חסרים",
@@ -151,10 +245,12 @@ class DataCleaningTool(BaseTool):
                     pass  # אם יש בעיה בעדכון החוזה, נמשיך
 
             return f"✓ ניקוי נתונים הושלם!\n" \
+                   f"{partitions_note}" \
                    f"- שורות מקוריות: {original_rows:,}\n" \
-                   f"- שורות לאחר ניקוי: {len(df):,}\n" \
-                   f"- שורות שהוסרו: {original_rows - len(df):,}\n" \
-                   f"- Outliers שזוהו: {sum(outliers_count.values())}"
+                   f"- שורות לאחר ניקוי: {cleaned_rows:,}\n" \
+                   f"- שורות שהוסרו: {original_rows - cleaned_rows:,}\n" \
+                   f"- Outliers שזוהו: {sum(outliers_count.values())}\n" \
+                   f"- שורות עם outlier אחד לפחות: {stats['outlier_rows']:,}"
 
         except Exception as e:
             return f"❌ שגיאה בניקוי הנתונים: {str(e)}"
@@ -164,39 +260,24 @@ class EDAInput(BaseModel):
     """Input schema for EDA Tools"""
     input_file: str = Field(default="outputs/clean_data.csv")
     output_dir: str = Field(default="outputs")
+    figure_mode: str = Field(default=None, description="full (300 dpi, ברירת מחדל) או preview (מהיר, 100 dpi). ברירת מחדל מ-FIGURE_MODE")
 
 
 class DistributionAnalysisTool(BaseTool):
     name: str = "Distribution Analysis Tool"
     description: str = "יוצר ניתוח התפלגויות עם היסטוגרמות ו-box plots"
 
-    def _run(self, input_file: str = "outputs/clean_data.csv", output_dir: str = "outputs") -> str:
+    def _run(self, input_file: str = "outputs/clean_data.csv", output_dir: str = "outputs",
+             figure_mode: str = None) -> str:
         try:
-            df = pd.read_csv(input_file)
-            fig_dir = os.path.join(output_dir, "figures")
-            os.makedirs(fig_dir, exist_ok=True)
+            df = read_table(input_file)
+            mode = resolve_mode(figure_mode)
 
-            # יצירת figure עם subplots
-            num_cols = len(df.columns)
-            fig, axes = plt.subplots(num_cols, 2, figsize=(15, num_cols * 4))
+            # גרף נפרד לכל עמודה מספרית - מרונדרים במקביל
+            fig_dir = os.path.join(output_dir, "figures", "distributions")
+            paths = render_distributions(df, fig_dir, mode=mode)
 
-            for idx, col in enumerate(df.columns):
-                # Histogram
-                axes[idx, 0].hist(df[col], bins=50, edgecolor='black', alpha=0.7)
-                axes[idx, 0].set_title(f'Distribution of {col}')
-                axes[idx, 0].set_xlabel(col)
-                axes[idx, 0].set_ylabel('Frequency')
-
-                # Box plot
-                axes[idx, 1].boxplot(df[col])
-                axes[idx, 1].set_title(f'Box Plot of {col}')
-                axes[idx, 1].set_ylabel(col)
-
-            plt.tight_layout()
-            plt.savefig(os.path.join(fig_dir, "distributions.png"), dpi=300, bbox_inches='tight')
-            plt.close()
-
-            return "✓ ניתוח התפלגויות נוצר בהצלחה"
+            return f"✓ ניתוח התפלגויות נוצר בהצלחה ({len(paths)} גרפים ב-{fig_dir}, מצב {mode})"
 
         except Exception as e:
             return f"❌ שגיאה: {str(e)}"
@@ -206,23 +287,23 @@ class CorrelationAnalysisTool(BaseTool):
     name: str = "Correlation Analysis Tool"
     description: str = "יוצר מטריצת קורלציות ו-pairplot"
 
-    def _run(self, input_file: str = "outputs/clean_data.csv", output_dir: str = "outputs") -> str:
+    def _run(self, input_file: str = "outputs/clean_data.csv", output_dir: str = "outputs",
+             figure_mode: str = None) -> str:
         try:
-            df = pd.read_csv(input_file)
             fig_dir = os.path.join(output_dir, "figures")
             os.makedirs(fig_dir, exist_ok=True)
 
-            # Correlation heatmap
-            plt.figure(figsize=(12, 10))
-            corr_matrix = df.corr()
+            # Correlation heatmap - מהמטריצה המשותפת (core.correlation), מחושבת פעם אחת לכל גרסת נתונים
+            fig, ax = plt.subplots(figsize=(12, 10))
+            corr_matrix, _ = load_correlations(input_file, output_dir)
             sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0,
-                       square=True, linewidths=1, cbar_kws={"shrink": 0.8})
-            plt.title('Correlation Matrix', fontsize=16)
-            plt.tight_layout()
-            plt.savefig(os.path.join(fig_dir, "correlation_heatmap.png"), dpi=300, bbox_inches='tight')
-            plt.close()
+                       square=True, linewidths=1, cbar_kws={"shrink": 0.8}, ax=ax)
+            ax.set_title('Correlation Matrix', fontsize=16)
+            save_figure(fig, os.path.join(fig_dir, "correlation_heatmap.png"), figure_mode)
+            plt.close(fig)
 
             # Pairplot אינטראקטיבי עם plotly
+            df = read_table(input_file, columns=read_table_columns(input_file)[:5])
             fig = px.scatter_matrix(df, dimensions=df.columns[:5],  # 5 משתנים ראשונים
                                    title="Pairplot - Interactive")
             fig.write_html(os.path.join(fig_dir, "pairplot.html"))
@@ -237,23 +318,42 @@ class GeographicAnalysisTool(BaseTool):
     name: str = "Geographic Analysis Tool"
     description: str = "יוצר ניתוח גיאוגרפי של הנתונים"
 
-    def _run(self, input_file: str = "outputs/clean_data.csv", output_dir: str = "outputs") -> str:
+    def _run(self, input_file: str = "outputs/clean_data.csv", output_dir: str = "outputs",
+             geo_mode: str = None, max_points: int = DEFAULT_MAX_POINTS,
+             gridsize: int = DEFAULT_GRIDSIZE) -> str:
         try:
-            df = pd.read_csv(input_file)
+            columns = ['Longitude', 'Latitude', 'Price_Millions', 'Population', 'Rooms', 'Size_sqm']
+            if 'City' in read_table_columns(input_file):
+                columns.append('City')
+            df = read_table(input_file, columns=columns)
             fig_dir = os.path.join(output_dir, "figures")
             os.makedirs(fig_dir, exist_ok=True)
 
-            # Geographic scatter plot
-            fig = px.scatter(df, x='Longitude', y='Latitude',
-                           color='Price_Millions', size='Population',
-                           hover_data=['Rooms', 'Size_sqm'],
-                           title='Israel Housing - Geographic Distribution',
-                           color_continuous_scale='Viridis')
+            # גודל הגרף חסום: מעל max_points שורות - תאים או מדגם מרובד
+            view, mode = geo_view(df, geo_mode, max_points=max_points, gridsize=gridsize)
+            title = 'Israel Housing - Geographic Distribution'
+
+            if mode in ('hex', 'grid'):
+                fig = px.scatter(view, x='Longitude', y='Latitude',
+                               color='Price_Millions_median', size='count',
+                               hover_data=['count', 'Price_Millions_mean',
+                                           'Price_Millions_min', 'Price_Millions_max'],
+                               title=f'{title} ({mode} cells, median price)',
+                               color_continuous_scale='Viridis')
+                fig.update_traces(marker_symbol='hexagon' if mode == 'hex' else 'square')
+                summary = f"{len(view):,} תאים מתוך {len(df):,} דירות"
+            else:
+                fig = px.scatter(view, x='Longitude', y='Latitude',
+                               color='Price_Millions', size='Population',
+                               hover_data=['Rooms', 'Size_sqm'],
+                               title=title if mode == 'points' else f'{title} (stratified sample)',
+                               color_continuous_scale='Viridis')
+                summary = f"{len(view):,} מתוך {len(df):,} דירות"
 
             fig.update_layout(width=1000, height=800)
             fig.write_html(os.path.join(fig_dir, "geographic_analysis.html"))
 
-            return "✓ ניתוח גיאוגרפי נוצר בהצלחה"
+            return f"✓ ניתוח גיאוגרפי נוצר בהצלחה (מצב {mode}: {summary})"
 
         except Exception as e:
             return f"❌ שגיאה: {str(e)}"
@@ -265,17 +365,21 @@ class InsightsGeneratorTool(BaseTool):
 
     def _run(self, input_file: str = "outputs/clean_data.csv", output_dir: str = "outputs") -> str:
         try:
-            df = pd.read_csv(input_file)
+            # סיכום מצטבר (core.summary_stats) - הטבלה לא נטענת לזיכרון
+            summary = load_summary(input_file, output_dir)
+            price = summary.describe()['Price_Millions']
+            columns = read_table_columns(input_file)
 
-            # חישוב קורלציות עם המשתנה היעד
-            target_corr = df.corr()['Price_Millions'].sort_values(ascending=False)
+            # קורלציות עם המשתנה היעד - מהמטריצה המשותפת
+            corr_matrix, _ = load_correlations(input_file, output_dir)
+            target_corr = corr_matrix['Price_Millions'].sort_values(ascending=False)
 
             # יצירת תובנות
             insights = f"""# תובנות מניתוח הנתונים - Israel Housing
 
 ## 📊 סטטיסטיקות כלליות
-- **סך שורות**: {len(df):,}
-- **סך עמודות**: {len(df.columns)}
+- **סך שורות**: {summary.rows:,}
+- **סך עמודות**: {len(columns)}
 - **משתנה יעד**: Price_Millions (מחיר במיליוני שקלים)
 
 ## 🎯 קורלציות חשובות
@@ -288,9 +392,9 @@ class InsightsGeneratorTool(BaseTool):
 המשתנה **{target_corr.index[1]}** הוא הכי קשור למחיר עם קורלציה של {target_corr.iloc[1]:.3f}
 
 ### 2. מאפייני התפלגות
-- מחיר ממוצע: {df['Price_Millions'].mean():.2f} מיליון ש"ח
-- מחיר חציוני: {df['Price_Millions'].median():.2f} מיליון ש"ח
-- סטיית תקן: {df['Price_Millions'].std():.2f} מיליון ש"ח
+- מחיר ממוצע: {price['mean']:.2f} מיליון ש"ח
+- מחיר חציוני: {price['50%']:.2f} מיליון ש"ח
+- סטיית תקן: {price['std']:.2f} מיליון ש"ח
 
 ### 3. דפוסים גיאוגרפיים
 - התפלגות גיאוגרפית מגוונת בישראל
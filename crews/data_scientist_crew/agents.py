@@ -27,7 +27,7 @@ class DataScientistAgents:
             backstory="""אתה מדען נתונים ותיק שמאמן מודלי ML מתקדמים.
             אתה מומחה ב-scikit-learn ויודע לכוון היפר-פרמטרים.
             אתה תמיד מאמן לפחות 3 מודלים שונים ומשווה ביניהם:
-            Linear Regression, Random Forest, ו-Gradient Boosting.""",
+            Linear Regression, Random Forest, Gradient Boosting ו-Hist Gradient Boosting.""",
             tools=ModelTrainingTools().get_tools(),
             verbose=True,
             allow_delegation=False
@@ -49,7 +49,7 @@ class DataScientistTasks:
         """משימה 2: אימון מודלים"""
         return Task(
             description="""
-            אמן 3 מודלים שונים על הנתונים עם הפיצ'רים ב-outputs/features.csv.
+            אמן 4 מודלים שונים על הנתונים עם הפיצ'רים ב-outputs/features.csv.
 
             מודלים לאימון:
             1. **Linear Regression**
@@ -66,6 +66,10 @@ class DataScientistTasks:
                - learning_rate: [0.01, 0.1]
                - max_depth: [3, 5]
 
+            4. **Hist Gradient Boosting Regressor**
+               - City כפיצ'ר קטגוריאלי מובנה
+               - early stopping במקום גריד על n_estimators
+
             תהליך:
             1. פצל את הנתונים: 80% train, 20% test
             2. אמן כל מודל עם cross-validation (5-fold)
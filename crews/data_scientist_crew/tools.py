@@ -1,21 +1,36 @@
 """Tools for Data Scientist Crew - כלים לצוות מדעני הנתונים"""
 import os
 import json
-import joblib
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_score
-from sklearn.linear_model import LinearRegression, Ridge
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.linear_model import Ridge
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from sklearn.preprocessing import StandardScaler
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
+from threadpoolctl import threadpool_limits
 from datetime import datetime
 import time
 
+from core.cleaning import should_stream
+from core.correlation import target_correlations
+from core.features import HousingFeatureTransformer, TARGET_COLUMN
+from core.figures import render_parallel, scatter_figure
+from core.gram_linear import HOLDOUT, fit_arrays, fit_table
+from core.model_bundle import bundle_features, load_bundle, save_bundle
+from core.partitions import PartitionedTable, process_pending
+from core.prediction_cache import (
+    load_predictions,
+    save_predictions,
+    split_predictions,
+    split_rmse,
+    trainer_predictions,
+)
+from core.search import make_search
+from core.training_context import TrainingContext, find_target_column
+from core.storage import partition_root, read_table, read_table_columns, write_table
+
 
 class FeatureEngineeringInput(BaseModel):
     """Input schema for Feature Engineering Tool"""
@@ -29,88 +44,44 @@ class FeatureEngineeringTool(BaseTool):
 
     def _run(self, input_file: str = "outputs/clean_data.csv", output_dir: str = "outputs") -> str:
         try:
-            # קריאת הנתונים
-            df = pd.read_csv(input_file)
-            original_features = df.columns.tolist()
-
-            # 0. המרת עמודת City למספרים (Label Encoding)
-            if 'City' in df.columns:
-                df['City_encoded'] = pd.Categorical(df['City']).codes
-                # שמירת המיפוי לשימוש עתידי
-                city_mapping = {city: code for code, city in enumerate(df['City'].unique())}
-                import json
-                mapping_path = os.path.join(output_dir, "city_mapping.json")
-                with open(mapping_path, 'w', encoding='utf-8') as f:
-                    json.dump(city_mapping, f, ensure_ascii=False, indent=2)
-                # הסרת העמודה המקורית
-                df = df.drop('City', axis=1)
-
-            # 1. יחסים (Ratios) - מותאם לנתוני ישראל
-            # הסרנו price_per_sqm כי זה data leakage (תלוי במחיר שאנחנו מנסים לחזות)
-            df['rooms_per_size'] = df['Rooms'] / (df['Size_sqm'] + 0.001)  # חדרים למ"ר
-            df['income_per_size'] = df['AvgIncome'] / (df['Size_sqm'] + 0.001)  # הכנסה למ"ר
-
-            # 2. פיצ'רים נוספים - ללא שימוש בקואורדינטות
-            # שימוש במרחק מהים הקיים (ללא חישובים גיאוגרפיים)
-            df['sea_proximity_score'] = 1 / (df['DistanceSea_km'] + 1)
-            df['center_proximity_score'] = 1 / (df['DistanceCenter_km'] + 1)
-
-            # 3. טרנספורמציות - מותאם לנתוני ישראל
-            df['log_avg_income'] = np.log1p(df['AvgIncome'])
-            df['income_category'] = pd.cut(df['AvgIncome'],
-                                          bins=[0, 10, 15, 25],
-                                          labels=['Low', 'Medium', 'High'])
-            # המר קטגוריות למספרים
-            df['income_category_encoded'] = df['income_category'].cat.codes
-            
-            # גיל הדירה (כבר קיים, אבל נוסיף קטגוריות)
-            df['age_category'] = pd.cut(df['Age'],
-                                       bins=[0, 10, 30, 100],
-                                       labels=['New', 'Medium', 'Old'])
-            df['age_category_encoded'] = df['age_category'].cat.codes
-
-            # 4. אינטראקציות - מותאם לנתוני ישראל (ללא קואורדינטות)
-            df['income_per_room'] = df['AvgIncome'] * df['Rooms']
-            df['size_income'] = df['Size_sqm'] * df['AvgIncome']
-            df['city_size_interaction'] = df['Size_sqm'] * df['Rooms']
-            df['age_size_interaction'] = df['Age'] * df['Size_sqm']
-
-            # הסרת קווי אורך ורוחב מהנתונים
-            if 'Latitude' in df.columns:
-                df = df.drop('Latitude', axis=1)
-            if 'Longitude' in df.columns:
-                df = df.drop('Longitude', axis=1)
-
-            # הסרת עמודות קטגוריה זמניות
-            if 'income_category' in df.columns:
-                df = df.drop('income_category', axis=1)
-            if 'age_category' in df.columns:
-                df = df.drop('age_category', axis=1)
-
-            # שמירת הנתונים עם פיצ'רים
-            features_path = os.path.join(output_dir, "features.csv")
-            df.to_csv(features_path, index=False)
+            if partition_root(input_file):
+                # נתונים שנקלטו במצטבר - פיצ'רים רק ל-partitions החדשים
+                df, original_features = self._transform_partitions(input_file, output_dir)
+            else:
+                # קריאת הנתונים
+                df = read_table(input_file)
+                original_features = df.columns.tolist()
+
+                # כל הפיצ'רים מחושבים בטרנספורמציה המשותפת (core.features),
+                # אותה טרנספורמציה שמשמשת את ה-Dashboard בזמן חיזוי
+                transformer = HousingFeatureTransformer()
+                feature_matrix = transformer.fit_transform(df)
+
+                # שמירת מיפוי הערים (תואם לקידוד City_encoded) לשימוש עתידי
+                self._save_city_mapping(transformer, output_dir)
+
+                df = self._features_frame(transformer, feature_matrix, df)
+
+                # שמירת הנתונים עם פיצ'רים
+                features_path = os.path.join(output_dir, "features.csv")
+                write_table(df, features_path)
 
             # יצירת דוח Feature Engineering
             new_features = [col for col in df.columns if col not in original_features]
 
             # חישוב קורלציה עם Target
-            correlations = {}
             target_col = 'Price_Millions'
             if target_col not in df.columns:
                 # נסה למצוא את עמודת המחיר
                 possible_targets = [col for col in df.columns if 'price' in col.lower() or 'מחיר' in col.lower()]
                 if possible_targets:
                     target_col = possible_targets[0]
-            
-            for feature in new_features:
-                if feature != target_col and df[feature].dtype in [np.number]:
-                    try:
-                        corr = df[feature].corr(df[target_col])
-                        if not np.isnan(corr):
-                            correlations[feature] = float(corr)
-                    except:
-                        pass
+
+            # כל הפיצ'רים החדשים מול ה-target במכפלת מטריצה-וקטור אחת
+            correlations = {}
+            if target_col in df.columns:
+                correlations = {feature: float(corr) for feature, corr in
+                                target_correlations(df, target_col, new_features).items()}
 
             report = f"""# Feature Engineering Report
 
@@ -181,6 +152,65 @@ class FeatureEngineeringTool(BaseTool):
         except Exception as e:
             return f"❌ שגיאה בהנדסת פיצ'רים: {str(e)}"
 
+    @staticmethod
+    def _features_frame(transformer, feature_matrix, df):
+        """מטריצת הפיצ'רים כ-DataFrame, עם עמודת ה-target בסוף (אם קיימת)"""
+        target = df[TARGET_COLUMN] if TARGET_COLUMN in df.columns else None
+        features = pd.DataFrame(feature_matrix, columns=transformer.feature_names_)
+        if target is not None:
+            features[TARGET_COLUMN] = target.to_numpy()
+        return features
+
+    @staticmethod
+    def _save_city_mapping(transformer, output_dir):
+        if transformer.city_categories_ is not None:
+            mapping_path = os.path.join(output_dir, "city_mapping.json")
+            with open(mapping_path, 'w', encoding='utf-8') as f:
+                json.dump(transformer.city_mapping_, f, ensure_ascii=False, indent=2)
+
+    def _transform_partitions(self, input_file, output_dir):
+        """
+        פיצ'רים רק ל-partitions שממתינים לשלב features. קידוד הערים יציב:
+        עיר חדשה מקבלת את הקוד הבא בתור, כך שה-partitions הקיימים נשארים תקפים.
+        מחזיר (טבלת הפיצ'רים המלאה, העמודות המקוריות).
+        """
+        features_path = os.path.join(output_dir, "features.csv")
+        meta = PartitionedTable(features_path).meta
+        state = {'transformer': None}
+        if 'passthrough_columns' in meta:
+            state['transformer'] = HousingFeatureTransformer(
+                city_categories=meta.get('city_categories'),
+                passthrough_columns=meta['passthrough_columns'])
+
+        def transform_partition(source, target):
+            df = read_table(source)
+            transformer = state['transformer']
+            if transformer is None:
+                transformer = HousingFeatureTransformer().fit(df)
+            elif transformer.city_categories_ is not None and 'City' in df.columns:
+                known = set(transformer.city_categories_)
+                new_cities = sorted(city for city in pd.unique(df['City'].dropna()) if city not in known)
+                if new_cities:
+                    transformer = HousingFeatureTransformer(
+                        city_categories=transformer.city_categories_ + new_cities,
+                        passthrough_columns=transformer.passthrough_columns_)
+            state['transformer'] = transformer
+
+            features = self._features_frame(transformer, transformer.transform(df), df)
+            write_table(features, target)
+            return {'rows': len(features)}
+
+        table, _ = process_pending(input_file, features_path, 'features', transform_partition)
+
+        transformer = state['transformer']
+        if transformer is not None:
+            table.meta.update(passthrough_columns=transformer.passthrough_columns_,
+                              city_categories=transformer.city_categories_)
+            table.save()
+            self._save_city_mapping(transformer, output_dir)
+
+        return read_table(features_path), read_table_columns(input_file)
+
 
 class ModelTrainingInput(BaseModel):
     """Input schema for Model Training Tools"""
@@ -192,58 +222,50 @@ class LinearRegressionTrainer(BaseTool):
     name: str = "Linear Regression Trainer"
     description: str = "מאמן מודל Linear Regression עם regularization"
 
-    def _run(self, input_file: str = "outputs/features.csv", output_dir: str = "outputs") -> dict:
+    def _run(self, input_file: str = "outputs/features.csv", output_dir: str = "outputs",
+             context: TrainingContext = None, n_jobs: int = None) -> dict:
         try:
-            df = pd.read_csv(input_file)
-            # מציאת עמודת המחיר
-            target_col = 'Price_Millions'
-            if target_col not in df.columns:
-                # נסה למצוא את עמודת המחיר
-                possible_targets = [col for col in df.columns if 'price' in col.lower() or 'מחיר' in col.lower()]
-                if possible_targets:
-                    target_col = possible_targets[0]
-                else:
-                    return {'error': f'לא נמצאה עמודת מחיר. עמודות זמינות: {list(df.columns)}'}
-            
-            X = df.drop(target_col, axis=1)
-            y = df[target_col]
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-            # Scaling
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
-
-            # אימון Linear Regression רגיל
+            # מעבר אחד על הנתונים: X^T X ו-X^T y לכל fold ול-test (core.gram_linear).
+            # 5-fold CV, המודל הסופי והמטריקות נפתרים מהן - בלי התאמות ובלי חיזוי
             start_time = time.time()
-            lr = LinearRegression()
-            lr.fit(X_train_scaled, y_train)
+            predictions = None
+            if context is None and should_stream(input_file):
+                # טבלה גדולה - הסטטיסטיקות נצברות במנות מהדיסק, בלי לטעון אותה
+                # (ובלי חיזויים שמורים - ההערכה תחזה בעצמה)
+                stats, schema = fit_table(input_file, find_target_column(read_table_columns(input_file)))
+            else:
+                # טעינה ופיצול משותפים לכל המאמנים (הקובץ נקרא פעם אחת לכל תהליך)
+                context = context or TrainingContext.shared(input_file)
+                stats = fit_arrays(context.X_train, context.y_train, context.X_test, context.y_test)
+                schema = context.schema
+
+            train_folds = stats.train_folds()
+            coef, intercept = stats.solve(train_folds)
+            lr, scaler = stats.to_sklearn(train_folds)
             train_time = time.time() - start_time
 
-            # חיזוי
-            y_train_pred = lr.predict(X_train_scaled)
-            y_test_pred = lr.predict(X_test_scaled)
-
-            # מטריקות
-            train_rmse = np.sqrt(mean_squared_error(y_train, y_train_pred))
-            test_rmse = np.sqrt(mean_squared_error(y_test, y_test_pred))
-            test_r2 = r2_score(y_test, y_test_pred)
+            # Cross-validation - כל fold נפתר מסכום הסטטיסטיקות של האחרים
+            cv_scores = stats.cv_rmse()
 
-            # Cross-validation
-            cv_scores = cross_val_score(lr, X_train_scaled, y_train, cv=5,
-                                       scoring='neg_root_mean_squared_error')
+            if context is not None:
+                # חיזויים לשמירה ליד המודל - מכפלת מטריצה-וקטור, ו-out-of-fold ממודלי ה-CV
+                predictions = trainer_predictions(context,
+                                                  context.X_train @ coef + intercept,
+                                                  context.X_test @ coef + intercept,
+                                                  oof=stats.oof_predict(context.X_train))
 
             return {
                 'model_name': 'Linear Regression',
-                'train_rmse': float(train_rmse),
-                'test_rmse': float(test_rmse),
-                'test_r2': float(test_r2),
-                'cv_rmse_mean': float(-cv_scores.mean()),
+                'train_rmse': stats.rmse(coef, intercept, train_folds),
+                'test_rmse': stats.rmse(coef, intercept, [HOLDOUT]),
+                'test_r2': stats.r2(coef, intercept, [HOLDOUT]),
+                'cv_rmse_mean': float(cv_scores.mean()),
                 'cv_rmse_std': float(cv_scores.std()),
                 'training_time': float(train_time),
                 'model': lr,
-                'scaler': scaler
+                'scaler': scaler,
+                'predictions': predictions,
+                **schema
             }
 
         except Exception as e:
@@ -254,23 +276,14 @@ class RandomForestTrainer(BaseTool):
     name: str = "Random Forest Trainer"
     description: str = "מאמן Random Forest עם GridSearch"
 
-    def _run(self, input_file: str = "outputs/features.csv", output_dir: str = "outputs") -> dict:
+    def _run(self, input_file: str = "outputs/features.csv", output_dir: str = "outputs",
+             context: TrainingContext = None, n_jobs: int = -1,
+             search_strategy: str = None) -> dict:
         try:
-            df = pd.read_csv(input_file)
-            # מציאת עמודת המחיר
-            target_col = 'Price_Millions'
-            if target_col not in df.columns:
-                # נסה למצוא את עמודת המחיר
-                possible_targets = [col for col in df.columns if 'price' in col.lower() or 'מחיר' in col.lower()]
-                if possible_targets:
-                    target_col = possible_targets[0]
-                else:
-                    return {'error': f'לא נמצאה עמודת מחיר. עמודות זמינות: {list(df.columns)}'}
-            
-            X = df.drop(target_col, axis=1)
-            y = df[target_col]
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+            # טעינה ופיצול משותפים לכל המאמנים (הקובץ נקרא פעם אחת לכל תהליך)
+            context = context or TrainingContext.shared(input_file)
+            X_train, X_test = context.X_train, context.X_test
+            y_train, y_test = context.y_train, context.y_test
 
             # GridSearch
             param_grid = {
@@ -280,8 +293,12 @@ class RandomForestTrainer(BaseTool):
             }
 
             start_time = time.time()
-            rf = RandomForestRegressor(random_state=42, n_jobs=-1)
-            grid_search = GridSearchCV(rf, param_grid, cv=3, scoring='neg_root_mean_squared_error', n_jobs=-1)
+            # עם תקציב ליבות (n_jobs != -1) המקביליות היא ברמת ה-GridSearch וכל יער רץ על ליבה אחת.
+            # בתוך עובדי החיפוש היער תמיד רץ עם n_jobs=1 (core.shared_cv)
+            rf = RandomForestRegressor(random_state=42, n_jobs=-1 if n_jobs == -1 else 1)
+            # חיפוש היפר-פרמטרים (ברירת מחדל: Successive Halving על n_estimators)
+            grid_search = make_search(rf, param_grid, strategy=search_strategy,
+                                      resource='n_estimators', n_jobs=n_jobs)
             grid_search.fit(X_train, y_train)
             train_time = time.time() - start_time
 
@@ -303,9 +320,12 @@ class RandomForestTrainer(BaseTool):
                 'test_r2': float(test_r2),
                 'cv_rmse_mean': float(-grid_search.best_score_),
                 'best_params': grid_search.best_params_,
+                'search_strategy': grid_search.strategy,
                 'training_time': float(train_time),
                 'model': best_model,
-                'scaler': None
+                'scaler': None,
+                'predictions': trainer_predictions(context, y_train_pred, y_test_pred),
+                **context.schema
             }
 
         except Exception as e:
@@ -316,23 +336,14 @@ class GradientBoostingTrainer(BaseTool):
     name: str = "Gradient Boosting Trainer"
     description: str = "מאמן Gradient Boosting עם GridSearch"
 
-    def _run(self, input_file: str = "outputs/features.csv", output_dir: str = "outputs") -> dict:
+    def _run(self, input_file: str = "outputs/features.csv", output_dir: str = "outputs",
+             context: TrainingContext = None, n_jobs: int = -1,
+             search_strategy: str = None) -> dict:
         try:
-            df = pd.read_csv(input_file)
-            # מציאת עמודת המחיר
-            target_col = 'Price_Millions'
-            if target_col not in df.columns:
-                # נסה למצוא את עמודת המחיר
-                possible_targets = [col for col in df.columns if 'price' in col.lower() or 'מחיר' in col.lower()]
-                if possible_targets:
-                    target_col = possible_targets[0]
-                else:
-                    return {'error': f'לא נמצאה עמודת מחיר. עמודות זמינות: {list(df.columns)}'}
-            
-            X = df.drop(target_col, axis=1)
-            y = df[target_col]
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+            # טעינה ופיצול משותפים לכל המאמנים (הקובץ נקרא פעם אחת לכל תהליך)
+            context = context or TrainingContext.shared(input_file)
+            X_train, X_test = context.X_train, context.X_test
+            y_train, y_test = context.y_train, context.y_test
 
             # GridSearch
             param_grid = {
@@ -343,7 +354,10 @@ class GradientBoostingTrainer(BaseTool):
 
             start_time = time.time()
             gb = GradientBoostingRegressor(random_state=42)
-            grid_search = GridSearchCV(gb, param_grid, cv=3, scoring='neg_root_mean_squared_error', n_jobs=-1)
+            # חיפוש היפר-פרמטרים (ברירת מחדל: staged - אנסמבל אחד לכל צירוף,
+            # וכל ערכי n_estimators מוערכים מהקידומות שלו)
+            grid_search = make_search(gb, param_grid, strategy=search_strategy,
+                                      resource='n_samples', n_jobs=n_jobs, default='staged')
             grid_search.fit(X_train, y_train)
             train_time = time.time() - start_time
 
@@ -365,9 +379,83 @@ class GradientBoostingTrainer(BaseTool):
                 'test_r2': float(test_r2),
                 'cv_rmse_mean': float(-grid_search.best_score_),
                 'best_params': grid_search.best_params_,
+                'search_strategy': grid_search.strategy,
                 'training_time': float(train_time),
                 'model': best_model,
-                'scaler': None
+                'scaler': None,
+                'predictions': trainer_predictions(context, y_train_pred, y_test_pred),
+                **context.schema
+            }
+
+        except Exception as e:
+            return {'error': str(e)}
+
+
+class HistGradientBoostingTrainer(BaseTool):
+    name: str = "Hist Gradient Boosting Trainer"
+    description: str = "מאמן Gradient Boosting מבוסס היסטוגרמות (מרובה ליבות, City כקטגוריה, early stopping)"
+
+    def _run(self, input_file: str = "outputs/features.csv", output_dir: str = "outputs",
+             context: TrainingContext = None, n_jobs: int = -1,
+             search_strategy: str = None) -> dict:
+        try:
+            # טעינה ופיצול משותפים לכל המאמנים (הקובץ נקרא פעם אחת לכל תהליך)
+            context = context or TrainingContext.shared(input_file)
+            X_train, X_test = context.X_train, context.X_test
+            y_train, y_test = context.y_train, context.y_test
+
+            # City_encoded כפיצ'ר קטגוריאלי מובנה (קוד שלילי = עיר לא מוכרת = missing)
+            categorical = [context.feature_names.index(col) for col in ('City_encoded',)
+                           if col in context.feature_names]
+
+            # מספר העצים נקבע ב-early stopping, ולכן אין n_estimators בגריד
+            param_grid = {
+                'learning_rate': [0.05, 0.1],
+                'max_leaf_nodes': [15, 31],
+                'l2_regularization': [0.0, 1.0]
+            }
+
+            start_time = time.time()
+            hgb = HistGradientBoostingRegressor(
+                max_iter=1000,
+                early_stopping=True,
+                validation_fraction=0.1,
+                n_iter_no_change=20,
+                categorical_features=categorical or None,
+                random_state=42
+            )
+            # המקביליות היא בתוך כל אימון (OpenMP), ולכן החיפוש רץ סדרתית
+            # ומספר ה-threads מוגבל לתקציב הליבות של המאמן
+            with threadpool_limits(limits=None if n_jobs in (None, -1) else n_jobs, user_api='openmp'):
+                grid_search = make_search(hgb, param_grid, strategy=search_strategy,
+                                          resource='n_samples', n_jobs=1)
+                grid_search.fit(X_train, y_train)
+            train_time = time.time() - start_time
+
+            best_model = grid_search.best_estimator_
+
+            # חיזוי
+            y_train_pred = best_model.predict(X_train)
+            y_test_pred = best_model.predict(X_test)
+
+            # מטריקות
+            train_rmse = np.sqrt(mean_squared_error(y_train, y_train_pred))
+            test_rmse = np.sqrt(mean_squared_error(y_test, y_test_pred))
+            test_r2 = r2_score(y_test, y_test_pred)
+
+            return {
+                'model_name': 'Hist Gradient Boosting',
+                'train_rmse': float(train_rmse),
+                'test_rmse': float(test_rmse),
+                'test_r2': float(test_r2),
+                'cv_rmse_mean': float(-grid_search.best_score_),
+                'best_params': {**grid_search.best_params_, 'n_iter': int(best_model.n_iter_)},
+                'search_strategy': grid_search.strategy,
+                'training_time': float(train_time),
+                'model': best_model,
+                'scaler': None,
+                'predictions': trainer_predictions(context, y_train_pred, y_test_pred),
+                **context.schema
             }
 
         except Exception as e:
@@ -394,9 +482,16 @@ class ModelComparisonTool(BaseTool):
                     'train_rmse': best_model_result['train_rmse'],
                     'test_rmse': best_model_result['test_rmse'],
                     'test_r2': best_model_result['test_r2']
-                }
+                },
+                # סכמת הפיצ'רים (סדר + dtypes) - מסלול החיזוי משתמש רק בה
+                'features': best_model_result.get('features'),
+                'feature_dtypes': best_model_result.get('feature_dtypes')
             }
-            joblib.dump(model_data, model_path)
+            # model.pkl + header + מערכי העצים (model_compiled/) לטעינה ב-mmap
+            save_bundle(model_data, model_path)
+            # החיזויים של המאמן - ההערכה וה-Model Card קוראים אותם במקום לחזות שוב
+            if best_model_result.get('predictions') is not None:
+                save_predictions(model_path, best_model_result['predictions'])
 
             # שמירת השוואה
             comparison = []
@@ -408,7 +503,8 @@ class ModelComparisonTool(BaseTool):
                     'test_r2': result['test_r2'],
                     'cv_rmse_mean': result.get('cv_rmse_mean'),
                     'training_time': result['training_time'],
-                    'best_params': result.get('best_params', {})
+                    'best_params': result.get('best_params', {}),
+                    'search_strategy': result.get('search_strategy')
                 })
 
             comparison_path = os.path.join(output_dir, "all_models_comparison.json")
@@ -433,9 +529,20 @@ class ModelTrainingTools:
             LinearRegressionTrainer(),
             RandomForestTrainer(),
             GradientBoostingTrainer(),
+            HistGradientBoostingTrainer(),
             ModelComparisonTool()
         ]
 
+    @staticmethod
+    def get_weighted_trainers():
+        """מאמנים ומשקלם בחלוקת הליבות (לאימון מקבילי ב-run_trainers_parallel)"""
+        return [
+            (LinearRegressionTrainer, 1),
+            (RandomForestTrainer, 3),
+            (GradientBoostingTrainer, 2),
+            (HistGradientBoostingTrainer, 2)
+        ]
+
 
 class ModelEvaluationTool(BaseTool):
     name: str = "Model Evaluation Tool"
@@ -443,34 +550,18 @@ class ModelEvaluationTool(BaseTool):
 
     def _run(self, model_path: str = "outputs/model.pkl",
              data_path: str = "outputs/features.csv",
-             output_dir: str = "outputs") -> str:
+             output_dir: str = "outputs",
+             context: TrainingContext = None,
+             figure_mode: str = None) -> str:
         try:
-            # טעינת המודל והנתונים
-            model_data = joblib.load(model_path)
-            model = model_data['model']
-            scaler = model_data.get('scaler')
+            # טעינת המודל והנתונים (אותו context כמו של המאמנים)
+            model_data = load_bundle(model_path)
+            context = context or TrainingContext.shared(data_path)
+            y_test = context.y_test
 
-            df = pd.read_csv(data_path)
-            # מציאת עמודת המחיר
-            target_col = 'Price_Millions'
-            if target_col not in df.columns:
-                # נסה למצוא את עמודת המחיר
-                possible_targets = [col for col in df.columns if 'price' in col.lower() or 'מחיר' in col.lower()]
-                if possible_targets:
-                    target_col = possible_targets[0]
-                else:
-                    return f"❌ שגיאה: לא נמצאה עמודת מחיר. עמודות זמינות: {list(df.columns)}"
-            
-            X = df.drop(target_col, axis=1)
-            y = df[target_col]
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-            if scaler:
-                X_test = scaler.transform(X_test)
-
-            # חיזוי
-            y_pred = model.predict(X_test)
+            # חיזויי ה-test של המאמן (model_predictions.npz) - חיזוי מחדש רק אם
+            # המודל או הנתונים השתנו מאז האימון
+            y_pred = split_predictions(model_path, model_data, context, 'test')
 
             # מטריקות
             rmse = np.sqrt(mean_squared_error(y_test, y_pred))
@@ -481,28 +572,17 @@ class ModelEvaluationTool(BaseTool):
             fig_dir = os.path.join(output_dir, "evaluation_figures")
             os.makedirs(fig_dir, exist_ok=True)
 
-            # Predicted vs Actual plot
-            plt.figure(figsize=(10, 6))
-            plt.scatter(y_test, y_pred, alpha=0.5)
-            plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'r--', lw=2)
-            plt.xlabel('Actual Values')
-            plt.ylabel('Predicted Values')
-            plt.title('Predicted vs Actual')
-            plt.tight_layout()
-            plt.savefig(os.path.join(fig_dir, "predicted_vs_actual.png"), dpi=300)
-            plt.close()
-
-            # Residuals plot
-            residuals = y_test - y_pred
-            plt.figure(figsize=(10, 6))
-            plt.scatter(y_pred, residuals, alpha=0.5)
-            plt.axhline(y=0, color='r', linestyle='--')
-            plt.xlabel('Predicted Values')
-            plt.ylabel('Residuals')
-            plt.title('Residual Plot')
-            plt.tight_layout()
-            plt.savefig(os.path.join(fig_dir, "residuals.png"), dpi=300)
-            plt.close()
+            # Predicted vs Actual ו-Residuals - שני הגרפים מרונדרים במקביל
+            actual = np.asarray(y_test, dtype=np.float64)
+            residuals = actual - y_pred
+            render_parallel([
+                (scatter_figure, (actual, y_pred, os.path.join(fig_dir, "predicted_vs_actual.png"),
+                                  'Predicted vs Actual', 'Actual Values', 'Predicted Values',
+                                  'diagonal', figure_mode)),
+                (scatter_figure, (y_pred, residuals, os.path.join(fig_dir, "residuals.png"),
+                                  'Residual Plot', 'Predicted Values', 'Residuals',
+                                  'zero', figure_mode)),
+            ])
 
             # יצירת דוח הערכה
             report = f"""# Model Evaluation Report
@@ -526,7 +606,7 @@ class ModelEvaluationTool(BaseTool):
 
 ### סטטיסטיקות Residuals
 - ממוצע: {residuals.mean():.4f}
-- סטיית תקן: {residuals.std():.4f}
+- סטיית תקן: {residuals.std(ddof=1):.4f}
 - מינימום: {residuals.min():.4f}
 - מקסימום: {residuals.max():.4f}
 
@@ -542,7 +622,7 @@ class ModelEvaluationTool(BaseTool):
 - {'אין overfitting חמור' if abs(model_data.get('metrics', {}).get('train_rmse', 0) - rmse) < 0.1 else 'יש סימנים ל-overfitting'}
 
 ### נקודות לשיפור
-1. {'שקול feature selection' if len(X.columns) > 15 else 'מספר הפיצרים סביר'}
+1. {'שקול feature selection' if context.n_features > 15 else 'מספר הפיצרים סביר'}
 2. {'נסה ensemble methods נוספים' if model_data.get('model_name') == 'Linear Regression' else 'שקול hyperparameter tuning נוסף'}
 3. בדוק outliers בחיזויים החריגים
 
@@ -571,11 +651,23 @@ class ModelCardGenerator(BaseTool):
              output_dir: str = "outputs") -> str:
         try:
             # טעינת מידע
-            model_data = joblib.load(model_path)
+            model_data = load_bundle(model_path)
 
             with open(comparison_path, 'r') as f:
                 comparison = json.load(f)
 
+            # אבחון מהחיזויים ששמר המאמן - בלי לחזות שוב את ה-train וה-test
+            cached = load_predictions(model_path)
+            diagnostics = "- אין חיזויים שמורים למודל זה"
+            if cached is not None:
+                residuals = cached['y_test'] - cached['test']
+                lines = [f"- **Train RMSE**: {split_rmse(cached, 'train'):.4f}",
+                         f"- **Test RMSE**: {split_rmse(cached, 'test'):.4f}"]
+                if 'oof' in cached:
+                    lines.append(f"- **Out-of-fold RMSE**: {split_rmse(cached, 'oof'):.4f}")
+                lines.append(f"- **Test Residuals**: mean={residuals.mean():.4f}, std={residuals.std(ddof=1):.4f}")
+                diagnostics = "\n".join(lines)
+
             model_card = f"""# Model Card: Israel Housing Price Prediction
 
 ## Model Details
@@ -610,7 +702,7 @@ class ModelCardGenerator(BaseTool):
 - **Source**: Generated synthetic dataset based on Israeli real estate market
 - **Size**: ~20,000 samples
 - **Time Period**: Current (synthetic data)
-- **Features**: 12 original + {len(model_data['model'].feature_names_in_) - 12 if hasattr(model_data['model'], 'feature_names_in_') else 'multiple'} engineered features
+- **Features**: 12 original + {len(bundle_features(model_data)) - 12 if bundle_features(model_data) else 'multiple'} engineered features
 
 ### Preprocessing
 1. ניקוי ערכים חסרים
@@ -628,6 +720,9 @@ class ModelCardGenerator(BaseTool):
 - **R² Score**: {model_data['metrics']['test_r2']:.4f}
 - **Training Time**: {[m for m in comparison if m['model_name'] == model_data['model_name']][0]['training_time']:.2f} seconds
 
+### Prediction Diagnostics
+{diagnostics}
+
 ### Model Comparison
 נבדקו {len(comparison)} מודלים שונים:
 
@@ -15,17 +15,18 @@ if sys.platform == "win32":
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-import joblib
-import pandas as pd
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from datetime import datetime
 import json
 
+from core.model_bundle import load_bundle
+from core.prediction_cache import load_predictions, split_predictions, split_rmse
+from core.training_context import TrainingContext
+
 # Change to script directory
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
@@ -39,36 +40,26 @@ def create_evaluation_report():
         warnings.filterwarnings('ignore')
         
         try:
-            # נשתמש ב-joblib.load תמיד - זה עובד נכון
-            model_data = joblib.load("outputs/model.pkl")
+            # load_bundle - ה-header ומערכי העצים ב-mmap; מודל sklearn נפרק רק אם צריך לחזות מחדש
+            model_data = load_bundle("outputs/model.pkl")
             # בדיקה ש-model_data הוא dict
             if not isinstance(model_data, dict):
                 print(f"ERROR: model_data is not a dict, it's {type(model_data)}")
                 return False
         except Exception as e:
-            # אם joblib נכשל, נציג שגיאה
-            print(f"ERROR: Failed to load model with joblib: {str(e)}")
+            # אם הטעינה נכשלה, נציג שגיאה
+            print(f"ERROR: Failed to load model: {str(e)}")
             print(f"ERROR: Exception type: {type(e).__name__}")
             import traceback
             traceback.print_exc()
             return False
         
-        model = model_data['model']
-        scaler = model_data.get('scaler')
-        
         # Load data
-        df = pd.read_csv("outputs/features.csv")
-        target_col = 'Price_Millions' if 'Price_Millions' in df.columns else 'MedHouseVal'
-        X = df.drop(target_col, axis=1)
-        y = df[target_col]
-        
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        context = TrainingContext.from_file("outputs/features.csv")
+        y_test = context.y_test
         
-        if scaler:
-            X_test_scaled = scaler.transform(X_test)
-            y_pred = model.predict(X_test_scaled)
-        else:
-            y_pred = model.predict(X_test)
+        # חיזויי ה-test ששמר המאמן (model_predictions.npz), או חיזוי אם אינם תקפים
+        y_pred = split_predictions("outputs/model.pkl", model_data, context, 'test')
         
         # Metrics
         rmse = np.sqrt(mean_squared_error(y_test, y_pred))
@@ -129,7 +120,7 @@ def create_evaluation_report():
 
 ### סטטיסטיקות Residuals
 - ממוצע: {residuals.mean():.4f}
-- סטיית תקן: {residuals.std():.4f}
+- סטיית תקן: {residuals.std(ddof=1):.4f}
 - מינימום: {residuals.min():.4f}
 - מקסימום: {residuals.max():.4f}
 
@@ -145,7 +136,7 @@ def create_evaluation_report():
 - {'אין overfitting חמור' if abs(model_data.get('metrics', {}).get('train_rmse', 0) - rmse) < 0.1 else 'יש סימנים ל-overfitting'}
 
 ### נקודות לשיפור
-1. {'שקול feature selection' if len(X.columns) > 15 else 'מספר הפיצרים סביר'}
+1. {'שקול feature selection' if context.n_features > 15 else 'מספר הפיצרים סביר'}
 2. {'נסה ensemble methods נוספים' if model_data.get('model_name') == 'Linear Regression' else 'שקול hyperparameter tuning נוסף'}
 3. בדוק outliers בחיזויים החריגים
 
@@ -175,15 +166,15 @@ def create_model_card():
         warnings.filterwarnings('ignore')
         
         try:
-            # נשתמש ב-joblib.load תמיד - זה עובד נכון
-            model_data = joblib.load("outputs/model.pkl")
+            # load_bundle - ה-header בלבד; ה-Model Card לא צריך את מודל sklearn
+            model_data = load_bundle("outputs/model.pkl")
             # בדיקה ש-model_data הוא dict
             if not isinstance(model_data, dict):
                 print(f"ERROR: model_data is not a dict, it's {type(model_data)}")
                 return False
         except Exception as e:
-            # אם joblib נכשל, נציג שגיאה
-            print(f"ERROR: Failed to load model with joblib: {str(e)}")
+            # אם הטעינה נכשלה, נציג שגיאה
+            print(f"ERROR: Failed to load model: {str(e)}")
             print(f"ERROR: Exception type: {type(e).__name__}")
             import traceback
             traceback.print_exc()
@@ -197,6 +188,12 @@ def create_model_card():
         with open("outputs/all_models_comparison.json", 'r', encoding='utf-8') as f:
             comparison = json.load(f)
         
+        # RMSE out-of-fold מהחיזויים ששמר המאמן (כשיש)
+        cached = load_predictions("outputs/model.pkl")
+        oof_line = ""
+        if cached is not None and 'oof' in cached:
+            oof_line = f"- **Out-of-fold RMSE**: {split_rmse(cached, 'oof'):.4f}\n"
+        
         model_card = f"""# Model Card: Israel Housing Price Prediction
 
 ## Model Details
@@ -248,7 +245,7 @@ def create_model_card():
 - **RMSE**: {model_data['metrics']['test_rmse']:.4f}
 - **R² Score**: {model_data['metrics']['test_r2']:.4f}
 - **Train RMSE**: {model_data['metrics']['train_rmse']:.4f}
-
+{oof_line}
 ### Model Comparison
 """
         
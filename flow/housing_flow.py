@@ -6,7 +6,7 @@ import json
 from dotenv import load_dotenv
 from crewai.flow.flow import Flow, listen, start
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 # טעינת משתני סביבה
 load_dotenv()
@@ -14,8 +14,13 @@ load_dotenv()
 # ייבוא הצוותים
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import core
+import crews.data_analyst_crew as analyst_package
+import crews.data_scientist_crew as scientist_package
 from crews.data_analyst_crew import DataAnalystCrew
 from crews.data_scientist_crew import DataScientistCrew
+from core.stage_cache import StageCache
+from core.storage import table_exists
 
 
 class FlowState(BaseModel):
@@ -36,6 +41,9 @@ class FlowState(BaseModel):
     data_analysis_result: Dict[str, Any] = {}
     modeling_result: Dict[str, Any] = {}
 
+    # שלבים שדולגו כי הקלטים, הקוד והפרמטרים שלהם לא השתנו (STAGE_CACHE=off מבטל)
+    cached_stages: List[str] = []
+
 
 class HousePricePredictionFlow(Flow[FlowState]):
     """
@@ -45,6 +53,9 @@ class HousePricePredictionFlow(Flow[FlowState]):
     1. Data Analyst Crew - ניתוח וחקר הנתונים
     2. Validation - וולידציה של הנתונים
     3. Data Scientist Crew - בניית והערכת מודלים
+
+    צוות שהקלטים שלו (תוכן הקבצים), הקוד שלו והצוות שלפניו לא השתנו מאז
+    הריצה הקודמת לא רץ שוב - התוצרים הקיימים משמשים (core.stage_cache).
     """
 
     @start()
@@ -61,6 +72,8 @@ class HousePricePredictionFlow(Flow[FlowState]):
 
         # יצירת תיקיית outputs
         os.makedirs("outputs", exist_ok=True)
+        self.stage_cache = StageCache("outputs")
+        self.state.cached_stages = []
 
         return "Data analysis ready to start"
 
@@ -72,9 +85,17 @@ class HousePricePredictionFlow(Flow[FlowState]):
         print("="*60 + "\n")
 
         try:
-            # הרצת הצוות
-            analyst_crew = DataAnalystCrew()
-            result = analyst_crew.run()
+            # הרצת הצוות (או שימוש בתוצרים הקודמים אם raw_data והקוד לא השתנו)
+            outputs = ["outputs/clean_data.csv", "outputs/dataset_contract.json",
+                       "outputs/insights.md", "outputs/figures"]
+            result, cached = self.stage_cache.run(
+                'data_analyst_crew', lambda: _serializable(DataAnalystCrew().run()),
+                inputs=["outputs/raw_data.csv"], outputs=outputs,
+                code=[core, analyst_package], succeeded=_crew_succeeded(outputs),
+            )
+            if cached:
+                self.state.cached_stages.append('data_analyst_crew')
+                print("⏭️  הקלטים לא השתנו מאז הריצה הקודמת - משתמש בתוצרים הקיימים")
 
             # עדכון מצב
             self.state.data_cleaned = True
@@ -100,8 +121,8 @@ class HousePricePredictionFlow(Flow[FlowState]):
         print("✅ שלב 2: וולידציה של הנתונים")
         print("="*60 + "\n")
 
-        # בדיקה שקובץ הנתונים המנוקים קיים
-        if not os.path.exists(self.state.clean_data_path):
+        # בדיקה שטבלת הנתונים המנוקים קיימת (בכל פורמט, או כתיקיית partitions)
+        if not table_exists(self.state.clean_data_path):
             raise FileNotFoundError(f"קובץ נתונים מנוקים לא נמצא: {self.state.clean_data_path}")
 
         # בדיקה שקובץ החוזה קיים
@@ -152,9 +173,19 @@ class HousePricePredictionFlow(Flow[FlowState]):
         print("="*60 + "\n")
 
         try:
-            # הרצת הצוות
-            scientist_crew = DataScientistCrew()
-            result = scientist_crew.run()
+            # הרצת הצוות (או שימוש בתוצרים הקודמים אם הנתונים המנוקים והקוד לא השתנו)
+            outputs = ["outputs/features.csv", "outputs/model.pkl", "outputs/all_models_comparison.json",
+                       "outputs/evaluation_report.md", "outputs/model_card.md"]
+            result, cached = self.stage_cache.run(
+                'data_scientist_crew', lambda: _serializable(DataScientistCrew().run()),
+                inputs=["outputs/clean_data.csv"], outputs=outputs,
+                params={'search_strategy': os.environ.get('SEARCH_STRATEGY')},
+                code=[core, scientist_package], depends=['data_analyst_crew'],
+                succeeded=_crew_succeeded(outputs),
+            )
+            if cached:
+                self.state.cached_stages.append('data_scientist_crew')
+                print("⏭️  הקלטים לא השתנו מאז הריצה הקודמת - המודלים לא אומנו מחדש")
 
             # עדכון מצב
             self.state.features_created = True
@@ -224,7 +255,8 @@ class HousePricePredictionFlow(Flow[FlowState]):
                 "eda_completed": self.state.eda_completed,
                 "features_created": self.state.features_created,
                 "model_trained": self.state.model_trained,
-                "evaluation_completed": self.state.evaluation_completed
+                "evaluation_completed": self.state.evaluation_completed,
+                "cached_stages": self.state.cached_stages
             },
             "outputs": outputs
         }
@@ -239,6 +271,21 @@ class HousePricePredictionFlow(Flow[FlowState]):
         return "Flow completed successfully"
 
 
+def _serializable(crew_result):
+    """תוצאת הצוות כ-dict שניתן לשמור (CrewOutput נשמר כטקסט)"""
+    return dict(crew_result, result=str(crew_result.get('result')))
+
+
+def _crew_succeeded(outputs):
+    """
+    צוות נחשב מוצלח (ונשמר ב-stage cache) רק אם החזיר success וכל התוצרים
+    שלו קיימים - כלי שנכשל מחזיר הודעת שגיאה, והצוות עצמו לא נכשל.
+    """
+    def succeeded(result):
+        return result.get('status') == 'success' and all(table_exists(path) for path in outputs)
+    return succeeded
+
+
 def run_flow():
     """פונקציה עזר להרצת ה-Flow"""
     flow = HousePricePredictionFlow()
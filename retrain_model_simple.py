@@ -3,22 +3,23 @@ import sys
 import io
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-import pandas as pd
 import numpy as np
-import joblib
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 import warnings
 warnings.filterwarnings('ignore')
 
+from core.model_bundle import save_bundle
+from core.storage import read_table
+
 print("=" * 60)
 print("Retraining Model - Israel Housing (No Lat/Lon)")
 print("=" * 60)
 
 # Load data
 print("\nLoading data...")
-df = pd.read_csv('outputs/features.csv')
+df = read_table('outputs/features.csv')
 
 # Prepare features and target
 X = df.drop('Price_Millions', axis=1)
@@ -70,10 +71,11 @@ model_data = {
         'test_rmse': test_rmse,
         'test_r2': test_r2
     },
-    'features': list(X.columns)
+    'features': list(X.columns),
+    'feature_dtypes': {col: str(dtype) for col, dtype in X.dtypes.items()}
 }
 
-joblib.dump(model_data, 'outputs/model.pkl')
+save_bundle(model_data, 'outputs/model.pkl')
 print("\nModel saved to: outputs/model.pkl")
 print(f"Features used: {len(X.columns)}")
 print("=" * 60)
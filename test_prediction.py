@@ -1,13 +1,14 @@
 """
 בדיקת חיזוי המודל - בדיקה מהירה
 """
-import pandas as pd
-import numpy as np
-import joblib
 import json
 
+from core.features import HousingFeatureTransformer
+from core.model_bundle import bundle_features, load_bundle, prepare_features
+from core.storage import read_table
+
 # טעינת המודל
-model_data = joblib.load("outputs/model.pkl")
+model_data = load_bundle("outputs/model.pkl")
 model = model_data['model']
 scaler = model_data.get('scaler')
 
@@ -19,9 +20,9 @@ print(f"Test R²: {model_data['metrics']['test_r2']:.4f}")
 print(f"Test RMSE: {model_data['metrics']['test_rmse']:.4f}")
 print()
 
-# טעינת נתוני האימון
-features_df = pd.read_csv("outputs/features.csv")
-feature_columns = [col for col in features_df.columns if col != 'Price_Millions']
+# טעינת נתוני האימון (להשוואה למחיר ממוצע בעיר)
+features_df = read_table("outputs/features.csv", columns=['City_encoded', 'Price_Millions'])
+feature_columns = bundle_features(model_data)
 
 print(f"עמודות פיצ'רים: {len(feature_columns)}")
 print()
@@ -78,62 +79,18 @@ test_cases = [
 # טעינת מיפוי ערים
 with open("outputs/city_mapping.json", 'r', encoding='utf-8') as f:
     city_mapping = json.load(f)
+transformer = HousingFeatureTransformer.from_city_mapping("outputs/city_mapping.json")
 
 for test_case in test_cases:
     print("-"*60)
     print(f"📍 {test_case['name']}")
     print("-"*60)
 
-    # יצירת DataFrame
-    input_data = pd.DataFrame([test_case])
-
-    # הנדסת פיצ'רים (בדיוק כמו באימון)
-    input_data['City_encoded'] = city_mapping.get(test_case['City'], 0)
-    input_data['rooms_per_size'] = input_data['Rooms'] / (input_data['Size_sqm'] + 0.001)
-    input_data['income_per_size'] = input_data['AvgIncome'] / (input_data['Size_sqm'] + 0.001)
-
-    center_lat, center_lon = 31.7683, 35.2137
-    input_data['distance_to_center_israel'] = np.sqrt(
-        (input_data['Latitude'] - center_lat)**2 +
-        (input_data['Longitude'] - center_lon)**2
-    )
-    input_data['coastal_proximity'] = (input_data['DistanceSea_km'] < 10).astype(int)
-    input_data['sea_proximity_score'] = 1 / (input_data['DistanceSea_km'] + 1)
-    input_data['log_avg_income'] = np.log1p(input_data['AvgIncome'])
-
-    # קטגוריות
-    if test_case['AvgIncome'] <= 10:
-        income_cat = 0
-    elif test_case['AvgIncome'] <= 15:
-        income_cat = 1
-    else:
-        income_cat = 2
-    input_data['income_category_encoded'] = income_cat
-
-    if test_case['Age'] <= 10:
-        age_cat = 0
-    elif test_case['Age'] <= 30:
-        age_cat = 1
-    else:
-        age_cat = 2
-    input_data['age_category_encoded'] = age_cat
-
-    input_data['income_per_room'] = input_data['AvgIncome'] * input_data['Rooms']
-    input_data['size_income'] = input_data['Size_sqm'] * input_data['AvgIncome']
-    input_data['location_score'] = input_data['Latitude'] * input_data['Longitude']
-    input_data['city_size_interaction'] = input_data['Size_sqm'] * input_data['Rooms']
-
-    # הסרת City והמרה למספרים
-    input_data = input_data.drop('City', axis=1)
-    input_data_numeric = input_data.select_dtypes(include=[np.number])
-
-    # וידוא שכל העמודות קיימות
-    for col in feature_columns:
-        if col not in input_data_numeric.columns:
-            input_data_numeric[col] = 0
+    # הנדסת פיצ'רים (אותה טרנספורמציה כמו באימון)
+    input_data_numeric = transformer.transform_frame(test_case)
 
-    # שימוש רק בעמודות הנכונות בסדר הנכון
-    input_for_prediction = input_data_numeric[feature_columns]
+    # שימוש רק בעמודות הנכונות בסדר הנכון (לפי סכמת המודל)
+    input_for_prediction = prepare_features(model_data, input_data_numeric)
 
     # חיזוי
     if scaler:
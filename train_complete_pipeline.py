@@ -1,7 +1,14 @@
 """
 סקריפט מלא לאימון המודל על נתוני ישראל
-מריץ את כל השלבים: טעינה -> ניקוי -> פיצ'רים -> אימון
+מריץ את כל השלבים: טעינה -> ניקוי (+ מטריצת קורלציות) -> פיצ'רים -> אימון
+
+שלב שהקלטים, הקוד והפרמטרים שלו לא השתנו מאז הריצה הקודמת מדולג
+(core.stage_cache). --force מריץ הכל מחדש.
+
+--delta FILE קולט קובץ דירות חדשות כ-partition נוסף של raw_data, וניקוי
+והנדסת הפיצ'רים רצים רק על ה-partitions החדשים (core.partitions).
 """
+import argparse
 import os
 import sys
 
@@ -19,99 +26,160 @@ if sys.platform == "win32":
 # הוספת נתיב הפרויקט
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import core
+from crews.data_analyst_crew import tools as analyst_tools
 from crews.data_analyst_crew.tools import DataIngestionTool, DataCleaningTool
+from crews.data_scientist_crew import tools as scientist_tools
 from crews.data_scientist_crew.tools import (
     FeatureEngineeringTool,
-    LinearRegressionTrainer,
-    RandomForestTrainer,
-    GradientBoostingTrainer,
-    ModelComparisonTool
+    ModelComparisonTool,
+    ModelTrainingTools
 )
+from core.correlation import CORRELATION_FILE, compute_correlations
+from core.summary_stats import SUMMARY_FILE
+from core.model_bundle import header_path
+from core.stage_cache import StageCache
+from core.storage import configured_formats, table_exists
+from core.training_context import TrainingContext
+from core.training_scheduler import run_trainers_parallel
+
+
+def _failed(result):
+    """הכלים מחזירים הודעת שגיאה במקום לזרוק חריגה"""
+    if isinstance(result, dict):
+        return 'error' in result
+    return "שגיאה" in result or "ERROR" in result or "לא נמצא" in result
+
 
-def main():
+def _print_stage(result, cached):
+    if cached:
+        print("[CACHED] הקלטים לא השתנו מאז הריצה הקודמת - משתמש בתוצרים הקיימים")
+    print(result)
+
+
+def _train_and_compare(features_path, output_dir):
+    """אימון כל המודלים במקביל + השוואה. מחזיר סיכום שניתן לשמור ב-stage cache"""
+    # טעינה ופיצול חד-פעמיים - משותפים לכל המאמנים
+    context = TrainingContext.from_file(features_path)
+
+    # כל מאמן בתהליך נפרד עם תקציב ליבות משלו
+    results = run_trainers_parallel(
+        ModelTrainingTools.get_weighted_trainers(), features_path, output_dir, context=context
+    )
+    for result in results:
+        if 'error' in result:
+            return {'error': result['error']}
+
+    comparison = ModelComparisonTool()._run(results, output_dir)
+    if _failed(comparison):
+        return {'error': comparison}
+    return {
+        'models': [
+            {'model_name': r['model_name'], 'test_rmse': r['test_rmse'], 'test_r2': r['test_r2']}
+            for r in results
+        ],
+        'comparison': comparison,
+    }
+
+
+def main(force=False, delta_file=None):
     print("="*60)
     print("Pipeline מלא לאימון מודל על נתוני ישראל")
     print("="*60)
 
     output_dir = "outputs"
+    cache = StageCache(output_dir, force=force)
+    formats = {'formats': configured_formats()}
 
     # שלב 1: טעינת נתונים
     print("\n[שלב 1/5] טעינת נתונים...")
     print("-"*60)
-    ingestion_tool = DataIngestionTool()
-    result = ingestion_tool._run(output_dir)
-    print(result)
-    if "שגיאה" in result or "ERROR" in result or "לא נמצא" in result:
+    result, cached = cache.run(
+        'ingestion', lambda: DataIngestionTool()._run(output_dir, delta_file=delta_file),
+        inputs=["outputs/raw_data.csv"] + ([delta_file] if delta_file else []),
+        outputs=["outputs/raw_data.csv", "outputs/dataset_contract.json"],
+        params=dict(formats, delta=bool(delta_file)), code=[core, analyst_tools],
+        succeeded=lambda r: not _failed(r),
+    )
+    _print_stage(result, cached)
+    if _failed(result):
         print("\nERROR: הטעינה נכשלה. אנא הרץ תחילה: python create_israel_dataset.py")
         return
 
     # שלב 2: ניקוי נתונים
     print("\n[שלב 2/5] ניקוי נתונים...")
     print("-"*60)
-    cleaning_tool = DataCleaningTool()
-    result = cleaning_tool._run("outputs/raw_data.csv", output_dir)
-    print(result)
-    if "שגיאה" in result or "ERROR" in result:
+    result, cached = cache.run(
+        'cleaning', lambda: DataCleaningTool()._run("outputs/raw_data.csv", output_dir),
+        inputs=["outputs/raw_data.csv"], outputs=["outputs/clean_data.csv"],
+        params=formats, code=[core, analyst_tools], depends=['ingestion'],
+        succeeded=lambda r: not _failed(r),
+    )
+    _print_stage(result, cached)
+    if _failed(result):
         print("\nERROR: הניקוי נכשל")
         return
 
+    # סיכום מצטבר + מטריצת קורלציות, משותפים ל-EDA, לתובנות ול-Dashboard
+    # (core.summary_stats, core.correlation)
+    result, cached = cache.run(
+        'statistics',
+        lambda: f"[OK] סטטיסטיקות ומטריצת קורלציות: {len(compute_correlations('outputs/clean_data.csv', output_dir)[0])} עמודות",
+        inputs=["outputs/clean_data.csv"],
+        outputs=[os.path.join(output_dir, SUMMARY_FILE), os.path.join(output_dir, CORRELATION_FILE)],
+        code=[core], depends=['cleaning'],
+    )
+    _print_stage(result, cached)
+
     # שלב 3: יצירת פיצ'רים
     print("\n[שלב 3/5] יצירת פיצ'רים...")
     print("-"*60)
-    feature_tool = FeatureEngineeringTool()
-    result = feature_tool._run("outputs/clean_data.csv", output_dir)
-    print(result)
-    if "שגיאה" in result or "ERROR" in result:
+    result, cached = cache.run(
+        'features', lambda: FeatureEngineeringTool()._run("outputs/clean_data.csv", output_dir),
+        inputs=["outputs/clean_data.csv"],
+        outputs=["outputs/features.csv", "outputs/city_mapping.json", "outputs/feature_engineering_report.md"],
+        params=formats, code=[core, scientist_tools], depends=['cleaning'],
+        succeeded=lambda r: not _failed(r),
+    )
+    _print_stage(result, cached)
+    if _failed(result):
         print("\nERROR: יצירת הפיצ'רים נכשלה")
         return
 
     # בדיקה שקובץ הפיצ'רים נוצר
     features_path = "outputs/features.csv"
-    if not os.path.exists(features_path):
+    if not table_exists(features_path):
         print(f"\nERROR: קובץ הפיצ'רים לא נמצא: {features_path}")
         return
 
     print(f"\n[OK] קובץ הפיצ'רים נוצר: {features_path}")
 
-    # שלב 4: אימון מודלים
+    # שלבים 4-5: אימון מודלים והשוואה (שלב cache אחד - ההשוואה צריכה את המודלים עצמם)
     print("\n[שלב 4/5] אימון מודלים...")
     print("="*60)
-
-    lr_trainer = LinearRegressionTrainer()
-    rf_trainer = RandomForestTrainer()
-    gb_trainer = GradientBoostingTrainer()
-
-    print("\n[4.1] מאמן Linear Regression...")
-    print("-"*60)
-    lr_result = lr_trainer._run(features_path, output_dir)
-    if 'error' in lr_result:
-        print(f"ERROR: {lr_result['error']}")
-        return
-    print(f"[OK] Linear Regression - Test RMSE: {lr_result['test_rmse']:.4f}, R^2: {lr_result['test_r2']:.4f}")
-
-    print("\n[4.2] מאמן Random Forest...")
-    print("-"*60)
-    rf_result = rf_trainer._run(features_path, output_dir)
-    if 'error' in rf_result:
-        print(f"ERROR: {rf_result['error']}")
-        return
-    print(f"[OK] Random Forest - Test RMSE: {rf_result['test_rmse']:.4f}, R^2: {rf_result['test_r2']:.4f}")
-
-    print("\n[4.3] מאמן Gradient Boosting...")
+    trainers = ModelTrainingTools.get_weighted_trainers()
+    print(f"\nמאמן {len(trainers)} מודלים במקביל...")
     print("-"*60)
-    gb_result = gb_trainer._run(features_path, output_dir)
-    if 'error' in gb_result:
-        print(f"ERROR: {gb_result['error']}")
+    model_path = os.path.join(output_dir, "model.pkl")
+    training, cached = cache.run(
+        'training', lambda: _train_and_compare(features_path, output_dir),
+        inputs=[features_path],
+        outputs=[model_path, header_path(model_path), "outputs/all_models_comparison.json"],
+        params={'trainers': [cls.__name__ for cls, _ in trainers],
+                'search_strategy': os.environ.get('SEARCH_STRATEGY')},
+        code=[core, scientist_tools], depends=['features'], succeeded=lambda r: not _failed(r),
+    )
+    if _failed(training):
+        print(f"ERROR: {training['error']}")
         return
-    print(f"[OK] Gradient Boosting - Test RMSE: {gb_result['test_rmse']:.4f}, R^2: {gb_result['test_r2']:.4f}")
+    if cached:
+        print("[CACHED] הפיצ'רים והקוד לא השתנו - המודלים לא אומנו מחדש")
+    for model in training['models']:
+        print(f"[OK] {model['model_name']} - Test RMSE: {model['test_rmse']:.4f}, R^2: {model['test_r2']:.4f}")
 
-    # שלב 5: השוואת מודלים
     print("\n[שלב 5/5] השוואת מודלים ובחירת הטוב ביותר...")
     print("="*60)
-    comparison_tool = ModelComparisonTool()
-    models_results = [lr_result, rf_result, gb_result]
-    comparison_result = comparison_tool._run(models_results, output_dir)
-    print(comparison_result)
+    print(training['comparison'])
 
     # בדיקת קבצי פלט
     print("\n" + "="*60)
@@ -128,7 +196,7 @@ def main():
     all_ok = True
     for filename, description in files_to_check:
         filepath = os.path.join(output_dir, filename)
-        if os.path.exists(filepath):
+        if os.path.exists(filepath) or (filename.endswith('.csv') and table_exists(filepath)):
             print(f"[OK] {description}: {filepath}")
         else:
             print(f"[ERROR] {description} לא נמצא: {filepath}")
@@ -145,4 +213,8 @@ def main():
         print("="*60)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Pipeline מלא לאימון המודל")
+    parser.add_argument("--force", action="store_true", help="הרצת כל השלבים מחדש, בלי stage cache")
+    parser.add_argument("--delta", help="קובץ דירות חדשות לקליטה מצטברת (נוסף כ-partition חדש)")
+    args = parser.parse_args()
+    main(force=args.force, delta_file=args.delta)
@@ -21,11 +21,12 @@ if sys.platform == "win32":
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from crews.data_scientist_crew.tools import (
-    LinearRegressionTrainer,
-    RandomForestTrainer,
-    GradientBoostingTrainer,
-    ModelComparisonTool
+    ModelComparisonTool,
+    ModelTrainingTools
 )
+from core.storage import table_exists
+from core.training_context import TrainingContext
+from core.training_scheduler import run_trainers_parallel
 
 def main():
     print("="*60)
@@ -34,51 +35,33 @@ def main():
     
     # בדיקה שקובץ הפיצ'רים קיים
     features_path = "outputs/features.csv"
-    if not os.path.exists(features_path):
+    if not table_exists(features_path):
         print(f"ERROR: קובץ הפיצ'רים לא נמצא: {features_path}")
         return
     
     print(f"\nOK: קובץ הפיצ'רים נמצא: {features_path}")
+
+    # טעינה ופיצול חד-פעמיים - משותפים לכל המאמנים
+    context = TrainingContext.from_file(features_path)
     
-    # יצירת כלי האימון
-    lr_trainer = LinearRegressionTrainer()
-    rf_trainer = RandomForestTrainer()
-    gb_trainer = GradientBoostingTrainer()
     comparison_tool = ModelComparisonTool()
-    
-    # אימון כל המודלים
-    print("\n" + "="*60)
-    print("מאמן Linear Regression...")
-    print("="*60)
-    lr_result = lr_trainer._run(features_path, "outputs")
-    if 'error' in lr_result:
-        print(f"ERROR: {lr_result['error']}")
-        return
-    print(f"OK: Linear Regression - Test RMSE: {lr_result['test_rmse']:.4f}, R^2: {lr_result['test_r2']:.4f}")
-    
-    print("\n" + "="*60)
-    print("מאמן Random Forest...")
-    print("="*60)
-    rf_result = rf_trainer._run(features_path, "outputs")
-    if 'error' in rf_result:
-        print(f"ERROR: {rf_result['error']}")
-        return
-    print(f"OK: Random Forest - Test RMSE: {rf_result['test_rmse']:.4f}, R^2: {rf_result['test_r2']:.4f}")
-    
-    print("\n" + "="*60)
-    print("מאמן Gradient Boosting...")
+
+    # אימון כל המודלים במקביל - כל אחד בתהליך נפרד עם תקציב ליבות משלו
+    trainers = ModelTrainingTools.get_weighted_trainers()
+    print(f"\nמאמן {len(trainers)} מודלים במקביל...")
     print("="*60)
-    gb_result = gb_trainer._run(features_path, "outputs")
-    if 'error' in gb_result:
-        print(f"ERROR: {gb_result['error']}")
-        return
-    print(f"OK: Gradient Boosting - Test RMSE: {gb_result['test_rmse']:.4f}, R^2: {gb_result['test_r2']:.4f}")
+    models_results = run_trainers_parallel(trainers, features_path, "outputs", context=context)
+    for result in models_results:
+        if 'error' in result:
+            print(f"ERROR: {result['error']}")
+            return
+    for result in models_results:
+        print(f"OK: {result['model_name']} - Test RMSE: {result['test_rmse']:.4f}, R^2: {result['test_r2']:.4f}")
     
     # השוואת מודלים ושמירה
     print("\n" + "="*60)
     print("משווה מודלים ובוחר את הטוב ביותר...")
     print("="*60)
-    models_results = [lr_result, rf_result, gb_result]
     comparison_result = comparison_tool._run(models_results, "outputs")
     print(comparison_result)
     
@@ -24,8 +24,11 @@ from crews.data_scientist_crew.tools import (
     LinearRegressionTrainer,
     RandomForestTrainer,
     GradientBoostingTrainer,
+    HistGradientBoostingTrainer,
     ModelComparisonTool
 )
+from core.storage import table_exists
+from core.training_context import TrainingContext
 
 def main():
     print("="*60)
@@ -33,43 +36,54 @@ def main():
     print("="*60)
     
     features_path = "outputs/features.csv"
-    if not os.path.exists(features_path):
+    if not table_exists(features_path):
         print(f"ERROR: Features file not found: {features_path}")
         return
     
     print(f"OK: Features file found")
+
+    # טעינה ופיצול חד-פעמיים - משותפים לכל המאמנים
+    context = TrainingContext.from_file(features_path)
     
     # Create trainers
     lr_trainer = LinearRegressionTrainer()
     rf_trainer = RandomForestTrainer()
     gb_trainer = GradientBoostingTrainer()
+    hgb_trainer = HistGradientBoostingTrainer()
     comparison_tool = ModelComparisonTool()
     
     # Train models
     print("\nTraining Linear Regression...")
-    lr_result = lr_trainer._run(features_path, "outputs")
+    lr_result = lr_trainer._run(features_path, "outputs", context=context)
     if 'error' in lr_result:
         print(f"ERROR: {lr_result['error']}")
         return
     print(f"OK: Linear Regression - Test RMSE: {lr_result['test_rmse']:.4f}, R^2: {lr_result['test_r2']:.4f}")
     
     print("\nTraining Random Forest...")
-    rf_result = rf_trainer._run(features_path, "outputs")
+    rf_result = rf_trainer._run(features_path, "outputs", context=context)
     if 'error' in rf_result:
         print(f"ERROR: {rf_result['error']}")
         return
     print(f"OK: Random Forest - Test RMSE: {rf_result['test_rmse']:.4f}, R^2: {rf_result['test_r2']:.4f}")
     
     print("\nTraining Gradient Boosting...")
-    gb_result = gb_trainer._run(features_path, "outputs")
+    gb_result = gb_trainer._run(features_path, "outputs", context=context)
     if 'error' in gb_result:
         print(f"ERROR: {gb_result['error']}")
         return
     print(f"OK: Gradient Boosting - Test RMSE: {gb_result['test_rmse']:.4f}, R^2: {gb_result['test_r2']:.4f}")
+
+    print("\nTraining Hist Gradient Boosting...")
+    hgb_result = hgb_trainer._run(features_path, "outputs", context=context)
+    if 'error' in hgb_result:
+        print(f"ERROR: {hgb_result['error']}")
+        return
+    print(f"OK: Hist Gradient Boosting - Test RMSE: {hgb_result['test_rmse']:.4f}, R^2: {hgb_result['test_r2']:.4f}")
     
     # Compare and save
     print("\nComparing models and selecting best...")
-    models_results = [lr_result, rf_result, gb_result]
+    models_results = [lr_result, rf_result, gb_result, hgb_result]
     comparison_result = comparison_tool._run(models_results, "outputs")
     print(comparison_result)
     